@@ -1,5 +1,27 @@
 from django.contrib import admin
-from .models import ProyectoMonitoreo, SesionBonita
+from .models import (
+    AgregadoDashboard,
+    CasoBonita,
+    CompromisoAceptado,
+    EtapaPlan,
+    ProyectoMonitoreo,
+    SesionBonita,
+    SnapshotMetricas,
+)
+
+
+class EtapaPlanInline(admin.TabularInline):
+    model = EtapaPlan
+    fields = ('orden', 'nombre', 'fecha_inicio_prevista', 'fecha_fin_prevista')
+    readonly_fields = fields
+    extra = 0
+
+
+class CompromisoAceptadoInline(admin.TabularInline):
+    model = CompromisoAceptado
+    fields = ('compromiso_id', 'detalle', 'fecha', 'estado', 'aceptado_en')
+    readonly_fields = fields
+    extra = 0
 
 
 @admin.register(ProyectoMonitoreo)
@@ -7,6 +29,7 @@ class ProyectoMonitoreoAdmin(admin.ModelAdmin):
     list_display = ('proyecto_id', 'nombre', 'creado_en', 'actualizado_en')
     search_fields = ('nombre', 'descripcion')
     readonly_fields = ('creado_en', 'actualizado_en')
+    inlines = (EtapaPlanInline, CompromisoAceptadoInline)
 
 
 @admin.register(SesionBonita)
@@ -15,3 +38,24 @@ class SesionBonitaAdmin(admin.ModelAdmin):
     search_fields = ('api_username', 'case_id', 'proceso')
     readonly_fields = ('creado_en', 'actualizado_en')
     list_filter = ('proceso', 'creado_en')
+
+
+@admin.register(AgregadoDashboard)
+class AgregadoDashboardAdmin(admin.ModelAdmin):
+    list_display = ('clave', 'valor', 'actualizado_en')
+    search_fields = ('clave',)
+    readonly_fields = ('actualizado_en',)
+
+
+@admin.register(SnapshotMetricas)
+class SnapshotMetricasAdmin(admin.ModelAdmin):
+    list_display = ('tomado_en',)
+    list_filter = ('tomado_en',)
+
+
+@admin.register(CasoBonita)
+class CasoBonitaAdmin(admin.ModelAdmin):
+    list_display = ('case_id', 'tarea_nombre', 'sucio', 'sincronizado_en')
+    search_fields = ('case_id', 'tarea_nombre')
+    list_filter = ('sucio',)
+    exclude = ('variables',)
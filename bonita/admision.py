@@ -0,0 +1,312 @@
+# bonita/admision.py
+"""
+Control de admisión delante de Bonita, con carriles de prioridad.
+
+Sin límite, una ráfaga de requests se convierte en cientos de llamadas
+simultáneas a Bonita (polling de tareas, logins) y el motor se pone lento
+para todos. `limitador` acota, por worker, cuántas llamadas HTTP a Bonita
+están en curso a la vez.
+
+Cada llamada va por un carril (la prioridad del cliente):
+
+- interactivo: requests de usuarios (por defecto);
+- fondo: refrescos en segundo plano (dashboard);
+- masivo: sincronizaciones en bloque (sincronizar_casos).
+
+Cada carril tiene su cupo de lugares (BONITA_CUPOS). Un carril puede usar
+los lugares libres de los carriles de menor prioridad, nunca al revés: un
+click interactivo toma capacidad de fondo, pero un job masivo no le quita
+lugar a un usuario. Al liberarse un lugar pasa directo a quien espera en el
+carril de mayor prioridad que puede usarlo.
+
+Quien no consigue lugar espera en la cola de su carril (BONITA_COLA lugares)
+a lo sumo BONITA_COLA_ESPERA segundos (o lo que quede del plazo del
+request). Si la cola está llena o la espera se agota se lanza Saturado: el
+request falla rápido y PlazoMiddleware responde 503 con Retry-After, en
+lugar de sumar carga a un Bonita que ya no da abasto.
+
+El lugar se toma sólo durante cada llamada HTTP (no durante las esperas
+entre consultas de wait_ready_task_in_case). Lo usan BonitaClient (vía
+AdaptadorLimitado) y AsyncBonitaClient; métricas por carril en metricas().
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from . import plazos
+
+# De mayor a menor prioridad
+CARRILES = ("interactivo", "fondo", "masivo")
+_CUPOS_POR_DEFECTO = {"interactivo": 12, "fondo": 3, "masivo": 1}
+
+
+class Saturado(Exception):
+    """Bonita está saturado para este worker: no hay lugar ni en la cola."""
+
+    def __init__(self, mensaje: str, reintentar_en: float) -> None:
+        super().__init__(mensaje)
+        self.reintentar_en = reintentar_en
+
+
+class _EsperaHilo:
+    def __init__(self, carril: str) -> None:
+        self.carril = carril
+        self.cupo: Optional[str] = None
+        self.evento = threading.Event()
+
+    def despertar(self, limitador: "Limitador") -> None:
+        self.evento.set()
+
+
+class _EsperaAsync:
+    def __init__(self, carril: str) -> None:
+        self.carril = carril
+        self.cupo: Optional[str] = None
+        self.loop = asyncio.get_running_loop()
+        self.futuro = self.loop.create_future()
+
+    def despertar(self, limitador: "Limitador") -> None:
+        def entregar() -> None:
+            if self.futuro.done():
+                # La espera se canceló justo después de recibir el lugar
+                limitador.salir(self.cupo)
+            else:
+                self.futuro.set_result(None)
+
+        self.loop.call_soon_threadsafe(entregar)
+
+
+class _Estadistica:
+    def __init__(self) -> None:
+        self.atendidas = 0
+        self.rechazadas = 0
+        self.vencidas = 0
+        self.max_cola = 0
+        self.esperas = 0
+        self.espera_total = 0.0
+        self.llamadas = 0
+        self.duracion_total = 0.0
+        self.duracion_max = 0.0
+
+
+class Lugar:
+    """Context manager (sincrónico o async) de un lugar en un carril."""
+
+    def __init__(self, limitador: "Limitador", carril: str) -> None:
+        self._limitador = limitador
+        self._carril = carril
+        self._cupo: Optional[str] = None
+        self._t0 = 0.0
+
+    def __enter__(self) -> "Lugar":
+        self._cupo = self._limitador.entrar(self._carril)
+        self._t0 = time.monotonic()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._limitador.salir(self._cupo, self._carril, time.monotonic() - self._t0)
+
+    async def __aenter__(self) -> "Lugar":
+        self._cupo = await self._limitador.aentrar(self._carril)
+        self._t0 = time.monotonic()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self._limitador.salir(self._cupo, self._carril, time.monotonic() - self._t0)
+
+
+class Limitador:
+    """
+    Semáforo por carriles con colas acotadas, para hilos y corrutinas a la
+    vez. Los lugares se cuentan por cupo (el carril dueño del lugar), que
+    puede no ser el carril de quien lo usa.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ocupados: Dict[str, int] = {c: 0 for c in CARRILES}
+        self._colas: Dict[str, Deque[Any]] = {c: deque() for c in CARRILES}
+        self._stats: Dict[str, _Estadistica] = {c: _Estadistica() for c in CARRILES}
+
+    def lugar(self, carril: str = "interactivo") -> Lugar:
+        if carril not in CARRILES:
+            raise ValueError(f"Carril desconocido: {carril!r} (válidos: {', '.join(CARRILES)})")
+        return Lugar(self, carril)
+
+    @staticmethod
+    def _cupos() -> Dict[str, int]:
+        cupos = {**_CUPOS_POR_DEFECTO, **getattr(settings, "BONITA_CUPOS", {})}
+        return {c: max(0, int(cupos[c])) for c in CARRILES}
+
+    @staticmethod
+    def _saturado(mensaje: str) -> Saturado:
+        """Saturado, anotado en el plazo del request para que responda 503."""
+        reintentar_en = float(getattr(settings, "BONITA_REINTENTAR_EN", 2))
+        plazo = plazos.actual()
+        if plazo is not None:
+            plazo.reintentar_en = reintentar_en
+        return Saturado(mensaje, reintentar_en)
+
+    def _tomar_o_encolar(self, espera: Any) -> Optional[str]:
+        """
+        Cupo tomado, o None si quedó en la cola de su carril. Saturado si la
+        cola está llena.
+        """
+        carril = espera.carril
+        stats = self._stats[carril]
+        with self._lock:
+            if not self._colas[carril]:
+                cupos = self._cupos()
+                # Primero el cupo propio, después los de menor prioridad
+                for cupo in CARRILES[CARRILES.index(carril):]:
+                    if self._ocupados[cupo] < cupos[cupo]:
+                        self._ocupados[cupo] += 1
+                        stats.atendidas += 1
+                        return cupo
+            cola = self._colas[carril]
+            if len(cola) >= int(getattr(settings, "BONITA_COLA", 64)):
+                stats.rechazadas += 1
+                raise self._saturado(f"Cola de Bonita ({carril}) llena")
+            cola.append(espera)
+            stats.max_cola = max(stats.max_cola, len(cola))
+            return None
+
+    def _abandonar(self, espera: Any) -> bool:
+        """
+        Saca `espera` de la cola (se venció o se canceló). False si ya no
+        estaba: el lugar le fue entregado mientras tanto.
+        """
+        with self._lock:
+            try:
+                self._colas[espera.carril].remove(espera)
+            except ValueError:
+                return False
+            self._stats[espera.carril].vencidas += 1
+            return True
+
+    def _registrar_espera(self, carril: str, t0: float) -> None:
+        with self._lock:
+            stats = self._stats[carril]
+            stats.atendidas += 1
+            stats.esperas += 1
+            stats.espera_total += time.monotonic() - t0
+
+    def _timeout(self) -> float:
+        return plazos.restante(float(getattr(settings, "BONITA_COLA_ESPERA", 5)))
+
+    def entrar(self, carril: str = "interactivo") -> str:
+        espera = _EsperaHilo(carril)
+        cupo = self._tomar_o_encolar(espera)
+        if cupo is not None:
+            return cupo
+        t0 = time.monotonic()
+        try:
+            timeout = self._timeout()
+        except plazos.PlazoVencido:
+            if not self._abandonar(espera):
+                self.salir(espera.cupo)
+            raise
+        if not espera.evento.wait(timeout) and self._abandonar(espera):
+            raise self._saturado(f"Espera de Bonita ({carril}) agotada")
+        # Recibió el lugar (aunque sea justo al vencer la espera)
+        self._registrar_espera(carril, t0)
+        return espera.cupo
+
+    async def aentrar(self, carril: str = "interactivo") -> str:
+        espera = _EsperaAsync(carril)
+        cupo = self._tomar_o_encolar(espera)
+        if cupo is not None:
+            return cupo
+        t0 = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(espera.futuro), timeout=self._timeout())
+        except (asyncio.TimeoutError, asyncio.CancelledError, plazos.PlazoVencido) as e:
+            if not self._abandonar(espera):
+                # El lugar ya nos fue entregado: si entregar() ya corrió lo
+                # devolvemos; si no, al ver el futuro cancelado lo devuelve él
+                if espera.futuro.done() and not espera.futuro.cancelled():
+                    self.salir(espera.cupo)
+                else:
+                    espera.futuro.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._saturado(f"Espera de Bonita ({carril}) agotada") from None
+            raise
+        self._registrar_espera(carril, t0)
+        return espera.cupo
+
+    def salir(self, cupo: str, carril: Optional[str] = None, duracion: Optional[float] = None) -> None:
+        """
+        Libera un lugar del `cupo`. Con `carril` y `duracion` registra la
+        latencia de la llamada que lo usó.
+        """
+        with self._lock:
+            if carril is not None and duracion is not None:
+                stats = self._stats[carril]
+                stats.llamadas += 1
+                stats.duracion_total += duracion
+                stats.duracion_max = max(stats.duracion_max, duracion)
+            # El lugar pasa directo al que espera en el carril de mayor
+            # prioridad que puede usar este cupo (ocupados no cambia)
+            siguiente = None
+            for candidato in CARRILES[:CARRILES.index(cupo) + 1]:
+                if self._colas[candidato]:
+                    siguiente = self._colas[candidato].popleft()
+                    siguiente.cupo = cupo
+                    break
+            if siguiente is None:
+                self._ocupados[cupo] -= 1
+                return
+        siguiente.despertar(self)
+
+    def metricas(self) -> Dict[str, Any]:
+        cupos = self._cupos()
+        with self._lock:
+            carriles = {}
+            for carril in CARRILES:
+                s = self._stats[carril]
+                carriles[carril] = {
+                    "cupo": cupos[carril],
+                    "ocupados": self._ocupados[carril],
+                    "enCola": len(self._colas[carril]),
+                    "maxCola": s.max_cola,
+                    "atendidas": s.atendidas,
+                    "rechazadas": s.rechazadas,
+                    "vencidas": s.vencidas,
+                    "esperaPromedioMs": round(1000 * s.espera_total / s.esperas, 1) if s.esperas else 0.0,
+                    "latenciaPromedioMs": round(1000 * s.duracion_total / s.llamadas, 1) if s.llamadas else 0.0,
+                    "latenciaMaxMs": round(1000 * s.duracion_max, 1),
+                }
+            return {
+                "concurrencia": sum(cupos.values()),
+                "enCurso": sum(self._ocupados.values()),
+                "enCola": sum(len(c) for c in self._colas.values()),
+                "rechazadas": sum(s.rechazadas for s in self._stats.values()),
+                "carriles": carriles,
+            }
+
+
+limitador = Limitador()
+
+
+class AdaptadorLimitado(HTTPAdapter):
+    """Adaptador de requests que pasa cada llamada por el limitador, en su carril."""
+
+    def __init__(self, carril: str = "interactivo", **kwargs: Any) -> None:
+        limitador.lugar(carril)  # valida el carril
+        self.carril = carril
+        super().__init__(**kwargs)
+
+    def send(self, request, *args: Any, **kwargs: Any):
+        with limitador.lugar(self.carril):
+            return super().send(request, *args, **kwargs)
+
+
+def metricas() -> Dict[str, Any]:
+    return limitador.metricas()
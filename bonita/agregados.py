@@ -0,0 +1,201 @@
+# bonita/agregados.py
+"""
+Métricas del dashboard materializadas en la tabla AgregadoDashboard.
+
+- registrar_evento(): lo llaman nuestras propias vistas cuando pasa algo en
+  el flujo (proyecto creado, pedido registrado, compromiso aceptado,
+  observación enviada/respondida/evaluada) y ajusta los contadores con un
+  UPDATE atómico por métrica.
+- reconciliar(): recalcula todo desde /api/dashboard/metricas/ y pisa la
+  tabla (corrige cambios que no pasan por este front, p. ej. vencimientos).
+  Si la API falla no toca la tabla.
+- leer(): arma el bloque de métricas del dashboard con una sola consulta.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import backend
+from .metricas import AgregadorDashboard, agregar_stream
+from .metricas_numpy import AgregadorColumnar, numpy_disponible
+from .models import AgregadoDashboard
+
+# Listados que se guardan en `detalle` (se actualizan sólo al reconciliar)
+LISTADOS = ("top_proyectos_observaciones", "top_proyectos_compromisos", "observaciones_recientes")
+
+# Marca con la fecha de la última reconciliación
+CLAVE_RECONCILIACION = "_reconciliado"
+
+# Contadores que cambian con cada evento del flujo
+EVENTOS: Dict[str, Dict[str, int]] = {
+    "proyecto_creado": {"total_proyectos": 1, "proyectos_planificacion": 1},
+    "proyecto_finalizado": {"proyectos_ejecucion": -1, "proyectos_finalizados": 1},
+    "pedido_registrado": {"total_pedidos": 1, "pedidos_abiertos": 1},
+    "compromiso_registrado": {"total_compromisos": 1},
+    "compromiso_cumplido": {"compromisos_cumplidos": 1},
+    "observacion_enviada": {"total_observaciones": 1, "observaciones_pendientes": 1},
+    "observacion_respondida": {"observaciones_pendientes": -1, "observaciones_respondidas": 1},
+    "observacion_aprobada": {"observaciones_respondidas": -1, "observaciones_aprobadas": 1},
+    "observacion_rechazada": {"observaciones_respondidas": -1, "observaciones_rechazadas": 1},
+}
+
+# Métricas derivadas: no se guardan, se calculan al leer
+_DERIVADAS = ("monto_promedio_compromiso",)
+_MONTOS = ("monto_total_compromisos",)
+
+
+def nuevo_agregador():
+    """
+    Agregador según DASHBOARD_MOTOR: "numpy" usa el motor columnar si NumPy
+    está instalado; cualquier otro valor usa el motor de una pasada.
+    """
+    if getattr(settings, "DASHBOARD_MOTOR", "python") == "numpy":
+        if numpy_disponible():
+            return AgregadorColumnar()
+        print("Advertencia: DASHBOARD_MOTOR=numpy pero NumPy no está instalado; se usa el motor Python")
+    return AgregadorDashboard()
+
+
+def calcular_desde_api() -> Optional[Dict[str, Any]]:
+    """
+    Consulta /api/dashboard/metricas/ en streaming y devuelve el resultado
+    del agregador. Si la API falla devuelve None (nunca métricas parciales
+    ni vacías).
+    """
+    api_base = getattr(settings, "API_BASE_URL", "http://127.0.0.1:8000")
+    agregador = nuevo_agregador()
+
+    try:
+        # El cuerpo se parsea a medida que llega y cada lote de registros va
+        # directo al agregador: nunca tenemos las listas completas en memoria.
+        with backend.llamar(
+                "dashboard", "GET", f"{api_base}/api/dashboard/metricas/", timeout=10, stream=True
+        ) as res_metricas:
+            if not res_metricas.ok:
+                print(f"Error consultando API Django: {res_metricas.status_code} - {res_metricas.text}")
+                return None
+            agregar_stream(res_metricas.iter_content(chunk_size=64 * 1024), agregador)
+    except Exception as e:
+        # Si el stream se corta a mitad de camino no mostramos métricas parciales
+        print(f"Error consultando API Django: {e}")
+        return None
+
+    return agregador.resultado()
+
+
+def registrar_evento(evento: str, monto: Any = None) -> None:
+    """
+    Aplica los deltas de `evento` a los contadores materializados.
+
+    Antes de la primera reconciliación la tabla está vacía y los eventos se
+    ignoran (no hay base sobre la cual sumar). Nunca corta el flujo de la vista.
+    """
+    deltas: Dict[str, Any] = dict(EVENTOS.get(evento) or {})
+    if monto not in (None, ""):
+        try:
+            deltas["monto_total_compromisos"] = Decimal(str(monto))
+        except Exception:
+            pass
+    if not deltas:
+        return
+
+    try:
+        with transaction.atomic():
+            for clave, delta in deltas.items():
+                # update() no aplica auto_now: la fecha la usa guardar()
+                AgregadoDashboard.objects.filter(clave=clave).update(
+                    valor=F("valor") + delta, actualizado_en=timezone.now()
+                )
+    except Exception as e:
+        print(f"Advertencia: no se pudo registrar el evento '{evento}' en el dashboard: {e}")
+
+
+def guardar(resultado: Dict[str, Any], desde: Optional[datetime] = None) -> None:
+    """
+    Pisa la tabla con un resultado completo del agregador.
+
+    Con `desde` (cuándo se empezó a consultar la API) se conservan los
+    contadores que algún evento tocó después: el resultado puede no incluir
+    ese evento y pisarlo lo perdería. La próxima reconciliación los corrige.
+    """
+    metricas = resultado["metricas"]
+    with transaction.atomic():
+        tocados = set()
+        if desde is not None:
+            tocados = set(
+                AgregadoDashboard.objects.select_for_update()
+                .filter(actualizado_en__gte=desde)
+                .exclude(clave__in=LISTADOS + (CLAVE_RECONCILIACION,))
+                .values_list("clave", flat=True)
+            )
+        for clave, valor in metricas.items():
+            if clave in _DERIVADAS or clave in tocados:
+                continue
+            AgregadoDashboard.objects.update_or_create(
+                clave=clave,
+                defaults={"valor": Decimal(str(valor)), "detalle": []},
+            )
+        for clave in LISTADOS:
+            AgregadoDashboard.objects.update_or_create(
+                clave=clave,
+                defaults={"valor": 0, "detalle": resultado.get(clave) or []},
+            )
+        AgregadoDashboard.objects.update_or_create(
+            clave=CLAVE_RECONCILIACION,
+            defaults={"valor": 0, "detalle": []},
+        )
+
+
+def reconciliar() -> Optional[Dict[str, Any]]:
+    """
+    Recalcula desde la API, guarda y devuelve el resultado.
+
+    Si la API falla no toca la tabla (ni la marca de reconciliación) y
+    devuelve lo último materializado con "stale": True, o None si nunca se
+    reconcilió.
+    """
+    desde = timezone.now()
+    resultado = calcular_desde_api()
+    if resultado is None:
+        anterior = leer()
+        if anterior is not None:
+            anterior["stale"] = True
+        return anterior
+    guardar(resultado, desde=desde)
+    return resultado
+
+
+def leer(max_edad: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Devuelve el resultado materializado (mismo formato que
+    AgregadorDashboard.resultado()) o None si nunca se reconcilió o si la
+    última reconciliación tiene más de `max_edad` segundos.
+    """
+    filas = {a.clave: a for a in AgregadoDashboard.objects.all()}
+    marca = filas.pop(CLAVE_RECONCILIACION, None)
+    if marca is None:
+        return None
+    if max_edad is not None and marca.actualizado_en < timezone.now() - timedelta(seconds=max_edad):
+        return None
+
+    resultado: Dict[str, Any] = {clave: filas[clave].detalle if clave in filas else [] for clave in LISTADOS}
+
+    metricas: Dict[str, Any] = {}
+    for clave, fila in filas.items():
+        if clave in LISTADOS:
+            continue
+        metricas[clave] = float(fila.valor) if clave in _MONTOS else int(fila.valor)
+
+    total = metricas.get("total_compromisos", 0)
+    metricas["monto_promedio_compromiso"] = (
+        metricas.get("monto_total_compromisos", 0.0) / total if total > 0 else 0.0
+    )
+    resultado["metricas"] = metricas
+    return resultado
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class BonitaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bonita'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .basedatos import configurar_conexion
+
+        connection_created.connect(configurar_conexion, dispatch_uid="bonita.configurar_conexion")
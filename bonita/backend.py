@@ -0,0 +1,276 @@
+# bonita/backend.py
+"""
+Llamadas a la API JWT del backend (API_BASE_URL) con circuit breaker.
+
+Cuando el backend está lento o caído, cada vista esperaba su timeout (3 a
+10 s) en cada llamada. Ahora cada familia de endpoints tiene su circuito:
+
+- cerrado: las llamadas pasan. BACKEND_CIRCUITO_FALLOS fallas seguidas
+  (error de red, 5xx o una respuesta más lenta que BACKEND_CIRCUITO_LENTO
+  segundos) lo abren;
+- abierto: durante BACKEND_CIRCUITO_ABIERTO segundos las llamadas fallan al
+  instante con CircuitoAbierto (un requests.ConnectionError, así los
+  `except requests.RequestException` de las vistas lo tratan como antes);
+- semiabierto: vencido ese tiempo pasa UNA llamada de prueba. Si anda, el
+  circuito se cierra; si falla, vuelve a abrirse.
+
+Las lecturas con `vieja=True` guardan la última respuesta 200 de cada URL
+(por token, BACKEND_ULTIMA_TTL segundos, ver bonita/cache.py) y, si la
+llamada no se puede hacer o falla, devuelven esa respuesta guardada
+(es_vieja() la distingue) para que las pantallas sigan andando durante un
+incidente del backend. Las verificaciones previas a una escritura no usan
+respuestas viejas.
+
+Los circuitos son por worker, como el control de admisión
+(bonita/admision.py). Estado en metricas().
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from django.conf import settings
+
+from . import plazos
+from .cache import CacheDosNiveles
+
+# Familias de endpoints del backend, cada una con su circuito
+FAMILIAS = ("observaciones", "limite", "dashboard", "proyectos")
+
+# Última respuesta buena de cada lectura, compartida entre workers
+_ultimas = CacheDosNiveles("backend:ultima", ttl=86400)
+
+
+class CircuitoAbierto(requests.ConnectionError):
+    """El circuito de la familia está abierto: no se llama al backend."""
+
+    def __init__(self, familia: str, reintentar_en: float) -> None:
+        super().__init__(
+            f"API backend ({familia}) no disponible: circuito abierto, "
+            f"se reintenta en {max(0.0, reintentar_en):.0f} s"
+        )
+        self.familia = familia
+        self.reintentar_en = reintentar_en
+
+
+class Circuito:
+    def __init__(self, familia: str) -> None:
+        self.familia = familia
+        self._lock = threading.Lock()
+        self._estado = "cerrado"
+        self._fallos = 0
+        self._abierto_hasta = 0.0
+        self._sondeando = False
+        self.aperturas = 0
+        self.rechazadas = 0
+
+    def permitir(self) -> bool:
+        """
+        Deja pasar una llamada: True si es la prueba del estado semiabierto.
+        Lanza CircuitoAbierto si no puede pasar.
+        """
+        with self._lock:
+            if self._estado == "cerrado":
+                return False
+            ahora = time.monotonic()
+            if self._sondeando or ahora < self._abierto_hasta:
+                self.rechazadas += 1
+                raise CircuitoAbierto(self.familia, self._abierto_hasta - ahora)
+            self._estado = "semiabierto"
+            self._sondeando = True
+            return True
+
+    def registrar(self, sonda: bool, exito: bool) -> None:
+        with self._lock:
+            if sonda:
+                self._sondeando = False
+            if exito:
+                if self._estado != "cerrado":
+                    print(f"Info: API backend ({self.familia}) respondió de nuevo, circuito cerrado")
+                self._estado = "cerrado"
+                self._fallos = 0
+                return
+            self._fallos += 1
+            if sonda or self._fallos >= int(getattr(settings, "BACKEND_CIRCUITO_FALLOS", 5)):
+                if self._estado == "cerrado":
+                    print(f"Advertencia: API backend ({self.familia}) con {self._fallos} fallas seguidas, circuito abierto")
+                    self.aperturas += 1
+                self._estado = "abierto"
+                self._abierto_hasta = time.monotonic() + float(getattr(settings, "BACKEND_CIRCUITO_ABIERTO", 30))
+
+    def liberar(self, sonda: bool) -> None:
+        """La llamada no llegó a hacerse (p. ej. se agotó el plazo): no cuenta."""
+        if sonda:
+            with self._lock:
+                self._sondeando = False
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "estado": self._estado,
+                "fallosSeguidos": self._fallos,
+                "abiertoPorS": round(max(0.0, self._abierto_hasta - time.monotonic()), 1)
+                if self._estado != "cerrado" else 0.0,
+                "aperturas": self.aperturas,
+                "rechazadas": self.rechazadas,
+            }
+
+
+_circuitos: Dict[str, Circuito] = {familia: Circuito(familia) for familia in FAMILIAS}
+
+
+def _circuito(familia: str) -> Circuito:
+    try:
+        return _circuitos[familia]
+    except KeyError:
+        raise ValueError(f"Familia desconocida: {familia!r} (válidas: {', '.join(FAMILIAS)})") from None
+
+
+class RespuestaGuardada:
+    """Última respuesta buena de una lectura, con la interfaz que usan las vistas."""
+
+    ok = True
+    status_code = 200
+
+    def __init__(self, texto: str, content_type: str, guardada_en: float) -> None:
+        self.text = texto
+        self.content = texto.encode("utf-8")
+        self.headers = {"Content-Type": content_type}
+        self.guardada_en = guardada_en
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+def es_vieja(respuesta: Any) -> bool:
+    """True si `respuesta` es la guardada de una lectura anterior."""
+    return isinstance(respuesta, RespuestaGuardada)
+
+
+def _clave(familia: str, url: str, kwargs: Dict[str, Any]) -> str:
+    # Por token: cada usuario ve sólo lo que el backend le devolvió a él
+    autorizacion = (kwargs.get("headers") or {}).get("Authorization", "")
+    params = kwargs.get("params") or ""
+    return f"{familia}:" + hashlib.sha1(f"{url}|{params}|{autorizacion}".encode()).hexdigest()
+
+
+def _fallo(r: Any, duracion: float) -> bool:
+    return r.status_code >= 500 or duracion > float(getattr(settings, "BACKEND_CIRCUITO_LENTO", 4))
+
+
+def _para_guardar(r: Any) -> Tuple[str, str]:
+    return r.text, r.headers.get("Content-Type") or "application/json"
+
+
+def _ttl() -> float:
+    return float(getattr(settings, "BACKEND_ULTIMA_TTL", 86400))
+
+
+def llamar(familia: str, method: str, url: str, timeout: float, vieja: bool = False, **kwargs: Any) -> Any:
+    """
+    requests.request() a la API backend por el circuito de `familia`, con
+    el timeout acotado al plazo del request. Con `vieja`, ante un circuito
+    abierto, un error de red o un 5xx devuelve la última respuesta buena
+    (si hay) en lugar de fallar.
+    """
+    circuito = _circuito(familia)
+    clave = _clave(familia, url, kwargs) if vieja else None
+    try:
+        sonda = circuito.permitir()
+    except CircuitoAbierto:
+        guardada = _ultima(clave)
+        if guardada is None:
+            raise
+        return guardada
+
+    t0 = time.monotonic()
+    try:
+        r = requests.request(method, url, timeout=plazos.restante(timeout), **kwargs)
+    except plazos.PlazoVencido:
+        circuito.liberar(sonda)
+        raise
+    except requests.RequestException:
+        circuito.registrar(sonda, exito=False)
+        guardada = _ultima(clave)
+        if guardada is None:
+            raise
+        return guardada
+    except BaseException:
+        circuito.liberar(sonda)
+        raise
+
+    circuito.registrar(sonda, exito=not _fallo(r, time.monotonic() - t0))
+    if clave is not None:
+        if r.status_code == 200:
+            texto, content_type = _para_guardar(r)
+            _ultimas.set(clave, (texto, content_type, time.time()), ttl=_ttl())
+        elif r.status_code >= 500:
+            return _ultima(clave) or r
+    return r
+
+
+async def allamar(familia: str, method: str, url: str, timeout: float, vieja: bool = False, **kwargs: Any) -> Any:
+    """Versión async de llamar(), para las vistas `async def`."""
+    from .bonita_client_async import pedir
+
+    circuito = _circuito(familia)
+    clave = _clave(familia, url, kwargs) if vieja else None
+    try:
+        sonda = circuito.permitir()
+    except CircuitoAbierto:
+        guardada = await _aultima(clave)
+        if guardada is None:
+            raise
+        return guardada
+
+    t0 = time.monotonic()
+    try:
+        r = await pedir(method, url, timeout=plazos.restante(timeout), **kwargs)
+    except plazos.PlazoVencido:
+        circuito.liberar(sonda)
+        raise
+    except Exception:
+        # Error de red (de requests o de httpx)
+        circuito.registrar(sonda, exito=False)
+        guardada = await _aultima(clave)
+        if guardada is None:
+            raise
+        return guardada
+    except BaseException:
+        # Cancelada (el cliente se desconectó): no dice nada del backend
+        circuito.liberar(sonda)
+        raise
+
+    circuito.registrar(sonda, exito=not _fallo(r, time.monotonic() - t0))
+    if clave is not None:
+        if r.status_code == 200:
+            texto, content_type = _para_guardar(r)
+            await _ultimas.aset(clave, (texto, content_type, time.time()), ttl=_ttl())
+        elif r.status_code >= 500:
+            return await _aultima(clave) or r
+    return r
+
+
+def _ultima(clave: Optional[str]) -> Optional[RespuestaGuardada]:
+    if clave is None:
+        return None
+    guardada = _ultimas.get(clave)
+    return RespuestaGuardada(*guardada) if guardada else None
+
+
+async def _aultima(clave: Optional[str]) -> Optional[RespuestaGuardada]:
+    if clave is None:
+        return None
+    guardada = await _ultimas.aget(clave)
+    return RespuestaGuardada(*guardada) if guardada else None
+
+
+def metricas() -> Dict[str, Any]:
+    return {familia: circuito.metricas() for familia, circuito in _circuitos.items()}
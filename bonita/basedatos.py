@@ -0,0 +1,54 @@
+# bonita/basedatos.py
+"""
+Ajustes de conexión a la base de datos.
+
+SQLite no tiene opciones de conexión para journal_mode, synchronous ni
+busy_timeout: son PRAGMAs que hay que ejecutar al abrir cada conexión.
+configurar_conexion() se engancha a la señal connection_created (ver
+BonitaConfig.ready) y aplica los de DATABASES[alias]["PRAGMAS"].
+
+Además, con DATABASES[alias]["TRANSACCIONES"] = "immediate" las
+transacciones empiezan con BEGIN IMMEDIATE (toman el lock de escritura al
+empezar). Con el BEGIN por defecto, una transacción que lee y después
+escribe (update_or_create) falla con "database is locked" sin esperar
+busy_timeout si otra ya está escribiendo. Django 5.1 trae esto como
+OPTIONS["transaction_mode"]; acá se hace a mano para 5.0.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+# Valores aceptados (los PRAGMAs no admiten parámetros: se validan antes
+# de armar el SQL)
+_VALORES = {
+    "journal_mode": {"delete", "truncate", "persist", "memory", "wal", "off"},
+    "synchronous": {"off", "normal", "full", "extra"},
+}
+_MODOS_TRANSACCION = {"deferred", "immediate", "exclusive"}
+
+
+def configurar_conexion(sender: Any, connection: Any, **kwargs: Any) -> None:
+    if connection.vendor != "sqlite":
+        return
+
+    modo = str(connection.settings_dict.get("TRANSACCIONES") or "deferred").lower()
+    if modo not in _MODOS_TRANSACCION:
+        print(f"Advertencia: modo de transacción inválido: {modo!r}")
+    elif modo != "deferred":
+        begin = f"BEGIN {modo.upper()}"
+        connection._start_transaction_under_autocommit = lambda: connection.cursor().execute(begin)
+
+    pragmas = connection.settings_dict.get("PRAGMAS") or {}
+    with connection.cursor() as cursor:
+        for nombre, valor in pragmas.items():
+            if nombre in _VALORES:
+                valor = str(valor).lower()
+                if valor not in _VALORES[nombre]:
+                    print(f"Advertencia: valor inválido para PRAGMA {nombre}: {valor!r}")
+                    continue
+            elif nombre == "busy_timeout":
+                valor = int(valor)
+            else:
+                print(f"Advertencia: PRAGMA no soportado: {nombre}")
+                continue
+            cursor.execute(f"PRAGMA {nombre} = {valor}")
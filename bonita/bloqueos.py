@@ -0,0 +1,78 @@
+# bonita/bloqueos.py
+"""
+Locks entre workers sobre la base de datos.
+
+Bonita no tiene escrituras condicionales: dos workers que leen, modifican y
+escriben la misma variable de caso se pisan. bloqueo() serializa esas
+secciones con una fila de la tabla Bloqueo (clave única): el INSERT es
+atómico en SQLite y en PostgreSQL, así que sirve entre procesos y máquinas
+que comparten la base, sin servicios externos.
+
+No se mantiene una transacción abierta mientras se trabaja: la fila se
+inserta, se hace lo que haya que hacer (llamadas a Bonita incluidas) y se
+borra. Si un worker muere con el lock tomado, vence a los `ttl` segundos.
+
+La espera por el lock respeta el plazo del request (bonita/plazos.py): si
+se agota antes, PlazoVencido.
+"""
+from __future__ import annotations
+
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Iterator
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import plazos
+from .models import Bloqueo
+
+# Segundos entre intentos mientras otro tiene el lock
+_ESPERA = 0.1
+
+
+def _tomar(clave: str, dueno: str, ttl: float) -> bool:
+    ahora = timezone.now()
+    # Uno vencido quedó de un worker que murió: se descarta
+    Bloqueo.objects.filter(clave=clave, vence__lt=ahora).delete()
+    try:
+        with transaction.atomic():
+            Bloqueo.objects.create(clave=clave, dueno=dueno, vence=ahora + timedelta(seconds=ttl))
+    except IntegrityError:
+        return False
+    return True
+
+
+@contextmanager
+def bloqueo(clave: str, espera: float = 10.0, ttl: float = 30.0) -> Iterator[bool]:
+    """
+    Toma el lock `clave` esperando a lo sumo `espera` segundos (o lo que
+    quede del plazo del request). Devuelve (en el `as`) True si lo tomó; si
+    no, False y el que llama decide si sigue sin él. `ttl` tiene que
+    alcanzar para la sección protegida.
+    """
+    dueno = uuid.uuid4().hex
+    try:
+        limite = time.monotonic() + plazos.restante(espera)
+        tomado = _tomar(clave, dueno, ttl)
+        while not tomado and time.monotonic() < limite:
+            plazos.dormir(min(_ESPERA, max(0.0, limite - time.monotonic())))
+            tomado = _tomar(clave, dueno, ttl)
+        if not tomado:
+            plazos.restante()  # si lo que cortó la espera fue el plazo, PlazoVencido
+    except plazos.PlazoVencido:
+        raise
+    except Exception as e:
+        # Sin la tabla no hay lock, pero tampoco se corta la vista
+        print(f"Advertencia: no se pudo tomar el lock {clave}: {e}")
+        tomado = False
+    try:
+        yield tomado
+    finally:
+        if tomado:
+            try:
+                Bloqueo.objects.filter(clave=clave, dueno=dueno).delete()
+            except Exception as e:
+                print(f"Advertencia: no se pudo liberar el lock {clave} (vence solo): {e}")
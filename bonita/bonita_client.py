@@ -1,23 +1,81 @@
+import hashlib
 import json
-from typing import Any, Dict, Optional
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
 
 import requests
 from django.conf import settings
 
+from . import casos, plazos
+from .admision import AdaptadorLimitado
+from .cache import CacheDosNiveles
+
+
+# Caches compartidos entre instancias del cliente y entre workers (ver
+# bonita/cache.py). Los TTL se leen de settings en cada uso.
+# - metadatos: procesos desplegados e ids de definición (cambian sólo al
+#   desplegar un .bos) e ids de usuario
+# - sesion: cookies y token CSRF de la sesión del usuario técnico
+# - tareas: task_id -> case_id de las tareas que esperamos, para avisar al
+#   modelo de lectura aunque la tarea la ejecute otro worker
+_metadatos = CacheDosNiveles("bonita:meta", ttl=300)
+_sesion = CacheDosNiveles("bonita:sesion", ttl=900)
+_tareas = CacheDosNiveles("bonita:tarea", ttl=3600)
+
+# Variables JSON ya decodificadas, por hash del texto crudo (LRU acotado a
+# BONITA_JSON_CACHE_SIZE entradas por worker). Los textos cortos no se
+# cachean: decodificarlos cuesta menos que hashearlos y guardarlos.
+_decodificados: "OrderedDict[bytes, Any]" = OrderedDict()
+_decodificados_lock = threading.Lock()
+_MIN_LARGO_CACHEABLE = 256
+_INVALIDO = object()
+
+
+def _decodificar(texto: str) -> Any:
+    """
+    json.loads tolerante a doble codificación ("\"[...]\"" -> [...]).
+    Devuelve _INVALIDO si el texto no es JSON.
+    """
+    try:
+        valor = json.loads(texto)
+    except ValueError:
+        return _INVALIDO
+    if isinstance(valor, str):
+        interno = valor.strip()
+        if interno[:1] in ("[", "{"):
+            try:
+                valor = json.loads(interno)
+            except ValueError:
+                pass
+    return valor
+
 
 class BonitaClient:
-    def __init__(self, timeout: float = 15.0) -> None:
+    def __init__(self, timeout: float = 15.0, prioridad: str = "interactivo") -> None:
+        """
+        `prioridad`: carril del control de admisión (bonita/admision.py):
+        "interactivo" (requests de usuarios), "fondo" o "masivo".
+        """
         self.s = requests.Session()
         self.base = settings.BONITA_BASE_URL.rstrip("/")
         self.api = f"{self.base}/API"
         self._csrf: Optional[str] = None
         self._timeout = timeout
+        self.logueado = False
 
         # Headers por defecto para todas las requests a Bonita
         self.s.headers.update({
             "Accept": "application/json",
             "User-Agent": "pp-front/bonita-client",
         })
+        # La sesión puede venir del cache y estar vencida: ante un 401 se
+        # vuelve a loguear y se repite la request una vez
+        self.s.hooks["response"].append(self._reintentar_sin_sesion)
+        # Toda llamada a Bonita pasa por el control de admisión del worker,
+        # en el carril de su prioridad
+        self.prioridad = prioridad
+        self.s.mount(self.base, AdaptadorLimitado(prioridad))
 
     def _h(self) -> Dict[str, str]:
         """
@@ -26,6 +84,10 @@ class BonitaClient:
         """
         return {"X-Bonita-API-Token": self._csrf} if self._csrf else {}
 
+    def _plazo(self) -> float:
+        """Timeout de la próxima llamada: el del cliente, acotado al plazo del request."""
+        return plazos.restante(self._timeout)
+
     def _json(self, r: requests.Response):
         """
         Devuelve el cuerpo parseado como JSON si aplica,
@@ -43,12 +105,56 @@ class BonitaClient:
 
         return None
 
+    def _paginar(self, recurso: str, filtros: List[tuple], tamanio: int = 100) -> List[Dict[str, Any]]:
+        """
+        Trae todos los resultados de una búsqueda de Bonita, página por página.
+        """
+        resultados: List[Dict[str, Any]] = []
+        page = 0
+        while True:
+            r = self.s.get(
+                f"{self.api}/{recurso}",
+                params=[("p", str(page)), ("c", str(tamanio))] + list(filtros),
+                headers=self._h(),
+                timeout=self._plazo(),
+            )
+            r.raise_for_status()
+            data = self._json(r) or []
+            resultados.extend(data)
+            if len(data) < tamanio:
+                return resultados
+            page += 1
+
+    def _total(self, r: requests.Response) -> Optional[int]:
+        """
+        Devuelve el total de resultados informado por Bonita en el header
+        Content-Range de las búsquedas paginadas ("0-0/42" -> 42),
+        o None si no viene.
+        """
+        rango = r.headers.get("Content-Range") or ""
+        _, _, total = rango.rpartition("/")
+        try:
+            return int(total)
+        except ValueError:
+            return None
+
     # --- Sesión ---
 
-    def login(self) -> None:
+    def login(self, forzar: bool = False) -> None:
         """
         Inicia sesión en Bonita y guarda el token CSRF en cookies.
+
+        Reutiliza la sesión cacheada (BONITA_SESION_TTL) salvo que se pida
+        `forzar`: un login por worker y por vencimiento, no uno por request.
         """
+        if not forzar:
+            guardada = _sesion.get("actual")
+            if guardada:
+                self.s.cookies.update(guardada["cookies"])
+                self._csrf = guardada["csrf"]
+                self.logueado = True
+                return
+
         r = self.s.post(
             f"{self.base}/loginservice",
             data={
@@ -56,18 +162,53 @@ class BonitaClient:
                 "password": settings.BONITA_PASSWORD,
                 "redirect": "false",
             },
-            timeout=self._timeout,
+            timeout=self._plazo(),
         )
         r.raise_for_status()
         self._csrf = self.s.cookies.get("X-Bonita-API-Token")
+        self.logueado = True
+        _sesion.set(
+            "actual",
+            {"cookies": self.s.cookies.get_dict(), "csrf": self._csrf},
+            ttl=float(getattr(settings, "BONITA_SESION_TTL", 900)),
+        )
+
+    def _reintentar_sin_sesion(self, r: requests.Response, *args: Any, **kwargs: Any) -> requests.Response:
+        """Hook de requests: 401 con sesión (quizás vencida) -> login y una repetición."""
+        if (
+                r.status_code != 401
+                or not self.logueado
+                or getattr(r.request, "_reintentada", False)
+                or r.request.url.startswith(f"{self.base}/loginservice")
+        ):
+            return r
+
+        _sesion.borrar("actual")
+        self.s.cookies.clear()
+        self.login(forzar=True)
+
+        nueva = r.request.copy()
+        nueva._reintentada = True
+        nueva.headers.pop("Cookie", None)
+        nueva.headers.update(self._h())
+        nueva.prepare_cookies(self.s.cookies)
+        return self.s.send(nueva, **kwargs)
 
     # --- Procesos / tareas ---
 
     def get_process_definition_id(self, name: str, version: str) -> Optional[str]:
         """
         Devuelve el ID de definición de proceso dado un nombre y versión,
-        o None si no se encuentra.
+        o None si no se encuentra. Se cachea BONITA_PROCESS_CACHE_TTL segundos.
         """
+        return _metadatos.obtener(
+            f"proceso:{name}:{version}",
+            lambda: self._buscar_process_definition_id(name, version),
+            ttl=float(getattr(settings, "BONITA_PROCESS_CACHE_TTL", 300)),
+            guardar_si=lambda valor: valor is not None,
+        )
+
+    def _buscar_process_definition_id(self, name: str, version: str) -> Optional[str]:
         r = self.s.get(
             f"{self.api}/bpm/process",
             params=[
@@ -77,12 +218,23 @@ class BonitaClient:
                 ("f", f"version={version}"),
             ],
             headers=self._h(),
-            timeout=self._timeout,
+            timeout=self._plazo(),
         )
         r.raise_for_status()
         data = self._json(r) or []
         return data[0]["id"] if data else None
 
+    def list_processes(self) -> List[Dict[str, Any]]:
+        """
+        Devuelve todas las definiciones de proceso desplegadas.
+        El resultado se cachea BONITA_PROCESS_CACHE_TTL segundos.
+        """
+        return _metadatos.obtener(
+            "procesos",
+            lambda: self._paginar("bpm/process", []),
+            ttl=float(getattr(settings, "BONITA_PROCESS_CACHE_TTL", 300)),
+        )
+
     def instantiate_process(self, proc_id: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
         Instancia un proceso en Bonita con el contrato dado (payload).
@@ -91,7 +243,7 @@ class BonitaClient:
             f"{self.api}/bpm/process/{proc_id}/instantiation",
             json=payload,
             headers=self._h(),
-            timeout=self._timeout,
+            timeout=self._plazo(),
         )
         r.raise_for_status()
         return self._json(r)
@@ -107,6 +259,7 @@ class BonitaClient:
         Espera hasta que haya una tarea humana en estado 'ready'
         para el case_id dado. Si task_name no es None, filtra por nombre.
         Devuelve el primer objeto tarea encontrado o None si vence el timeout.
+        Si antes se agota el plazo del request lanza plazos.PlazoVencido.
         """
         import time
 
@@ -125,25 +278,36 @@ class BonitaClient:
                 f"{self.api}/bpm/humanTask",
                 params=params,
                 headers=self._h(),
-                timeout=self._timeout,
+                timeout=self._plazo(),
             )
             r.raise_for_status()
             tasks = self._json(r) or []
             if tasks:
+                _tareas.set(str(tasks[0].get("id")), str(case_id))
+                casos.registrar_tarea(str(case_id), tasks[0])
                 return tasks[0]
-            time.sleep(interval_sec)
+            plazos.dormir(interval_sec)
 
         return None
 
     def get_user_id_by_username(self, username: str) -> Optional[str]:
         """
         Devuelve el ID del usuario de Bonita a partir del userName.
+        Se cachea BONITA_USUARIOS_CACHE_TTL segundos.
         """
+        return _metadatos.obtener(
+            f"usuario:{username}",
+            lambda: self._buscar_user_id(username),
+            ttl=float(getattr(settings, "BONITA_USUARIOS_CACHE_TTL", 3600)),
+            guardar_si=lambda valor: valor is not None,
+        )
+
+    def _buscar_user_id(self, username: str) -> Optional[str]:
         r = self.s.get(
             f"{self.api}/identity/user",
             params=[("f", f"userName={username}")],
             headers=self._h(),
-            timeout=self._timeout,
+            timeout=self._plazo(),
         )
         r.raise_for_status()
         data = self._json(r) or []
@@ -157,7 +321,7 @@ class BonitaClient:
             f"{self.api}/bpm/humanTask/{task_id}",
             json={"assigned_id": user_id},
             headers=self._h(),
-            timeout=self._timeout,
+            timeout=self._plazo(),
         )
         r.raise_for_status()
 
@@ -169,11 +333,23 @@ class BonitaClient:
             f"{self.api}/bpm/userTask/{task_id}/execution",
             json=contract,
             headers=self._h(),
-            timeout=self._timeout,
+            timeout=self._plazo(),
         )
         r.raise_for_status()
+
+        case_id = _tareas.get(str(task_id))
+        if case_id:
+            _tareas.borrar(str(task_id))
+            casos.marcar_sucio(case_id)
+
         return self._json(r)
 
+    def list_ready_tasks(self) -> List[Dict[str, Any]]:
+        """
+        Todas las tareas humanas en estado 'ready' (de todos los casos).
+        """
+        return self._paginar("bpm/humanTask", [("f", "state=ready")])
+
     # --- Casos ---
 
     def get_case(self, case_id: str) -> Optional[Dict[str, Any]]:
@@ -184,15 +360,49 @@ class BonitaClient:
         r = self.s.get(
             f"{self.api}/bpm/case/{case_id}",
             headers=self._h(),
-            timeout=self._timeout,
+            timeout=self._plazo(),
         )
         if r.status_code == 404:
             return None
         r.raise_for_status()
         return self._json(r)
 
+    def count_cases(self, **filtros: str) -> int:
+        """
+        Cuenta los casos abiertos que cumplen los filtros (p. ej. state="started",
+        processDefinitionId="...") sin descargarlos: pide una sola fila y lee
+        el total del header Content-Range.
+        """
+        params = [("p", "0"), ("c", "1")]
+        params += [("f", f"{k}={v}") for k, v in filtros.items()]
+        r = self.s.get(
+            f"{self.api}/bpm/case",
+            params=params,
+            headers=self._h(),
+            timeout=self._plazo(),
+        )
+        r.raise_for_status()
+        total = self._total(r)
+        if total is None:
+            # Bonita sin Content-Range: lo mejor que podemos hacer es la página
+            total = len(self._json(r) or [])
+        return total
+
+    def list_cases(self, **filtros: str) -> List[Dict[str, Any]]:
+        """
+        Todos los casos abiertos que cumplen los filtros (p. ej. state="started").
+        """
+        return self._paginar("bpm/case", [("f", f"{k}={v}") for k, v in filtros.items()])
+
     # --- Variables del caso ---
 
+    def get_case_variables(self, case_id: str) -> List[Dict[str, Any]]:
+        """
+        Todas las variables de un caso en una sola búsqueda
+        (en lugar de un GET por variable).
+        """
+        return self._paginar("bpm/caseVariable", [("f", f"case_id={case_id}")])
+
     def get_case_variable(self, case_id: str, var_name: str) -> Optional[Dict[str, Any]]:
         """
         Devuelve el objeto variable de caso (incluye tipo y valor) o None si no existe.
@@ -200,26 +410,28 @@ class BonitaClient:
         r = self.s.get(
             f"{self.api}/bpm/caseVariable/{case_id}/{var_name}",
             headers=self._h(),
-            timeout=self._timeout,
+            timeout=self._plazo(),
         )
         if r.status_code == 404:
             return None
         r.raise_for_status()
         return self._json(r)
 
-    def update_case_variable(self, case_id: str, var_name: str, value: Any) -> None:
+    def update_case_variable(
+            self, case_id: str, var_name: str, value: Any, var_type: Optional[str] = None
+    ) -> None:
         """
         Actualiza una variable de caso existente usando el tipo real
         que ya tiene en Bonita.
 
-        Lee primero la variable para conocer el 'type' y luego hace PUT
-        con ese mismo tipo y el nuevo valor.
+        Si no se pasa `var_type`, lee primero la variable para conocer el
+        'type' y luego hace PUT con ese mismo tipo y el nuevo valor.
         """
-        current = self.get_case_variable(case_id, var_name)
-        if not current:
-            raise ValueError(f"Variable de caso '{var_name}' no encontrada en case {case_id}")
-
-        var_type = current.get("type") or "java.lang.String"
+        if not var_type:
+            current = self.get_case_variable(case_id, var_name)
+            if not current:
+                raise ValueError(f"Variable de caso '{var_name}' no encontrada en case {case_id}")
+            var_type = current.get("type") or "java.lang.String"
 
         payload = {
             "type": var_type,
@@ -230,6 +442,71 @@ class BonitaClient:
             f"{self.api}/bpm/caseVariable/{case_id}/{var_name}",
             json=payload,
             headers=self._h(),
-            timeout=self._timeout,
+            timeout=self._plazo(),
         )
         r.raise_for_status()
+
+        casos.guardar_variable(case_id, var_name, var_type, value)
+
+    # --- Decodificación de variables JSON ---
+
+    @staticmethod
+    def decode_json(raw: Any, expected: Optional[type] = None, default: Any = None) -> Any:
+        """
+        Decodifica el valor de una variable de caso que guarda JSON.
+
+        - Acepta valores doblemente codificados (un string JSON que a su vez
+          contiene el arreglo/objeto).
+        - Vacío, "null" o JSON inválido -> `default`.
+        - Si se pide `expected` (list, dict, ...) y el resultado es de otro
+          tipo -> `default`.
+
+        Los textos largos se memoizan por hash en un LRU compartido: el mismo
+        valor no se decodifica dos veces en un worker. El objeto devuelto es
+        COMPARTIDO; quien necesite modificarlo tiene que copiarlo antes.
+        """
+        if not isinstance(raw, str):
+            valor = raw
+        else:
+            texto = raw.strip()
+            if not texto or texto.lower() == "null":
+                return default
+
+            if len(texto) < _MIN_LARGO_CACHEABLE:
+                valor = _decodificar(texto)
+            else:
+                clave = hashlib.blake2b(texto.encode("utf-8"), digest_size=16).digest()
+                with _decodificados_lock:
+                    valor = _decodificados.get(clave, _INVALIDO)
+                    if valor is not _INVALIDO:
+                        _decodificados.move_to_end(clave)
+                if valor is _INVALIDO:
+                    valor = _decodificar(texto)
+                    if valor is not _INVALIDO:
+                        maximo = int(getattr(settings, "BONITA_JSON_CACHE_SIZE", 256))
+                        with _decodificados_lock:
+                            _decodificados[clave] = valor
+                            while len(_decodificados) > maximo:
+                                _decodificados.popitem(last=False)
+
+        if valor is _INVALIDO or valor is None:
+            return default
+        if expected is not None and not isinstance(valor, expected):
+            return default
+        return valor
+
+    def get_case_variable_json(
+            self,
+            case_id: str,
+            var_name: str,
+            expected: Optional[type] = None,
+            default: Any = None,
+    ) -> Any:
+        """
+        Lee una variable de caso y la decodifica con decode_json().
+        Si la variable no existe devuelve `default`.
+        """
+        var = self.get_case_variable(case_id, var_name)
+        if not var:
+            return default
+        return self.decode_json(var.get("value"), expected, default)
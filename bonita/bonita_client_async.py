@@ -0,0 +1,337 @@
+# bonita/bonita_client_async.py
+"""
+Cliente async de la API REST de Bonita, para las vistas `async def`.
+
+Misma interfaz que BonitaClient (los métodos son corrutinas) y mismos
+caches compartidos (sesión, metadatos, tarea -> caso). Las esperas de
+wait_ready_task_in_case usan asyncio.sleep: mientras un usuario espera a
+que aparezca su tarea, el worker atiende a otros.
+
+HTTP: httpx.AsyncClient si está instalado (un pool de conexiones por event
+loop duradero, compartido entre instancias, ver bonita/bucle.py). Bajo
+WSGI cada vista async tiene un loop propio que se cierra con el request:
+ahí los pedidos se hacen en el loop de fondo, con su pool, en lugar de
+abrir un pool por request que nadie cierra. Sin httpx, requests en un hilo
+(asyncio.to_thread) con un Session compartido: funciona igual, pero cada
+request en curso ocupa un hilo.
+"""
+from __future__ import annotations
+
+import asyncio
+import http.cookiejar
+import weakref
+from typing import Any, Dict, List, Optional
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import bucle, casos, plazos
+from .admision import limitador
+from .bonita_client import BonitaClient, _metadatos, _sesion, _tareas
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - depende del entorno
+    httpx = None
+
+# Un pool httpx por event loop duradero (un AsyncClient no se puede usar
+# desde otro loop)
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+# Sin httpx: Session compartido sólo por el pool de conexiones. No guarda
+# cookies: cada cliente manda las suyas en el header.
+_sesion_requests = requests.Session()
+_sesion_requests.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+
+
+def _pool(loop: asyncio.AbstractEventLoop) -> Any:
+    pool = _pools.get(loop)
+    if pool is None:
+        maximo = int(getattr(settings, "BONITA_ASYNC_MAX_CONEXIONES", 100))
+        pool = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=maximo, max_keepalive_connections=maximo),
+        )
+        _pools[loop] = pool
+    return pool
+
+
+async def pedir(method: str, url: str, timeout: float = 15.0, **kwargs: Any) -> Any:
+    """
+    Request HTTP async. Acepta params/json/data/headers como requests y
+    devuelve una respuesta con status_code, headers, text, json(),
+    cookies y raise_for_status().
+    """
+    if httpx is not None:
+        loop = asyncio.get_running_loop()
+        if bucle.es_duradero(loop):
+            return await _pool(loop).request(method, url, timeout=timeout, **kwargs)
+        # Loop de un solo request (vista async bajo WSGI): el pedido va al
+        # loop de fondo. Si la vista se cancela, se cancela también el pedido.
+        return await asyncio.wrap_future(bucle.en_fondo(pedir(method, url, timeout=timeout, **kwargs)))
+    return await asyncio.to_thread(_sesion_requests.request, method, url, timeout=timeout, **kwargs)
+
+
+class AsyncBonitaClient:
+    # La decodificación no hace I/O: es la misma del cliente sincrónico
+    decode_json = staticmethod(BonitaClient.decode_json)
+
+    def __init__(self, timeout: float = 15.0, prioridad: str = "interactivo") -> None:
+        limitador.lugar(prioridad)  # valida el carril
+        self.prioridad = prioridad
+        self.base = settings.BONITA_BASE_URL.rstrip("/")
+        self.api = f"{self.base}/API"
+        self._csrf: Optional[str] = None
+        self._cookies: Dict[str, str] = {}
+        self._timeout = timeout
+        self.logueado = False
+
+    def _h(self) -> Dict[str, str]:
+        """Headers de cada request: los por defecto, cookies de sesión y token CSRF."""
+        headers = {
+            "Accept": "application/json",
+            "User-Agent": "pp-front/bonita-client",
+        }
+        if self._cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self._cookies.items())
+        if self._csrf:
+            headers["X-Bonita-API-Token"] = self._csrf
+        return headers
+
+    async def _pedir(self, method: str, recurso: str, **kwargs: Any) -> Any:
+        """
+        Request a la API. Ante un 401 con sesión (quizás vencida, venía del
+        cache) vuelve a loguearse y la repite una vez.
+        """
+        url = f"{self.api}/{recurso}"
+        r = await self._llamar(method, url, headers=self._h(), **kwargs)
+        if r.status_code == 401 and self.logueado:
+            await _sesion.aborrar("actual")
+            await self.login(forzar=True)
+            r = await self._llamar(method, url, headers=self._h(), **kwargs)
+        return r
+
+    async def _llamar(self, method: str, url: str, **kwargs: Any) -> Any:
+        """Una llamada a Bonita, por el control de admisión y dentro del plazo."""
+        async with limitador.lugar(self.prioridad):
+            return await pedir(method, url, timeout=plazos.restante(self._timeout), **kwargs)
+
+    @staticmethod
+    def _json(r: Any):
+        """Cuerpo JSON o None (mismo criterio que BonitaClient._json)."""
+        if r.status_code == 204:
+            return None
+        ct = (r.headers.get("Content-Type") or "")
+        if ct.startswith("application/json") and r.text.strip():
+            try:
+                return r.json()
+            except ValueError:
+                return None
+        return None
+
+    async def _paginar(self, recurso: str, filtros: List[tuple], tamanio: int = 100) -> List[Dict[str, Any]]:
+        resultados: List[Dict[str, Any]] = []
+        page = 0
+        while True:
+            r = await self._pedir(
+                "GET", recurso, params=[("p", str(page)), ("c", str(tamanio))] + list(filtros)
+            )
+            r.raise_for_status()
+            data = self._json(r) or []
+            resultados.extend(data)
+            if len(data) < tamanio:
+                return resultados
+            page += 1
+
+    # --- Sesión ---
+
+    async def login(self, forzar: bool = False) -> None:
+        """Igual que BonitaClient.login(): reutiliza la sesión cacheada salvo `forzar`."""
+        if not forzar:
+            guardada = await _sesion.aget("actual")
+            if guardada:
+                self._cookies = dict(guardada["cookies"])
+                self._csrf = guardada["csrf"]
+                self.logueado = True
+                return
+
+        r = await self._llamar(
+            "POST",
+            f"{self.base}/loginservice",
+            data={
+                "username": settings.BONITA_USER,
+                "password": settings.BONITA_PASSWORD,
+                "redirect": "false",
+            },
+            headers={"User-Agent": "pp-front/bonita-client"},
+        )
+        r.raise_for_status()
+        self._cookies = dict(r.cookies)
+        self._csrf = self._cookies.get("X-Bonita-API-Token")
+        self.logueado = True
+        await _sesion.aset(
+            "actual",
+            {"cookies": self._cookies, "csrf": self._csrf},
+            ttl=float(getattr(settings, "BONITA_SESION_TTL", 900)),
+        )
+
+    # --- Procesos / tareas ---
+
+    async def get_process_definition_id(self, name: str, version: str) -> Optional[str]:
+        async def buscar() -> Optional[str]:
+            r = await self._pedir(
+                "GET", "bpm/process",
+                params=[("p", "0"), ("c", "5"), ("f", f"name={name}"), ("f", f"version={version}")],
+            )
+            r.raise_for_status()
+            data = self._json(r) or []
+            return data[0]["id"] if data else None
+
+        return await _metadatos.aobtener(
+            f"proceso:{name}:{version}",
+            buscar,
+            ttl=float(getattr(settings, "BONITA_PROCESS_CACHE_TTL", 300)),
+            guardar_si=lambda valor: valor is not None,
+        )
+
+    async def list_processes(self) -> List[Dict[str, Any]]:
+        return await _metadatos.aobtener(
+            "procesos",
+            lambda: self._paginar("bpm/process", []),
+            ttl=float(getattr(settings, "BONITA_PROCESS_CACHE_TTL", 300)),
+        )
+
+    async def instantiate_process(self, proc_id: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        r = await self._pedir("POST", f"bpm/process/{proc_id}/instantiation", json=payload)
+        r.raise_for_status()
+        return self._json(r)
+
+    async def wait_ready_task_in_case(
+            self,
+            case_id: str,
+            task_name: Optional[str] = None,
+            timeout_sec: float = 12.0,
+            interval_sec: float = 0.4,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Como BonitaClient.wait_ready_task_in_case(), sin bloquear el worker.
+        Si se cancela (bajo ASGI, el cliente se desconectó) deja de consultar
+        a Bonita en ese momento; si se agota el plazo del request lanza
+        plazos.PlazoVencido.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_sec
+        params: list[tuple[str, str]] = [
+            ("f", f"caseId={case_id}"),
+            ("f", "state=ready"),
+            ("p", "0"),
+            ("c", "10"),
+        ]
+        if task_name:
+            params.append(("f", f"name={task_name}"))
+
+        try:
+            while loop.time() < deadline:
+                r = await self._pedir("GET", "bpm/humanTask", params=params)
+                r.raise_for_status()
+                tasks = self._json(r) or []
+                if tasks:
+                    await _tareas.aset(str(tasks[0].get("id")), str(case_id))
+                    await sync_to_async(casos.registrar_tarea)(str(case_id), tasks[0])
+                    return tasks[0]
+                await plazos.adormir(interval_sec)
+        except asyncio.CancelledError:
+            print(f"Info: espera de tarea cancelada (cliente desconectado), caso {case_id}")
+            raise
+
+        return None
+
+    async def get_user_id_by_username(self, username: str) -> Optional[str]:
+        async def buscar() -> Optional[str]:
+            r = await self._pedir("GET", "identity/user", params=[("f", f"userName={username}")])
+            r.raise_for_status()
+            data = self._json(r) or []
+            return data[0]["id"] if data else None
+
+        return await _metadatos.aobtener(
+            f"usuario:{username}",
+            buscar,
+            ttl=float(getattr(settings, "BONITA_USUARIOS_CACHE_TTL", 3600)),
+            guardar_si=lambda valor: valor is not None,
+        )
+
+    async def assign_task(self, task_id: str, user_id: str) -> None:
+        r = await self._pedir("PUT", f"bpm/humanTask/{task_id}", json={"assigned_id": user_id})
+        r.raise_for_status()
+
+    async def execute_task(self, task_id: str, contract: Dict[str, Any]):
+        r = await self._pedir("POST", f"bpm/userTask/{task_id}/execution", json=contract)
+        r.raise_for_status()
+
+        case_id = await _tareas.aget(str(task_id))
+        if case_id:
+            await _tareas.aborrar(str(task_id))
+            await sync_to_async(casos.marcar_sucio)(case_id)
+
+        return self._json(r)
+
+    async def list_ready_tasks(self) -> List[Dict[str, Any]]:
+        return await self._paginar("bpm/humanTask", [("f", "state=ready")])
+
+    # --- Casos ---
+
+    async def get_case(self, case_id: str) -> Optional[Dict[str, Any]]:
+        r = await self._pedir("GET", f"bpm/case/{case_id}")
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        return self._json(r)
+
+    async def count_cases(self, **filtros: str) -> int:
+        params = [("p", "0"), ("c", "1")] + [("f", f"{k}={v}") for k, v in filtros.items()]
+        r = await self._pedir("GET", "bpm/case", params=params)
+        r.raise_for_status()
+        _, _, total = (r.headers.get("Content-Range") or "").rpartition("/")
+        try:
+            return int(total)
+        except ValueError:
+            return len(self._json(r) or [])
+
+    async def list_cases(self, **filtros: str) -> List[Dict[str, Any]]:
+        return await self._paginar("bpm/case", [("f", f"{k}={v}") for k, v in filtros.items()])
+
+    # --- Variables del caso ---
+
+    async def get_case_variables(self, case_id: str) -> List[Dict[str, Any]]:
+        return await self._paginar("bpm/caseVariable", [("f", f"case_id={case_id}")])
+
+    async def get_case_variable(self, case_id: str, var_name: str) -> Optional[Dict[str, Any]]:
+        r = await self._pedir("GET", f"bpm/caseVariable/{case_id}/{var_name}")
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        return self._json(r)
+
+    async def update_case_variable(
+            self, case_id: str, var_name: str, value: Any, var_type: Optional[str] = None
+    ) -> None:
+        if not var_type:
+            current = await self.get_case_variable(case_id, var_name)
+            if not current:
+                raise ValueError(f"Variable de caso '{var_name}' no encontrada en case {case_id}")
+            var_type = current.get("type") or "java.lang.String"
+
+        r = await self._pedir(
+            "PUT", f"bpm/caseVariable/{case_id}/{var_name}", json={"type": var_type, "value": value}
+        )
+        r.raise_for_status()
+
+        await sync_to_async(casos.guardar_variable)(case_id, var_name, var_type, value)
+
+    async def get_case_variable_json(
+            self, case_id: str, var_name: str, expected: Optional[type] = None, default: Any = None
+    ) -> Any:
+        var = await self.get_case_variable(case_id, var_name)
+        if not var:
+            return default
+        return self.decode_json(var.get("value"), expected, default)
@@ -0,0 +1,77 @@
+# bonita/bucle.py
+"""
+Event loop de fondo, que vive lo que el proceso.
+
+Bajo ASGI (uvicorn pp_front.asgi:application) todas las vistas async corren
+en el loop del servidor, que dura lo que el worker. Bajo WSGI Django corre
+cada vista async en un loop nuevo que se cierra al terminar el request: lo
+que quede atado a ese loop (un pool httpx, una tarea que tenía que seguir
+después de la respuesta) se pierde o queda abierto para siempre.
+
+- marcar_duradero(): pp_front/asgi.py marca el loop del servidor ASGI.
+- es_duradero(): True para el loop del servidor y para el de fondo.
+- loop(): loop de fondo, en un hilo daemon que se crea la primera vez.
+  Ahí van los pools httpx y el trabajo que tiene que sobrevivir al request
+  cuando la vista no corre en un loop duradero.
+- esperar(): espera desde el loop actual un futuro del loop de fondo sin
+  cancelarlo si la espera se cancela.
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+import weakref
+from typing import Any, Optional
+
+_duraderos: "weakref.WeakSet[asyncio.AbstractEventLoop]" = weakref.WeakSet()
+_fondo: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def marcar_duradero() -> None:
+    """El loop en curso vive lo que el proceso (el del servidor ASGI)."""
+    _duraderos.add(asyncio.get_running_loop())
+
+
+def es_duradero(loop: asyncio.AbstractEventLoop) -> bool:
+    return loop is _fondo or loop in _duraderos
+
+
+def loop() -> asyncio.AbstractEventLoop:
+    global _fondo
+    with _lock:
+        if _fondo is None:
+            nuevo = asyncio.new_event_loop()
+            threading.Thread(target=nuevo.run_forever, name="bonita-loop-fondo", daemon=True).start()
+            _fondo = nuevo
+        return _fondo
+
+
+def en_fondo(corrutina: Any) -> concurrent.futures.Future:
+    """Programa `corrutina` en el loop de fondo."""
+    return asyncio.run_coroutine_threadsafe(corrutina, loop())
+
+
+async def esperar(futuro: concurrent.futures.Future) -> Any:
+    """
+    Resultado de `futuro` (de en_fondo()). Si se cancela la espera, el
+    trabajo sigue en el loop de fondo; si el loop del request ya se cerró
+    cuando termina, el aviso se descarta.
+    """
+    actual = asyncio.get_running_loop()
+    listo = actual.create_future()
+
+    def avisar(_: concurrent.futures.Future) -> None:
+        def marcar() -> None:
+            if not listo.done():
+                listo.set_result(None)
+
+        try:
+            actual.call_soon_threadsafe(marcar)
+        except RuntimeError:
+            pass  # el loop del request ya terminó
+
+    futuro.add_done_callback(avisar)
+    await listo
+    return futuro.result()
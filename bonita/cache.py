@@ -0,0 +1,301 @@
+# bonita/cache.py
+"""
+Caches del front.
+
+- StaleWhileRevalidate: un único valor caro (el dashboard) por proceso.
+- CacheDosNiveles: valores con clave (metadatos de Bonita, sesión, límites
+  de observaciones, tarea -> caso) en un LRU en memoria delante del cache
+  compartido de Django (settings.CACHES), así todos los workers ven lo
+  mismo y un reinicio no arranca en frío.
+"""
+from __future__ import annotations
+
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+
+class StaleWhileRevalidate:
+    """
+    Cache de un único valor calculado con política stale-while-revalidate.
+
+    - Mientras el valor tenga menos de `ttl` segundos se devuelve tal cual.
+    - Pasado `ttl` (pero antes de `max_stale`) se devuelve el valor viejo
+      al instante y se dispara UN recálculo en segundo plano.
+    - Si no hay valor o es más viejo que `max_stale`, se calcula en el momento.
+
+    Los recálculos son single-flight: nunca hay dos corriendo a la vez,
+    por más requests concurrentes que lleguen.
+
+    Si `degradado(valor)` es verdadero (p. ej. se calculó con un servicio
+    caído), ese valor es fresco sólo `ttl_degradado` segundos.
+    """
+
+    def __init__(
+            self,
+            calcular: Callable[[], Any],
+            ttl: float,
+            max_stale: float,
+            ttl_degradado: Optional[float] = None,
+            degradado: Optional[Callable[[Any], bool]] = None,
+    ) -> None:
+        self._calcular = calcular
+        self._ttl_normal = ttl
+        self._ttl_degradado = ttl if ttl_degradado is None else min(ttl, ttl_degradado)
+        self._degradado = degradado
+        self._ttl = ttl
+        self._max_stale = max(max_stale, ttl)
+        self._valor: Any = None
+        self._calculado_en: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refrescando = False
+
+    def _edad(self) -> Optional[float]:
+        if self._calculado_en is None:
+            return None
+        return time.monotonic() - self._calculado_en
+
+    def obtener(self) -> Tuple[Any, float]:
+        """
+        Devuelve (valor, edad_en_segundos).
+        """
+        edad = self._edad()
+        if edad is not None and edad < self._ttl:
+            return self._valor, edad
+
+        if edad is not None and edad < self._max_stale:
+            # El valor se toma antes: el refresco puede reemplazarlo ya
+            valor = self._valor
+            self._refrescar_en_segundo_plano()
+            return valor, edad
+
+        # Sin valor utilizable: calculamos sincrónicamente, pero de a uno.
+        with self._lock:
+            edad = self._edad()
+            if edad is None or edad >= self._max_stale:
+                self._guardar(self._calcular())
+            return self._valor, self._edad() or 0.0
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._calculado_en = None
+
+    def _guardar(self, valor: Any) -> None:
+        degradado = self._degradado is not None and self._degradado(valor)
+        self._ttl = self._ttl_degradado if degradado else self._ttl_normal
+        self._valor = valor
+        self._calculado_en = time.monotonic()
+
+    def _refrescar_en_segundo_plano(self) -> None:
+        with self._lock:
+            if self._refrescando:
+                return
+            self._refrescando = True
+
+        threading.Thread(target=self._refrescar, daemon=True).start()
+
+    def _refrescar(self) -> None:
+        try:
+            valor = self._calcular()
+            with self._lock:
+                self._guardar(valor)
+        except Exception as e:
+            # Nos quedamos con el valor viejo; el próximo request reintenta
+            print(f"Error refrescando cache en segundo plano: {e}")
+        finally:
+            with self._lock:
+                self._refrescando = False
+            # El hilo abrió su propia conexión a la BD: la cerramos
+            connections.close_all()
+
+
+_FALTA = object()
+
+
+class CacheDosNiveles:
+    """
+    Cache con clave en dos niveles:
+
+    1. LRU en memoria del proceso (hasta BONITA_CACHE_LOCAL_TAMANIO
+       entradas, a lo sumo BONITA_CACHE_LOCAL_TTL segundos: es lo que tarda
+       un worker en ver un borrado hecho por otro).
+    2. El cache de Django configurado en CACHES (compartido entre workers
+       si el backend lo es).
+
+    obtener() protege contra estampidas con expiración anticipada
+    probabilística (XFetch): cada lectura puede decidir recalcular un poco
+    antes del vencimiento, con más probabilidad cuanto más cerca está y
+    cuanto más tardó el cálculo. Así un valor muy pedido lo renueva un solo
+    request antes de vencer, en vez de todos a la vez después.
+
+    Ningún error del cache compartido corta al que llama: se sigue sin él.
+    """
+
+    def __init__(self, prefijo: str, ttl: float, alias: str = "default") -> None:
+        self.prefijo = prefijo
+        self.ttl = ttl
+        self._alias = alias
+        self._local: "OrderedDict[str, Tuple[Any, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # --- Nivel local ---
+
+    def _local_get(self, clave: str) -> Any:
+        with self._lock:
+            entrada = self._local.get(clave)
+            if entrada is None:
+                return _FALTA
+            if entrada[2] <= time.time():
+                del self._local[clave]
+                return _FALTA
+            self._local.move_to_end(clave)
+            return entrada
+
+    def _local_set(self, clave: str, entrada: Tuple[Any, float, float]) -> None:
+        tamanio = int(getattr(settings, "BONITA_CACHE_LOCAL_TAMANIO", 512))
+        ttl_local = float(getattr(settings, "BONITA_CACHE_LOCAL_TTL", 5))
+        if tamanio <= 0:
+            return
+        valor, delta, vence = entrada
+        with self._lock:
+            self._local[clave] = (valor, delta, min(vence, time.time() + ttl_local))
+            self._local.move_to_end(clave)
+            while len(self._local) > tamanio:
+                self._local.popitem(last=False)
+
+    # --- Nivel compartido ---
+
+    def _clave(self, clave: str) -> str:
+        return f"{self.prefijo}:{clave}"
+
+    def _leer(self, clave: str) -> Any:
+        """(valor, delta, vence) del nivel local o compartido, o _FALTA."""
+        entrada = self._local_get(clave)
+        if entrada is not _FALTA:
+            return entrada
+        try:
+            entrada = caches[self._alias].get(self._clave(clave), _FALTA)
+        except Exception as e:
+            print(f"Advertencia: cache compartido no disponible: {e}")
+            return _FALTA
+        if entrada is not _FALTA:
+            if entrada[2] <= time.time():
+                return _FALTA
+            self._local_set(clave, entrada)
+        return entrada
+
+    # --- API ---
+
+    def get(self, clave: str, default: Any = None) -> Any:
+        entrada = self._leer(clave)
+        return default if entrada is _FALTA else entrada[0]
+
+    def set(self, clave: str, valor: Any, ttl: Optional[float] = None, delta: float = 0.0) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        entrada = (valor, delta, time.time() + ttl)
+        self._local_set(clave, entrada)
+        try:
+            caches[self._alias].set(self._clave(clave), entrada, timeout=max(1, math.ceil(ttl)))
+        except Exception as e:
+            print(f"Advertencia: cache compartido no disponible: {e}")
+
+    def borrar(self, clave: str) -> None:
+        with self._lock:
+            self._local.pop(clave, None)
+        try:
+            caches[self._alias].delete(self._clave(clave))
+        except Exception as e:
+            print(f"Advertencia: cache compartido no disponible: {e}")
+
+    def obtener(
+            self,
+            clave: str,
+            calcular: Callable[[], Any],
+            ttl: Optional[float] = None,
+            guardar_si: Callable[[Any], bool] = lambda valor: True,
+    ) -> Any:
+        """
+        Valor cacheado o calcular() (y guardarlo si `guardar_si(valor)`).
+        """
+        entrada = self._leer(clave)
+        if entrada is not _FALTA:
+            valor, delta, vence = entrada
+            beta = float(getattr(settings, "BONITA_CACHE_BETA", 1.0))
+            # -log(U) con U en (0, 1]: casi siempre chico, a veces grande
+            adelanto = -delta * beta * math.log(1.0 - random.random())
+            if time.time() + adelanto < vence:
+                return valor
+
+        t0 = time.monotonic()
+        valor = calcular()
+        if guardar_si(valor):
+            self.set(clave, valor, ttl=ttl, delta=time.monotonic() - t0)
+        return valor
+
+    # --- API async (vistas async): mismo comportamiento, el nivel
+    # compartido con los métodos async del cache de Django ---
+
+    async def _aleer(self, clave: str) -> Any:
+        entrada = self._local_get(clave)
+        if entrada is not _FALTA:
+            return entrada
+        try:
+            entrada = await caches[self._alias].aget(self._clave(clave), _FALTA)
+        except Exception as e:
+            print(f"Advertencia: cache compartido no disponible: {e}")
+            return _FALTA
+        if entrada is not _FALTA:
+            if entrada[2] <= time.time():
+                return _FALTA
+            self._local_set(clave, entrada)
+        return entrada
+
+    async def aget(self, clave: str, default: Any = None) -> Any:
+        entrada = await self._aleer(clave)
+        return default if entrada is _FALTA else entrada[0]
+
+    async def aset(self, clave: str, valor: Any, ttl: Optional[float] = None, delta: float = 0.0) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        entrada = (valor, delta, time.time() + ttl)
+        self._local_set(clave, entrada)
+        try:
+            await caches[self._alias].aset(self._clave(clave), entrada, timeout=max(1, math.ceil(ttl)))
+        except Exception as e:
+            print(f"Advertencia: cache compartido no disponible: {e}")
+
+    async def aborrar(self, clave: str) -> None:
+        with self._lock:
+            self._local.pop(clave, None)
+        try:
+            await caches[self._alias].adelete(self._clave(clave))
+        except Exception as e:
+            print(f"Advertencia: cache compartido no disponible: {e}")
+
+    async def aobtener(
+            self,
+            clave: str,
+            calcular: Callable[[], Awaitable[Any]],
+            ttl: Optional[float] = None,
+            guardar_si: Callable[[Any], bool] = lambda valor: True,
+    ) -> Any:
+        """Como obtener(), con `calcular` async."""
+        entrada = await self._aleer(clave)
+        if entrada is not _FALTA:
+            valor, delta, vence = entrada
+            beta = float(getattr(settings, "BONITA_CACHE_BETA", 1.0))
+            adelanto = -delta * beta * math.log(1.0 - random.random())
+            if time.time() + adelanto < vence:
+                return valor
+
+        t0 = time.monotonic()
+        valor = await calcular()
+        if guardar_si(valor):
+            await self.aset(clave, valor, ttl=ttl, delta=time.monotonic() - t0)
+        return valor
@@ -0,0 +1,223 @@
+# bonita/casos.py
+"""
+Modelo de lectura local de los casos de Bonita (tabla CasoBonita).
+
+Las pantallas de revisión/evaluación/monitoreo leen variables de caso que
+cambian poco (proyectosJson, pedidosJson, ...). En vez de ir a Bonita en
+cada request:
+
+- sincronizar(): lo corre `python manage.py sincronizar_casos --loop`.
+  Con consultas en bloque (casos activos, tareas 'ready') detecta qué casos
+  cambiaron de tarea y sólo de esos (y de los leídos hace más de
+  CASOS_LECTURA_MAX_EDAD: las variables también cambian sin cambiar de
+  tarea) vuelve a leer las variables (un GET por caso, no uno por
+  variable). Borra los casos que ya no están activos.
+- variable(): lo usan las vistas. Lee de la tabla si la fila está fresca;
+  si no (o está sucia), trae las variables de Bonita y actualiza la fila.
+- guardar_variable() / registrar_tarea() / marcar_sucio(): escrituras
+  propias (BonitaClient las llama al actualizar variables, esperar tareas
+  y ejecutarlas).
+
+Ningún error del modelo de lectura corta una vista: ante cualquier problema
+con la tabla se lee directo de Bonita.
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import CasoBonita, RespuestaIdempotente, VersionListado
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .bonita_client import BonitaClient
+
+# Variables de caso que se guardan localmente
+VARIABLES = (
+    "proyectosJson",
+    "pedidosJson",
+    "compromisosJson",
+    "code_compromisos",
+    "respuestasJson",
+    "proyectoId",
+    "rol",
+    "proyectoNombre",
+    "descripcion",
+    "planTrabajo",
+    "compromisosAceptadosJson",
+    # El token JWT del caso ("access") NO se guarda: las vistas lo leen de
+    # Bonita en el momento (variable() va a Bonita para lo que no está acá)
+)
+
+
+def _max_edad() -> float:
+    return float(getattr(settings, "CASOS_LECTURA_MAX_EDAD", 30))
+
+
+def _filtrar(variables: Any) -> Dict[str, Dict[str, Any]]:
+    """Lista de variables de Bonita -> {nombre: {"type", "value"}} sólo de VARIABLES."""
+    resultado: Dict[str, Dict[str, Any]] = {}
+    for v in variables or []:
+        nombre = v.get("name") if isinstance(v, dict) else None
+        if nombre in VARIABLES:
+            resultado[nombre] = {"type": v.get("type"), "value": v.get("value")}
+    return resultado
+
+
+def _refrescar(cli: "BonitaClient", case_id: str, **campos: Any) -> Dict[str, Dict[str, Any]]:
+    """Trae las variables del caso de Bonita y reescribe la fila."""
+    variables = _filtrar(cli.get_case_variables(case_id))
+    try:
+        CasoBonita.objects.update_or_create(
+            case_id=case_id,
+            defaults={"variables": variables, "sucio": False, "sincronizado_en": timezone.now(), **campos},
+        )
+    except Exception as e:
+        print(f"Advertencia: no se pudo guardar el caso {case_id} en el modelo de lectura: {e}")
+    return variables
+
+
+# --------------------------- Lectura ---------------------------
+
+def variable(case_id: str, nombre: str, cli: Optional["BonitaClient"] = None) -> Optional[Dict[str, Any]]:
+    """
+    Mismo contrato que BonitaClient.get_case_variable(): {"type", "value"}
+    o None si la variable no existe en el caso.
+
+    Sólo va a Bonita (logueando `cli` si hace falta) cuando la fila no
+    existe, está sucia o es más vieja que CASOS_LECTURA_MAX_EDAD.
+    """
+    if nombre not in VARIABLES:
+        cli = _cliente(cli)
+        return cli.get_case_variable(case_id, nombre)
+
+    variables = variables_frescas(case_id)
+    if variables is not None:
+        return variables.get(nombre)
+
+    return _refrescar(_cliente(cli), case_id).get(nombre)
+
+
+def variables_frescas(case_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Variables guardadas del caso si la fila está al día (existe, no está
+    sucia y tiene menos de CASOS_LECTURA_MAX_EDAD); si no, None.
+    Nunca va a Bonita.
+    """
+    try:
+        fila = CasoBonita.objects.filter(case_id=case_id).first()
+    except Exception as e:
+        print(f"Advertencia: modelo de lectura no disponible: {e}")
+        return None
+
+    limite = timezone.now() - timedelta(seconds=_max_edad())
+    if fila is None or fila.sucio or fila.sincronizado_en < limite:
+        return None
+    return fila.variables or {}
+
+
+def _cliente(cli: Optional["BonitaClient"]) -> "BonitaClient":
+    if cli is None:
+        from .bonita_client import BonitaClient
+
+        cli = BonitaClient()
+    if not cli.logueado:
+        cli.login()
+    return cli
+
+
+# --------------------------- Escrituras propias ---------------------------
+
+def guardar_variable(case_id: str, nombre: str, tipo: Optional[str], valor: Any) -> None:
+    """Write-through de una variable que acabamos de actualizar en Bonita."""
+    if nombre not in VARIABLES:
+        return
+    try:
+        fila = CasoBonita.objects.filter(case_id=case_id).first()
+        if fila is None:
+            return
+        fila.variables = {**(fila.variables or {}), nombre: {"type": tipo, "value": valor}}
+        fila.save(update_fields=["variables"])
+    except Exception as e:
+        print(f"Advertencia: no se pudo actualizar el modelo de lectura del caso {case_id}: {e}")
+
+
+def registrar_tarea(case_id: str, tarea: Dict[str, Any]) -> None:
+    """
+    Anota la tarea 'ready' que acabamos de ver en Bonita. Si es otra que la
+    guardada, el caso avanzó (quizás fuera de este front): queda sucio.
+    """
+    tarea_id = str(tarea.get("id") or "")
+    try:
+        CasoBonita.objects.filter(case_id=case_id).exclude(tarea_id=tarea_id).update(
+            tarea_id=tarea_id,
+            tarea_nombre=tarea.get("name") or "",
+            sucio=True,
+        )
+    except Exception as e:
+        print(f"Advertencia: no se pudo actualizar el modelo de lectura del caso {case_id}: {e}")
+
+
+def marcar_sucio(case_id: str) -> None:
+    """Ejecutamos una tarea del caso: sus variables pueden haber cambiado."""
+    try:
+        CasoBonita.objects.filter(case_id=case_id).update(sucio=True, tarea_id="", tarea_nombre="")
+    except Exception as e:
+        print(f"Advertencia: no se pudo actualizar el modelo de lectura del caso {case_id}: {e}")
+
+
+# --------------------------- Sincronización ---------------------------
+
+def sincronizar(cli: "BonitaClient", completo: bool = False) -> Dict[str, int]:
+    """
+    Pone la tabla al día con Bonita.
+
+    Siempre: 1 búsqueda paginada de casos activos + 1 de tareas 'ready'.
+    Además, un GET de variables por cada caso nuevo, sucio, con tarea
+    distinta a la guardada o leído hace más de CASOS_LECTURA_MAX_EDAD, o
+    por todos si `completo`.
+
+    sincronizado_en es la hora de la última lectura de las variables: sólo
+    se actualiza al releerlas (si no, variables_frescas() daría por frescas
+    variables que nadie volvió a mirar).
+    """
+    activos = {str(c.get("id")): c for c in cli.list_cases(state="started")}
+
+    tareas: Dict[str, Dict[str, Any]] = {}
+    for t in cli.list_ready_tasks():
+        case_id = str(t.get("rootCaseId") or t.get("caseId") or "")
+        if case_id and case_id not in tareas:
+            tareas[case_id] = t
+
+    filas = {f.case_id: f for f in CasoBonita.objects.filter(case_id__in=list(activos))}
+
+    refrescados = 0
+    ahora = timezone.now()
+    limite = ahora - timedelta(seconds=_max_edad())
+    for case_id, caso in activos.items():
+        tarea = tareas.get(case_id) or {}
+        tarea_id = str(tarea.get("id") or "")
+        campos = {
+            "proceso_id": str(caso.get("processDefinitionId") or ""),
+            "tarea_id": tarea_id,
+            "tarea_nombre": tarea.get("name") or "",
+        }
+
+        fila = filas.get(case_id)
+        if (completo or fila is None or fila.sucio or fila.tarea_id != tarea_id
+                or fila.sincronizado_en < limite):
+            _refrescar(cli, case_id, **campos)
+            refrescados += 1
+        else:
+            CasoBonita.objects.filter(pk=fila.pk).update(**campos)
+
+    borrados, _ = CasoBonita.objects.exclude(case_id__in=list(activos)).delete()
+    # Las versiones de listados (bonita/deltas.py) de casos cerrados ya no sirven
+    VersionListado.objects.exclude(case_id__in=list(activos)).delete()
+    # Respuestas guardadas por Idempotency-Key (bonita/idempotencia.py) vencidas
+    ttl = float(getattr(settings, "IDEMPOTENCIA_TTL", 86400))
+    RespuestaIdempotente.objects.filter(creado_en__lt=ahora - timedelta(seconds=ttl)).delete()
+
+    return {"activos": len(activos), "refrescados": refrescados, "borrados": borrados}
@@ -0,0 +1,182 @@
+# bonita/deltas.py
+"""
+Respuestas delta para los clientes que hacen polling.
+
+Cada listado de un caso (compromisos, pedidos, observaciones de un
+proyecto) tiene una versión (VersionListado) y un hash por elemento
+(ElementoListado). Las vistas registran el listado actual en cada
+respuesta y devuelven un token de versión; si el cliente manda ese token
+en ?since=, recibe sólo los elementos agregados o modificados desde
+entonces y las claves de los eliminados (o nada, si no cambió).
+
+Los elementos se identifican por su "id"; los que no tienen id, por el
+hash de su contenido (un cambio se ve como baja + alta). Las respuestas
+delta mandan la clave de cada elemento cambiado ("claves") y el orden
+completo de las claves ("orden"): el cliente no tiene que adivinarlas.
+
+El token es "<id del listado>.<versión>": un token de otro caso/listado,
+de una versión futura o mal formado se ignora y se responde completo.
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from django.db import transaction
+
+from .models import ElementoListado, VersionListado
+from .respuestas import dumps
+
+
+def _hash(contenido: Any) -> str:
+    if isinstance(contenido, str):
+        contenido = contenido.encode("utf-8")
+    elif not isinstance(contenido, bytes):
+        contenido = dumps(contenido)
+    return hashlib.blake2b(contenido, digest_size=16).hexdigest()
+
+
+def claves(items: List[Any]) -> List[str]:
+    """Clave de cada elemento (id, o hash si no tiene); repetidas -> sufijo #n."""
+    claves: List[str] = []
+    vistas: Dict[str, int] = {}
+    for item in items:
+        ident = item.get("id") if isinstance(item, dict) else None
+        clave = str(ident) if ident is not None else f"h:{_hash(item)}"
+        n = vistas.get(clave, 0)
+        vistas[clave] = n + 1
+        claves.append(clave if n == 0 else f"{clave}#{n}")
+    return claves
+
+
+def token(version: VersionListado) -> str:
+    return f"{version.pk}.{version.version}"
+
+
+def _lista(items: Union[List[Any], Callable[[], List[Any]]]) -> List[Any]:
+    items = items() if callable(items) else items
+    return items if isinstance(items, list) else []
+
+
+def registrar(
+        case_id: str,
+        listado: str,
+        items: Union[List[Any], Callable[[], List[Any]]],
+        raw: Optional[str] = None,
+) -> VersionListado:
+    """
+    Compara `items` con lo registrado y sube la versión si algo cambió.
+
+    `raw` (el texto JSON original, si lo hay) evita serializar para
+    detectar el caso "no cambió nada", que es el más común; con `raw`,
+    `items` puede ser una función que decodifica sólo si hace falta.
+
+    Ese caso se resuelve con una lectura simple: la transacción (que en
+    SQLite toma el lock de escritura) se abre sólo si el contenido cambió
+    o el listado no estaba registrado.
+    """
+    hash_contenido = _hash(raw if raw is not None else _lista(items))
+
+    version = VersionListado.objects.filter(case_id=case_id, listado=listado).first()
+    if version is not None and version.hash_contenido == hash_contenido:
+        return version
+
+    with transaction.atomic():
+        version, _ = VersionListado.objects.select_for_update().get_or_create(
+            case_id=case_id, listado=listado
+        )
+        # Otro request pudo registrar el mismo contenido mientras tanto
+        if version.hash_contenido == hash_contenido:
+            return version
+
+        items = _lista(items)
+        existentes = {e.clave: e for e in version.elementos.all()}
+        nueva = version.version + 1
+        crear: List[ElementoListado] = []
+        actualizar: List[ElementoListado] = []
+        claves_items = claves(items)
+
+        for clave, item in zip(claves_items, items):
+            h = _hash(item)
+            elemento = existentes.get(clave)
+            if elemento is None:
+                crear.append(ElementoListado(listado=version, clave=clave, hash=h, version=nueva))
+            elif elemento.hash != h or elemento.eliminado:
+                elemento.hash, elemento.version, elemento.eliminado = h, nueva, False
+                actualizar.append(elemento)
+
+        presentes = set(claves_items)
+        for clave, elemento in existentes.items():
+            if clave not in presentes and not elemento.eliminado:
+                elemento.version, elemento.eliminado = nueva, True
+                actualizar.append(elemento)
+
+        if crear:
+            ElementoListado.objects.bulk_create(crear)
+        if actualizar:
+            ElementoListado.objects.bulk_update(actualizar, ["hash", "version", "eliminado"])
+        if crear or actualizar:
+            version.version = nueva
+        version.hash_contenido = hash_contenido
+        version.save()
+
+    return version
+
+
+def _leer_token(valor: Optional[str]) -> Optional[Tuple[int, int]]:
+    try:
+        pk, _, numero = (valor or "").partition(".")
+        return int(pk), int(numero)
+    except ValueError:
+        return None
+
+
+def calcular(
+        case_id: str,
+        listado: str,
+        items: Union[List[Any], Callable[[], List[Any]]],
+        since: Optional[str] = None,
+        raw: Optional[str] = None,
+) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Registra el listado y devuelve (token, cambios).
+
+    `cambios` es None si hay que responder el listado completo (sin ?since=
+    o token inválido); si no, {"sinCambios", "cambiados", "claves" (de cada
+    cambiado), "eliminados"} y, si algo cambió, "orden" (las claves de todo
+    el listado actual, en orden).
+    Si falla el seguimiento (BD) devuelve (None, None): respuesta completa
+    sin token, nunca un error.
+    """
+    try:
+        version = registrar(case_id, listado, items, raw)
+    except Exception as e:
+        print(f"Advertencia: no se pudo registrar la versión de {case_id}/{listado}: {e}")
+        return None, None
+
+    desde = _leer_token(since) if since else None
+    if desde is None or desde[0] != version.pk or desde[1] > version.version:
+        return token(version), None
+
+    if desde[1] == version.version:
+        return token(version), {"sinCambios": True, "cambiados": [], "claves": [], "eliminados": []}
+
+    cambiados_claves = set()
+    eliminados: List[str] = []
+    for clave, eliminado in version.elementos.filter(version__gt=desde[1]).values_list("clave", "eliminado"):
+        if eliminado:
+            eliminados.append(clave)
+        else:
+            cambiados_claves.add(clave)
+
+    cambios: Dict[str, Any] = {"sinCambios": True, "cambiados": [], "claves": [], "eliminados": eliminados}
+    if cambiados_claves or eliminados:
+        items = _lista(items)
+        orden = claves(items)
+        for clave, item in zip(orden, items):
+            if clave in cambiados_claves:
+                cambios["cambiados"].append(item)
+                cambios["claves"].append(clave)
+        cambios["sinCambios"] = not cambios["cambiados"] and not eliminados
+        cambios["orden"] = orden
+    return token(version), cambios
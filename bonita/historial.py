@@ -0,0 +1,131 @@
+# bonita/historial.py
+"""
+Historial de métricas del dashboard.
+
+- guardar_snapshot(): guarda las métricas escalares en SnapshotMetricas.
+- guardar_si_corresponde(): igual, pero sólo si el último snapshot tiene más
+  de DASHBOARD_SNAPSHOT_INTERVALO segundos (se llama al recalcular el
+  dashboard, así hay historial aunque no corra el comando periódico).
+- serie(): arma las series de un rango de fechas reducidas a `puntos` baldes.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import SnapshotMetricas
+
+# Máximo de puntos por serie que devuelve el endpoint
+MAX_PUNTOS = 500
+
+AGREGACIONES = ("ultimo", "promedio", "min", "max")
+
+
+def _intervalo() -> float:
+    return float(getattr(settings, "DASHBOARD_SNAPSHOT_INTERVALO", 3600))
+
+
+def _escalares(metricas: Dict[str, Any]) -> Dict[str, Any]:
+    """Sólo números: los listados del dashboard no van al historial."""
+    return {
+        k: v for k, v in metricas.items()
+        if isinstance(v, (int, float)) and not isinstance(v, bool)
+    }
+
+
+def guardar_snapshot(metricas: Dict[str, Any], tomado_en: Optional[datetime] = None) -> SnapshotMetricas:
+    return SnapshotMetricas.objects.create(
+        tomado_en=tomado_en or timezone.now(),
+        metricas=_escalares(metricas),
+    )
+
+
+def guardar_si_corresponde(metricas: Dict[str, Any]) -> None:
+    """Guarda un snapshot si ya pasó el intervalo. Nunca corta el flujo."""
+    try:
+        limite = timezone.now() - timedelta(seconds=_intervalo())
+        if not SnapshotMetricas.objects.filter(tomado_en__gt=limite).exists():
+            guardar_snapshot(metricas)
+    except Exception as e:
+        print(f"Advertencia: no se pudo guardar el snapshot de métricas: {e}")
+
+
+def purgar(dias: Optional[int] = None) -> int:
+    """Borra los snapshots más viejos que la retención. Devuelve cuántos borró."""
+    if dias is None:
+        dias = int(getattr(settings, "DASHBOARD_HISTORIAL_RETENCION_DIAS", 365))
+    if dias <= 0:
+        return 0
+    borrados, _ = SnapshotMetricas.objects.filter(
+        tomado_en__lt=timezone.now() - timedelta(days=dias)
+    ).delete()
+    return borrados
+
+
+def _reducir(valores: List[Any], agregacion: str) -> Any:
+    if agregacion == "promedio":
+        return sum(valores) / len(valores)
+    if agregacion == "min":
+        return min(valores)
+    if agregacion == "max":
+        return max(valores)
+    return valores[-1]
+
+
+def serie(
+    desde: datetime,
+    hasta: datetime,
+    puntos: int = 100,
+    claves: Optional[Iterable[str]] = None,
+    agregacion: str = "ultimo",
+) -> Dict[str, Any]:
+    """
+    Series de `desde` a `hasta` partidas en `puntos` baldes de igual ancho.
+
+    Cada balde se reduce a un valor por métrica (por defecto el último
+    snapshot del balde, que es lo correcto para contadores de estado). Los
+    baldes sin snapshots no se devuelven, así el gráfico no inventa ceros.
+
+    Devuelve {"tiempos": [...], "series": {metrica: [...]}, ...}; en las
+    listas, la posición i de cada serie corresponde a tiempos[i] (inicio
+    del balde). Si una métrica falta en un balde, el valor es None.
+    """
+    puntos = max(1, min(int(puntos), MAX_PUNTOS))
+    ancho = max((hasta - desde).total_seconds() / puntos, 1.0)
+    filtro = set(claves) if claves else None
+
+    baldes: Dict[int, Dict[str, List[Any]]] = {}
+    filas = (
+        SnapshotMetricas.objects
+        .filter(tomado_en__gte=desde, tomado_en__lte=hasta)
+        .order_by("tomado_en")
+        .values_list("tomado_en", "metricas")
+    )
+    for tomado_en, metricas in filas.iterator():
+        indice = min(int((tomado_en - desde).total_seconds() // ancho), puntos - 1)
+        balde = baldes.setdefault(indice, {})
+        for clave, valor in (metricas or {}).items():
+            if filtro is None or clave in filtro:
+                balde.setdefault(clave, []).append(valor)
+
+    nombres = sorted(filtro if filtro is not None else {c for b in baldes.values() for c in b})
+    tiempos: List[str] = []
+    series: Dict[str, List[Any]] = {c: [] for c in nombres}
+    for indice in sorted(baldes):
+        balde = baldes[indice]
+        tiempos.append((desde + timedelta(seconds=indice * ancho)).isoformat())
+        for clave in nombres:
+            valores = balde.get(clave)
+            series[clave].append(_reducir(valores, agregacion) if valores else None)
+
+    return {
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "intervalo_segundos": ancho,
+        "agregacion": agregacion,
+        "tiempos": tiempos,
+        "series": series,
+    }
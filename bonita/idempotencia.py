@@ -0,0 +1,225 @@
+# bonita/idempotencia.py
+"""
+Idempotency-Key para los POST que ejecutan tareas de Bonita.
+
+Las pantallas mandan un header Idempotency-Key por envío (la misma clave en
+los reintentos: doble click, pestaña vieja, red caída). La primera request
+con esa clave, para ese caso y endpoint, reserva una fila de
+RespuestaIdempotente y al terminar guarda su respuesta. Las repeticiones:
+
+- si la original ya terminó, reciben la respuesta guardada al instante (sin
+  login ni espera de tareas), con el header Idempotent-Replayed: true;
+- si sigue en curso, esperan a que termine (dentro del plazo del request,
+  ver bonita/plazos.py) en lugar de hacer su propio trabajo en Bonita;
+- si la clave llega con otro body, 422.
+
+Las respuestas 5xx no se guardan: la clave se libera para reintentar. Las
+filas valen IDEMPOTENCIA_TTL segundos (casos.sincronizar() borra las
+viejas). Sin header, la vista se ejecuta como siempre.
+
+Si la vista le pasó su trabajo a una continuación que sigue después de la
+respuesta (_sin_cancelar() en bonita/views.py, vía continuar()), un 5xx o
+una cancelación no liberan la clave: la continuación guarda la respuesta
+al terminar (completar()) y los reintentos la reciben.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from contextvars import ContextVar
+from datetime import timedelta
+from functools import wraps
+from typing import Any, Dict, Optional
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+
+from . import plazos
+from .models import RespuestaIdempotente
+from .respuestas import JsonResponse
+
+# Segundos entre consultas mientras la request original sigue en curso
+_ESPERA = 0.25
+_EN_CURSO = object()
+
+
+class Reserva:
+    """Clave reservada por el request en curso."""
+
+    def __init__(self, endpoint: str, req, clave: str) -> None:
+        self.endpoint = endpoint
+        self.req = req
+        self.clave = clave
+        # Una continuación se hizo cargo de guardar la respuesta
+        self.continuada = False
+
+
+_reserva: ContextVar[Optional[Reserva]] = ContextVar("reserva_idempotente", default=None)
+
+
+def _clave(req) -> Optional[str]:
+    if req.method != "POST":
+        return None
+    clave = (req.headers.get("Idempotency-Key") or "").strip()
+    return clave[:100] or None
+
+
+def _filtro(endpoint: str, req, clave: str) -> Dict[str, str]:
+    try:
+        data = json.loads(req.body or b"{}")
+    except ValueError:
+        data = None
+    case_id = str(data.get("caseId") or "").strip() if isinstance(data, dict) else ""
+    return {"case_id": case_id[:100], "endpoint": endpoint, "clave": clave}
+
+
+def _reservar(endpoint: str, req, clave: str) -> Any:
+    """
+    None si esta request reservó la clave (tiene que ejecutar la vista),
+    _EN_CURSO si la tiene otra, o la respuesta a devolver.
+    """
+    filtro = _filtro(endpoint, req, clave)
+    huella = hashlib.sha256(req.body or b"").hexdigest()
+    ahora = timezone.now()
+    ttl = float(getattr(settings, "IDEMPOTENCIA_TTL", 86400))
+    # Una request en curso más vieja que esto murió con su worker
+    en_curso_max = float(getattr(settings, "IDEMPOTENCIA_EN_CURSO_MAX", 120))
+
+    fila = RespuestaIdempotente.objects.filter(**filtro).first()
+    if fila is not None:
+        vencida = fila.creado_en < ahora - timedelta(seconds=ttl)
+        abandonada = fila.status is None and fila.creado_en < ahora - timedelta(seconds=en_curso_max)
+        if vencida or abandonada:
+            RespuestaIdempotente.objects.filter(pk=fila.pk, status=fila.status).delete()
+            fila = None
+
+    if fila is None:
+        try:
+            with transaction.atomic():
+                RespuestaIdempotente.objects.create(huella=huella, **filtro)
+        except IntegrityError:
+            # Otra request la reservó entre la lectura y el insert
+            return _EN_CURSO
+        return None
+
+    if fila.huella != huella:
+        return JsonResponse(
+            {
+                "ok": False,
+                "error": "Idempotency-Key repetida con otro contenido",
+                "detail": "Generá una clave nueva para cada envío distinto.",
+            },
+            status=422,
+        )
+    if fila.status is None:
+        return _EN_CURSO
+
+    response = HttpResponse(bytes(fila.cuerpo), status=fila.status, content_type=fila.content_type or None)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _guardar(endpoint: str, req, clave: str, response) -> None:
+    filtro = _filtro(endpoint, req, clave)
+    if response.status_code >= 500 or response.streaming:
+        RespuestaIdempotente.objects.filter(status__isnull=True, **filtro).delete()
+        return
+    RespuestaIdempotente.objects.filter(**filtro).update(
+        status=response.status_code,
+        content_type=response.get("Content-Type", ""),
+        cuerpo=response.content,
+    )
+
+
+def _liberar(endpoint: str, req, clave: str) -> None:
+    RespuestaIdempotente.objects.filter(status__isnull=True, **_filtro(endpoint, req, clave)).delete()
+
+
+def continuar() -> Optional[Reserva]:
+    """
+    Para el trabajo que sigue después de la respuesta: la reserva del
+    request en curso (None sin Idempotency-Key), que desde ahora guarda la
+    continuación con completar().
+    """
+    reserva = _reserva.get()
+    if reserva is not None:
+        reserva.continuada = True
+    return reserva
+
+
+def completar(reserva: Reserva, response: Optional[Any]) -> None:
+    """Guarda la respuesta de la continuación (None: falló, libera la clave)."""
+    if response is None:
+        _liberar(reserva.endpoint, reserva.req, reserva.clave)
+    else:
+        _guardar(reserva.endpoint, reserva.req, reserva.clave, response)
+
+
+def _terminar(reserva: Reserva, response: Optional[Any]) -> None:
+    """Fin de la vista: guarda o libera, salvo lo que quedó en una continuación."""
+    if reserva.continuada and (response is None or response.status_code >= 500):
+        return
+    completar(reserva, response)
+
+
+def idempotente(vista):
+    """Decorador (vistas sincrónicas o async) que aplica el Idempotency-Key."""
+    endpoint = vista.__name__
+
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura_async(req, *args, **kwargs):
+            clave = _clave(req)
+            if clave is None:
+                return await vista(req, *args, **kwargs)
+
+            previa = await sync_to_async(_reservar)(endpoint, req, clave)
+            while previa is _EN_CURSO:
+                await plazos.adormir(_ESPERA)
+                previa = await sync_to_async(_reservar)(endpoint, req, clave)
+            if previa is not None:
+                return previa
+
+            reserva = Reserva(endpoint, req, clave)
+            token = _reserva.set(reserva)
+            try:
+                response = await vista(req, *args, **kwargs)
+            except BaseException:
+                await sync_to_async(_terminar)(reserva, None)
+                raise
+            finally:
+                _reserva.reset(token)
+            await sync_to_async(_terminar)(reserva, response)
+            return response
+
+        return envoltura_async
+
+    @wraps(vista)
+    def envoltura(req, *args, **kwargs):
+        clave = _clave(req)
+        if clave is None:
+            return vista(req, *args, **kwargs)
+
+        previa = _reservar(endpoint, req, clave)
+        while previa is _EN_CURSO:
+            plazos.dormir(_ESPERA)
+            previa = _reservar(endpoint, req, clave)
+        if previa is not None:
+            return previa
+
+        reserva = Reserva(endpoint, req, clave)
+        token = _reserva.set(reserva)
+        try:
+            response = vista(req, *args, **kwargs)
+        except BaseException:
+            _terminar(reserva, None)
+            raise
+        finally:
+            _reserva.reset(token)
+        _terminar(reserva, response)
+        return response
+
+    return envoltura
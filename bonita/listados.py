@@ -0,0 +1,137 @@
+# bonita/listados.py
+"""
+Proyección de campos, orden y paginación de los listados de la API
+(proyectos, pedidos, compromisos).
+
+Parámetros GET:
+  - fields: campos a devolver, separados por comas (?fields=id,nombre,estado)
+  - sort:   campo por el cual ordenar; con "-" adelante, descendente (?sort=-id)
+  - limit / offset: página (?limit=20&offset=40)
+
+Todo se aplica en el servidor y ANTES de cualquier enriquecimiento, así el
+trabajo extra (p. ej. consultar límites de observaciones) se hace sólo para
+la página visible.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.http import HttpRequest
+
+# Tope de elementos por página
+LIMITE_MAXIMO = 1000
+
+_PARAMETROS = ("fields", "sort", "limit", "offset")
+
+
+@dataclass
+class Listado:
+    campos: Optional[Tuple[str, ...]] = None
+    orden: Optional[str] = None
+    descendente: bool = False
+    limit: Optional[int] = None
+    offset: int = 0
+
+    @property
+    def activo(self) -> bool:
+        """True si se pidió algo distinto del listado completo."""
+        return bool(self.campos or self.orden or self.limit is not None or self.offset)
+
+    def quiere(self, campo: str) -> bool:
+        """¿El campo va en la respuesta? (sin ?fields= van todos)"""
+        return self.campos is None or campo in self.campos
+
+
+def leer_parametros(req: HttpRequest) -> Listado:
+    """
+    Lee fields/sort/limit/offset de la query string.
+    Lanza ValueError con un mensaje para el usuario si algo es inválido.
+    """
+    params = Listado()
+
+    campos = [c.strip() for c in (req.GET.get("fields") or "").split(",") if c.strip()]
+    if campos:
+        params.campos = tuple(dict.fromkeys(campos))
+
+    orden = (req.GET.get("sort") or "").strip()
+    if orden:
+        params.descendente = orden.startswith("-")
+        params.orden = orden.lstrip("-+") or None
+
+    limit = req.GET.get("limit")
+    if limit not in (None, ""):
+        try:
+            params.limit = int(limit)
+        except ValueError:
+            raise ValueError("limit debe ser un entero")
+        if not 0 < params.limit <= LIMITE_MAXIMO:
+            raise ValueError(f"limit debe estar entre 1 y {LIMITE_MAXIMO}")
+
+    offset = req.GET.get("offset")
+    if offset not in (None, ""):
+        try:
+            params.offset = int(offset)
+        except ValueError:
+            raise ValueError("offset debe ser un entero")
+        if params.offset < 0:
+            raise ValueError("offset no puede ser negativo")
+
+    return params
+
+
+def _clave_orden(valor: Any) -> Tuple[int, Any]:
+    """Orden estable entre tipos mezclados: números, textos, otros; None al final."""
+    if valor is None:
+        return (3, 0)
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return (0, valor)
+    if isinstance(valor, str):
+        return (1, valor.lower())
+    return (2, str(valor))
+
+
+def paginar(items: List[Any], params: Listado) -> Tuple[List[Any], int]:
+    """
+    Ordena y recorta la lista. Devuelve (página, total_sin_paginar).
+    No modifica `items` (puede ser un valor compartido del cache).
+    """
+    total = len(items)
+    if params.orden:
+        campo = params.orden
+        items = sorted(
+            items,
+            key=lambda x: _clave_orden(x.get(campo) if isinstance(x, dict) else None),
+            reverse=params.descendente,
+        )
+        if params.descendente:
+            # reverse=True deja los None primero: los mandamos al final
+            items = [x for x in items if not _sin_valor(x, campo)] + [x for x in items if _sin_valor(x, campo)]
+
+    fin = None if params.limit is None else params.offset + params.limit
+    return items[params.offset:fin], total
+
+
+def _sin_valor(item: Any, campo: str) -> bool:
+    return not isinstance(item, dict) or item.get(campo) is None
+
+
+def proyectar(items: List[Any], params: Listado) -> List[Any]:
+    """Deja sólo los campos pedidos en cada elemento (copias nuevas)."""
+    if params.campos is None:
+        return items
+    campos = params.campos
+    return [
+        {c: x[c] for c in campos if c in x} if isinstance(x, dict) else x
+        for x in items
+    ]
+
+
+def meta(params: Listado, total: int, cantidad: int) -> Dict[str, Any]:
+    """Datos de paginación para agregar al sobre de la respuesta."""
+    return {
+        "total": total,
+        "offset": params.offset,
+        "limit": params.limit,
+        "count": cantidad,
+    }
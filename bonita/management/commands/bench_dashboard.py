@@ -0,0 +1,232 @@
+# bonita/management/commands/bench_dashboard.py
+"""
+Benchmark del cálculo del dashboard sobre datos sintéticos.
+
+Uso:
+    python manage.py bench_dashboard
+    python manage.py bench_dashboard --sizes 100000 1000000 --repeticiones 3
+    python manage.py bench_dashboard --memoria
+
+Si NumPy está instalado también mide el motor columnar (DASHBOARD_MOTOR=numpy)
+y verifica que devuelva lo mismo que el motor Python.
+"""
+from __future__ import annotations
+
+import json
+import random
+import time
+import tracemalloc
+from collections import Counter
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from django.core.management.base import BaseCommand
+
+from bonita.metricas import agregar_metricas, agregar_stream, dias_restantes
+from bonita.metricas_numpy import AgregadorColumnar, numpy_disponible
+
+
+def generar_dataset(n: int, seed: int = 42) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Genera un payload con la forma de /api/dashboard/metricas/ y n registros
+    en total, repartidos como en producción: pocos proyectos, muchas
+    observaciones y compromisos.
+    """
+    rnd = random.Random(seed)
+    n_proy = max(1, n // 100)
+    n_ped = max(1, n // 10)
+    n_comp = max(1, n * 4 // 10)
+    n_obs = max(1, n - n_proy - n_ped - n_comp)
+
+    estados_proy = ["planificacion", "ejecucion", "finalizado"]
+    estados_obs = ["pendiente", "respondida", "aprobada", "rechazada", "vencida"]
+
+    proyectos = [
+        {"id": i, "nombre": f"Proyecto {i}", "estado": rnd.choice(estados_proy)}
+        for i in range(1, n_proy + 1)
+    ]
+    pedidos = [
+        {"id": i, "proyecto": rnd.randint(1, n_proy), "estado": rnd.choice(["abierto", "cerrado"])}
+        for i in range(1, n_ped + 1)
+    ]
+    compromisos = [
+        {
+            "id": i,
+            "pedidoId": rnd.randint(1, n_ped),
+            "estado": rnd.choice(["cumplido", "pendiente"]),
+            "monto": f"{rnd.randint(0, 10 ** 6) / 100:.2f}",
+        }
+        for i in range(1, n_comp + 1)
+    ]
+    observaciones = [
+        {
+            "id": i,
+            "proyecto_id": rnd.randint(1, n_proy),
+            "estado": rnd.choice(estados_obs),
+            "fecha_creacion": f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T{rnd.randint(0, 23):02d}:00:00Z",
+            "fecha_vencimiento": f"2026-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T00:00:00Z",
+        }
+        for i in range(1, n_obs + 1)
+    ]
+    return {
+        "proyectos": proyectos,
+        "pedidos": pedidos,
+        "compromisos": compromisos,
+        "observaciones": observaciones,
+    }
+
+
+def mismos_resultados(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    """Igualdad de payloads tolerando el redondeo float de los montos."""
+    montos = ("monto_total_compromisos", "monto_promedio_compromiso")
+    ma, mb = dict(a["metricas"]), dict(b["metricas"])
+    for k in montos:
+        if abs(ma.pop(k) - mb.pop(k)) > 1e-6 * max(1.0, abs(ma.get(k, 0))):
+            return False
+    return ma == mb and {k: v for k, v in a.items() if k != "metricas"} == \
+        {k: v for k, v in b.items() if k != "metricas"}
+
+
+def calcular_multipasada(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Cálculo anterior de dashboard_datos_api (un sum() por estado, sort completo
+    para los top), conservado como referencia para comparar.
+    """
+    proyectos = data["proyectos"]
+    pedidos = data["pedidos"]
+    compromisos = data["compromisos"]
+    observaciones = data["observaciones"]
+
+    metricas = {
+        "total_proyectos": len(proyectos),
+        "proyectos_planificacion": sum(1 for p in proyectos if p.get('estado') == 'planificacion'),
+        "proyectos_ejecucion": sum(1 for p in proyectos if p.get('estado') == 'ejecucion'),
+        "proyectos_finalizados": sum(1 for p in proyectos if p.get('estado') == 'finalizado'),
+        "total_pedidos": len(pedidos),
+        "pedidos_abiertos": sum(1 for p in pedidos if p.get('estado') == 'abierto'),
+        "total_compromisos": len(compromisos),
+        "compromisos_cumplidos": sum(1 for c in compromisos if c.get('estado') == 'cumplido'),
+    }
+    monto_total = Decimal('0')
+    for c in compromisos:
+        if c.get('monto'):
+            monto_total += Decimal(str(c['monto']))
+    metricas["monto_total_compromisos"] = float(monto_total)
+    metricas["monto_promedio_compromiso"] = float(monto_total / len(compromisos)) if compromisos else 0.0
+    metricas["total_observaciones"] = len(observaciones)
+    for estado in ("pendiente", "respondida", "aprobada", "rechazada", "vencida"):
+        metricas[f"observaciones_{estado}s"] = sum(1 for o in observaciones if o.get('estado') == estado)
+
+    proyectos_dict = {p['id']: p for p in proyectos}
+    pedidos_dict = {p['id']: p for p in pedidos}
+
+    obs_count = Counter(o.get('proyecto_id') for o in observaciones if o.get('proyecto_id'))
+    top_obs = [
+        {"id": pid, "nombre": proyectos_dict[pid].get('nombre', 'Sin nombre'),
+         "estado": proyectos_dict[pid].get('estado', 'desconocido'), "total_observaciones": n}
+        for pid, n in sorted(obs_count.items(), key=lambda x: x[1], reverse=True)[:5]
+        if pid in proyectos_dict
+    ]
+
+    ped_count = Counter(p.get('proyecto') for p in pedidos if p.get('proyecto'))
+    comp_count: Dict[Any, int] = {}
+    for c in compromisos:
+        pedido = pedidos_dict.get(c.get('pedidoId'))
+        if pedido and pedido.get('proyecto'):
+            comp_count[pedido['proyecto']] = comp_count.get(pedido['proyecto'], 0) + 1
+    top_comp = [
+        {"id": pid, "nombre": proyectos_dict[pid].get('nombre', 'Sin nombre'),
+         "total_pedidos": ped_count.get(pid, 0), "total_compromisos": n}
+        for pid, n in sorted(comp_count.items(), key=lambda x: x[1], reverse=True)[:5]
+        if pid in proyectos_dict
+    ]
+
+    recientes = []
+    for obs in sorted(observaciones, key=lambda x: x.get('fecha_creacion', ''), reverse=True)[:10]:
+        proyecto = proyectos_dict.get(obs.get('proyecto_id'))
+        recientes.append({
+            "id": obs.get('id'),
+            "proyecto_nombre": proyecto.get('nombre', 'Desconocido') if proyecto else 'Desconocido',
+            "estado": obs.get('estado', 'desconocido'),
+            "fecha_creacion": obs.get('fecha_creacion'),
+            "dias_restantes": dias_restantes(obs.get('fecha_vencimiento')),
+        })
+
+    return {
+        "metricas": metricas,
+        "top_proyectos_observaciones": top_obs,
+        "top_proyectos_compromisos": top_comp,
+        "observaciones_recientes": recientes,
+    }
+
+
+class Command(BaseCommand):
+    help = "Mide el costo de CPU de la agregación del dashboard sobre datos sintéticos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", nargs="+", type=int, default=[100_000, 300_000, 1_000_000],
+            help="Cantidad total de registros de cada dataset.",
+        )
+        parser.add_argument("--repeticiones", type=int, default=3)
+        parser.add_argument(
+            "--sin-referencia", action="store_true",
+            help="No medir el cálculo multipasada anterior.",
+        )
+        parser.add_argument(
+            "--memoria", action="store_true",
+            help="Comparar el pico de memoria de json.loads + agregación contra el parseo en streaming.",
+        )
+
+    def _medir(self, fn, data, repeticiones: int):
+        mejor = float("inf")
+        resultado = None
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            resultado = fn(data)
+            mejor = min(mejor, time.perf_counter() - t0)
+        return mejor, resultado
+
+    def _pico_memoria(self, fn) -> int:
+        tracemalloc.start()
+        try:
+            fn()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def _comparar_memoria(self, sizes) -> None:
+        self.stdout.write(f"{'registros':>10} {'json.loads MiB':>15} {'streaming MiB':>15}")
+        for n in sizes:
+            cuerpo = json.dumps(generar_dataset(n)).encode()
+            chunks = lambda: (cuerpo[i:i + 64 * 1024] for i in range(0, len(cuerpo), 64 * 1024))
+
+            pico_json = self._pico_memoria(lambda: agregar_metricas(json.loads(cuerpo)))
+            pico_stream = self._pico_memoria(lambda: agregar_stream(chunks()).resultado())
+            self.stdout.write(f"{n:>10} {pico_json / 2 ** 20:>15.1f} {pico_stream / 2 ** 20:>15.1f}")
+
+    def handle(self, *args, **opts):
+        if opts["memoria"]:
+            self._comparar_memoria(opts["sizes"])
+            return
+
+        repeticiones = max(1, opts["repeticiones"])
+        self.stdout.write(f"{'registros':>10} {'motor':>12} {'seg':>8} {'reg/s':>12}")
+
+        for n in opts["sizes"]:
+            data = generar_dataset(n)
+
+            t_una, res_una = self._medir(agregar_metricas, data, repeticiones)
+            self.stdout.write(f"{n:>10} {'una pasada':>12} {t_una:>8.3f} {n / t_una:>12,.0f}")
+
+            if numpy_disponible():
+                t_np, res_np = self._medir(lambda d: agregar_metricas(d, AgregadorColumnar()), data, repeticiones)
+                self.stdout.write(f"{n:>10} {'numpy':>12} {t_np:>8.3f} {n / t_np:>12,.0f}")
+                if not mismos_resultados(res_np, res_una):
+                    self.stderr.write(self.style.ERROR(f"  El motor numpy difiere para n={n}"))
+
+            if not opts["sin_referencia"]:
+                t_multi, res_multi = self._medir(calcular_multipasada, data, repeticiones)
+                self.stdout.write(f"{n:>10} {'multipasada':>12} {t_multi:>8.3f} {n / t_multi:>12,.0f}")
+                if res_multi != res_una:
+                    self.stderr.write(self.style.ERROR(f"  Resultados distintos para n={n}"))
@@ -0,0 +1,138 @@
+# bonita/management/commands/bench_db_writes.py
+"""
+Benchmark de escrituras concurrentes en la base de datos.
+
+Simula la carga de login_api: varios hilos haciendo
+SesionBonita.objects.update_or_create() a la vez. Mide escrituras por
+segundo, latencia (p50/p95) y cuántas fallaron con "database is locked".
+
+Por defecto compara journal_mode=delete (el default de SQLite) contra WAL,
+con BEGIN por defecto y con BEGIN IMMEDIATE, en bases SQLite temporales.
+Con --configurada corre contra DATABASES["default"] (p. ej. PostgreSQL) y
+borra las filas que crea.
+
+Uso:
+    python manage.py bench_db_writes
+    python manage.py bench_db_writes --modos delete wal --transacciones immediate --hilos 16
+    python manage.py bench_db_writes --configurada
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+
+from bonita.models import SesionBonita
+
+_PREFIJO = "bench-db-"
+
+
+def _correr(alias: str, hilos: int, escrituras: int) -> Dict[str, Any]:
+    latencias: List[float] = []
+    errores = [0]
+    lock = threading.Lock()
+    inicio = threading.Barrier(hilos)
+
+    def trabajador(n: int) -> None:
+        propias: List[float] = []
+        fallidas = 0
+        inicio.wait()
+        for i in range(escrituras):
+            # Pocos usuarios distintos: mezcla de inserts y updates sobre las mismas filas
+            usuario = f"{_PREFIJO}{(n * escrituras + i) % (hilos * 4)}"
+            t0 = time.perf_counter()
+            try:
+                SesionBonita.objects.using(alias).update_or_create(
+                    api_username=usuario,
+                    defaults={"case_id": str(i), "proceso": "ProjectPlanning"},
+                )
+                propias.append(time.perf_counter() - t0)
+            except OperationalError:
+                fallidas += 1
+        connections[alias].close()
+        with lock:
+            latencias.extend(propias)
+            errores[0] += fallidas
+
+    threads = [threading.Thread(target=trabajador, args=(n,)) for n in range(hilos)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = time.perf_counter() - t0
+
+    latencias.sort()
+    return {
+        "ok": len(latencias),
+        "errores": errores[0],
+        "por_segundo": len(latencias) / total if total else 0.0,
+        "p50": 1000 * statistics.median(latencias) if latencias else 0.0,
+        "p95": 1000 * latencias[int(len(latencias) * 0.95) - 1] if latencias else 0.0,
+    }
+
+
+class Command(BaseCommand):
+    help = "Mide escrituras concurrentes (update_or_create de SesionBonita) con distintos journal_mode de SQLite."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modos", nargs="+", default=["delete", "wal"],
+                            help="journal_mode de SQLite a comparar.")
+        parser.add_argument("--synchronous", default="normal")
+        parser.add_argument("--transacciones", nargs="+", default=["deferred", "immediate"],
+                            help="Modo de BEGIN de SQLite a comparar (ver bonita/basedatos.py).")
+        parser.add_argument("--busy-timeout", type=float, default=5.0,
+                            help="Segundos que una escritura espera el lock.")
+        parser.add_argument("--hilos", type=int, default=8)
+        parser.add_argument("--escrituras", type=int, default=100, help="Escrituras por hilo.")
+        parser.add_argument("--configurada", action="store_true",
+                            help="Usar DATABASES['default'] en lugar de SQLite temporales.")
+
+    def _reportar(self, nombre: str, r: Dict[str, Any]) -> None:
+        self.stdout.write(
+            f"{nombre:<26} {r['por_segundo']:9.1f} escr/s  "
+            f"p50 {r['p50']:7.2f} ms  p95 {r['p95']:8.2f} ms  "
+            f"ok {r['ok']:<6} bloqueadas {r['errores']}"
+        )
+
+    def handle(self, *args, **opts):
+        hilos, escrituras = opts["hilos"], opts["escrituras"]
+
+        if opts["configurada"]:
+            try:
+                r = _correr("default", hilos, escrituras)
+            finally:
+                SesionBonita.objects.filter(api_username__startswith=_PREFIJO).delete()
+            self._reportar(connections["default"].vendor, r)
+            return
+
+        for modo in opts["modos"]:
+            for transacciones in opts["transacciones"]:
+                with tempfile.TemporaryDirectory() as carpeta:
+                    alias = f"bench_{modo}_{transacciones}"
+                    connections.settings[alias] = {
+                        **connections["default"].settings_dict,
+                        "ENGINE": "django.db.backends.sqlite3",
+                        "NAME": os.path.join(carpeta, "bench.sqlite3"),
+                        "CONN_MAX_AGE": 0,
+                        "OPTIONS": {"timeout": opts["busy_timeout"]},
+                        "PRAGMAS": {
+                            "journal_mode": modo,
+                            "synchronous": opts["synchronous"],
+                            "busy_timeout": int(opts["busy_timeout"] * 1000),
+                        },
+                        "TRANSACCIONES": transacciones,
+                    }
+                    try:
+                        call_command("migrate", database=alias, verbosity=0)
+                        self._reportar(f"sqlite {modo}/{transacciones}", _correr(alias, hilos, escrituras))
+                    finally:
+                        connections[alias].close()
+                        del connections.settings[alias]
@@ -0,0 +1,147 @@
+# bonita/management/commands/bench_json.py
+"""
+Benchmark de serialización y compresión de las respuestas grandes de la API.
+
+Payloads sintéticos con la forma real de:
+  - consejo/proyectos/      (proyectos enriquecidos con limite_observaciones)
+  - resumen-proyecto/       (historialObservaciones)
+  - dashboard/datos/
+
+Para cada uno mide el tiempo de codificación (stdlib vs orjson, si está
+instalado) y los bytes en el cable sin comprimir, con gzip y con brotli
+(si está instalado).
+
+Uso:
+    python manage.py bench_json
+    python manage.py bench_json --sizes 100 1000 10000 --repeticiones 20
+"""
+from __future__ import annotations
+
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from bonita import middleware, respuestas
+from bonita.management.commands.bench_dashboard import generar_dataset
+from bonita.metricas import agregar_metricas
+
+
+def proyectos_consejo(n: int, rnd: random.Random) -> Dict[str, Any]:
+    proyectos = []
+    for i in range(1, n + 1):
+        realizadas = rnd.randint(0, 2)
+        proyectos.append({
+            "id": i,
+            "nombre": f"Proyecto comunitario {i}",
+            "descripcion": "Construcción y equipamiento de un centro comunitario " * 2,
+            "estado": "ejecucion",
+            "fecha_inicio": f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            "ong": {"id": rnd.randint(1, 50), "nombre": f"ONG {rnd.randint(1, 50)}"},
+            "etapas": [
+                {"nombre": f"Etapa {e}", "completada": rnd.random() < 0.5, "pedidos": rnd.randint(0, 5)}
+                for e in range(1, rnd.randint(2, 6))
+            ],
+            "total_observaciones": rnd.randint(0, 20),
+            "limite_observaciones": {
+                "puede_observar": realizadas < 2,
+                "observaciones_realizadas": realizadas,
+                "mensaje": f"Se han realizado {realizadas} de 2 observaciones permitidas este mes",
+                "fecha_reset": None,
+            },
+        })
+    return {"ok": True, "caseId": "1001", "proyectos": proyectos, "count": n}
+
+
+def resumen_proyecto(n: int, rnd: random.Random) -> Dict[str, Any]:
+    estados = ["pendiente", "respondida", "aprobada", "rechazada", "vencida"]
+    historial = [
+        {
+            "id": i,
+            "proyecto_id": 7,
+            "texto": "Se solicita detallar el avance de la etapa y adjuntar comprobantes.",
+            "respuesta": "Se adjuntan los comprobantes solicitados." if rnd.random() < 0.6 else None,
+            "estado": rnd.choice(estados),
+            "fecha_creacion": f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T10:00:00Z",
+            "fecha_vencimiento": f"2026-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T00:00:00Z",
+        }
+        for i in range(1, n + 1)
+    ]
+    return {
+        "ok": True,
+        "caseId": "1001",
+        "proyectoId": 7,
+        "nombreProyecto": "Proyecto comunitario 7",
+        "descripcion": "Construcción y equipamiento de un centro comunitario",
+        "etapas": [{"nombre": f"Etapa {e}", "completada": e < 3} for e in range(1, 6)],
+        "compromisosAceptados": [],
+        "observacionPendiente": None,
+        "historialObservaciones": historial,
+    }
+
+
+def dashboard(n: int, rnd: random.Random) -> Dict[str, Any]:
+    return {"ok": True, "data": agregar_metricas(generar_dataset(n * 10, seed=rnd.randint(0, 10 ** 6)))}
+
+
+PAYLOADS: Dict[str, Callable[[int, random.Random], Dict[str, Any]]] = {
+    "consejo/proyectos": proyectos_consejo,
+    "resumen-proyecto": resumen_proyecto,
+    "dashboard/datos": dashboard,
+}
+
+
+def _tiempo(func: Callable[[], Any], repeticiones: int) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        func()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor * 1000
+
+
+class Command(BaseCommand):
+    help = "Compara serialización JSON (stdlib/orjson) y compresión (gzip/brotli) de las respuestas grandes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[100, 1000, 10000],
+                            help="Cantidad de elementos de la lista principal de cada payload.")
+        parser.add_argument("--repeticiones", type=int, default=10)
+
+    def handle(self, *args, **opts):
+        rep = opts["repeticiones"]
+        hay_orjson = respuestas.orjson is not None
+        hay_brotli = middleware.brotli is not None
+        if not hay_orjson:
+            self.stdout.write("orjson no está instalado: sólo se mide la stdlib")
+        if not hay_brotli:
+            self.stdout.write("brotli no está instalado: sólo se mide gzip")
+
+        for nombre, generar in PAYLOADS.items():
+            for n in opts["sizes"]:
+                data = generar(n, random.Random(n))
+
+                stdlib = json.dumps(data, cls=DjangoJSONEncoder).encode("utf-8")
+                t_stdlib = _tiempo(lambda: json.dumps(data, cls=DjangoJSONEncoder), rep)
+                linea: List[str] = [f"{nombre:<18} n={n:<6} stdlib {t_stdlib:8.2f} ms"]
+
+                cuerpo = stdlib
+                if hay_orjson:
+                    cuerpo = respuestas.dumps(data)
+                    if json.loads(cuerpo) != json.loads(stdlib):
+                        self.stderr.write(f"{nombre} n={n}: orjson y stdlib NO coinciden")
+                    t_orjson = _tiempo(lambda: respuestas.dumps(data), rep)
+                    linea.append(f"orjson {t_orjson:7.2f} ms (x{t_stdlib / max(t_orjson, 1e-9):.1f})")
+
+                linea.append(f"| {len(cuerpo) / 1024:9.1f} KiB")
+                for codificacion in ("gzip", "br") if hay_brotli else ("gzip",):
+                    t_comp = _tiempo(lambda: middleware.comprimir(cuerpo, codificacion), max(1, rep // 2))
+                    comprimido = middleware.comprimir(cuerpo, codificacion)
+                    linea.append(
+                        f"{codificacion} {len(comprimido) / 1024:8.1f} KiB "
+                        f"({100 * len(comprimido) / len(cuerpo):4.1f}%, {t_comp:6.2f} ms)"
+                    )
+                self.stdout.write("  ".join(linea))
@@ -0,0 +1,49 @@
+# bonita/management/commands/reconciliar_dashboard.py
+"""
+Recalcula las métricas materializadas del dashboard contra
+/api/dashboard/metricas/.
+
+Uso:
+    python manage.py reconciliar_dashboard              # una vez (cron)
+    python manage.py reconciliar_dashboard --loop       # cada DASHBOARD_RECONCILIACION_INTERVALO
+"""
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from bonita import agregados
+
+
+class Command(BaseCommand):
+    help = "Reconcilia las métricas materializadas del dashboard con la API Django."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Repetir indefinidamente.")
+        parser.add_argument(
+            "--intervalo", type=float,
+            default=float(getattr(settings, "DASHBOARD_RECONCILIACION_INTERVALO", 900)),
+            help="Segundos entre reconciliaciones con --loop.",
+        )
+
+    def handle(self, *args, **opts):
+        while True:
+            t0 = time.perf_counter()
+            resultado = agregados.reconciliar()
+            if resultado is None or resultado.get("stale"):
+                mensaje = "No se pudo consultar la API Django: las métricas materializadas quedan como estaban"
+                if not opts["loop"]:
+                    raise CommandError(mensaje)
+                self.stderr.write(mensaje)
+            else:
+                metricas = resultado["metricas"]
+                self.stdout.write(
+                    f"Reconciliado en {time.perf_counter() - t0:.2f}s: "
+                    f"{metricas.get('total_proyectos', 0)} proyectos, "
+                    f"{metricas.get('total_observaciones', 0)} observaciones"
+                )
+            if not opts["loop"]:
+                return
+            time.sleep(max(1.0, opts["intervalo"]))
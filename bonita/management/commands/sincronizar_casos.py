@@ -0,0 +1,57 @@
+# bonita/management/commands/sincronizar_casos.py
+"""
+Sincroniza el modelo de lectura local (CasoBonita) con Bonita.
+
+Uso:
+    python manage.py sincronizar_casos              # una vez
+    python manage.py sincronizar_casos --loop       # cada CASOS_SYNC_INTERVALO
+    python manage.py sincronizar_casos --completo   # relee las variables de todos los casos
+"""
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bonita import casos
+from bonita.bonita_client import BonitaClient
+
+
+class Command(BaseCommand):
+    help = "Sincroniza los casos activos de Bonita en el modelo de lectura local."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Repetir indefinidamente.")
+        parser.add_argument(
+            "--intervalo", type=float,
+            default=float(getattr(settings, "CASOS_SYNC_INTERVALO", 10)),
+            help="Segundos entre sincronizaciones con --loop.",
+        )
+        parser.add_argument(
+            "--completo", action="store_true",
+            help="Releer las variables de todos los casos, no sólo de los que cambiaron.",
+        )
+
+    def handle(self, *args, **opts):
+        cli = BonitaClient(prioridad="masivo")
+        while True:
+            t0 = time.perf_counter()
+            try:
+                if not cli.logueado:
+                    cli.login()
+                r = casos.sincronizar(cli, completo=opts["completo"])
+                self.stdout.write(
+                    f"Sincronizado en {time.perf_counter() - t0:.2f}s: {r['activos']} casos activos, "
+                    f"{r['refrescados']} refrescados, {r['borrados']} borrados"
+                )
+            except Exception as e:
+                if not opts["loop"]:
+                    raise
+                # La sesión puede haber vencido: se vuelve a loguear en la próxima vuelta
+                self.stderr.write(f"Error sincronizando casos: {e}")
+                cli = BonitaClient(prioridad="masivo")
+
+            if not opts["loop"]:
+                return
+            time.sleep(max(1.0, opts["intervalo"]))
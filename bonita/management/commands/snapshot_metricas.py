@@ -0,0 +1,50 @@
+# bonita/management/commands/snapshot_metricas.py
+"""
+Guarda una foto de las métricas del dashboard en el historial.
+
+Uso:
+    python manage.py snapshot_metricas              # una vez (cron)
+    python manage.py snapshot_metricas --loop       # cada DASHBOARD_SNAPSHOT_INTERVALO
+"""
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bonita import historial
+from bonita.views import _calcular_datos_dashboard
+
+
+class Command(BaseCommand):
+    help = "Guarda un snapshot de las métricas del dashboard (historial de tendencias)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Repetir indefinidamente.")
+        parser.add_argument(
+            "--intervalo", type=float,
+            default=float(getattr(settings, "DASHBOARD_SNAPSHOT_INTERVALO", 3600)),
+            help="Segundos entre snapshots con --loop.",
+        )
+        parser.add_argument(
+            "--retencion-dias", type=int, default=None,
+            help="Borra snapshots más viejos (por defecto DASHBOARD_HISTORIAL_RETENCION_DIAS; 0 = nunca).",
+        )
+
+    def handle(self, *args, **opts):
+        while True:
+            # El snapshot lo guarda este comando, no el cálculo
+            datos = _calcular_datos_dashboard(snapshot=False)
+            borrados = historial.purgar(opts["retencion_dias"])
+            if datos.get("degradado"):
+                self.stderr.write("API Django o Bonita no respondieron: no se guarda el snapshot")
+            else:
+                snapshot = historial.guardar_snapshot(datos["metricas"])
+                self.stdout.write(
+                    f"Snapshot {snapshot.tomado_en.isoformat()} con {len(snapshot.metricas)} métricas"
+                    + (f" ({borrados} snapshots viejos borrados)" if borrados else "")
+                )
+            if not opts["loop"]:
+                return
+            time.sleep(max(1.0, opts["intervalo"]))
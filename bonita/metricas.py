@@ -0,0 +1,413 @@
+# bonita/metricas.py
+"""
+Agregación de las métricas del dashboard gerencial.
+
+Recorre cada lista de /api/dashboard/metricas/ (proyectos, pedidos,
+compromisos, observaciones) UNA sola vez, registro por registro, y mantiene
+sólo lo necesario para el resultado: contadores por estado, sumas Decimal,
+conteos agrupados por proyecto y heaps acotados para los "top" y recientes.
+"""
+from __future__ import annotations
+
+import codecs
+import heapq
+import json
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, DefaultDict, Dict, Iterable, Iterator, List, Optional, Tuple
+
+TOP_PROYECTOS = 5
+OBSERVACIONES_RECIENTES = 10
+
+# Registros por lote al parsear en streaming
+TAMANIO_LOTE = 1000
+
+
+def dias_restantes(fecha_vencimiento: Optional[str]) -> Optional[int]:
+    """Días hasta fecha_vencimiento (ISO 8601) o None si no se puede calcular."""
+    if not fecha_vencimiento:
+        return None
+    try:
+        fecha_venc = datetime.fromisoformat(fecha_vencimiento.replace('Z', '+00:00'))
+        return (fecha_venc - datetime.now(fecha_venc.tzinfo)).days
+    except Exception:
+        return None
+
+
+class AgregadorDashboard:
+    """
+    Acumula las métricas en una pasada por lista.
+
+    Los registros pueden llegar en cualquier orden entre listas (por ejemplo
+    compromisos antes que pedidos): lo que depende de otra lista se resuelve
+    recién en resultado().
+    """
+
+    def __init__(self) -> None:
+        # Proyectos: id -> {"nombre", "estado"} (sólo los campos que se muestran)
+        self.proyectos: Dict[Any, Dict[str, Any]] = {}
+        self.total_proyectos = 0
+        self.estados_proyectos: DefaultDict[Any, int] = defaultdict(int)
+
+        # Pedidos
+        self.total_pedidos = 0
+        self.pedidos_abiertos = 0
+        self.pedido_proyecto: Dict[Any, Any] = {}
+        self.pedidos_por_proyecto: DefaultDict[Any, int] = defaultdict(int)
+
+        # Compromisos
+        self.total_compromisos = 0
+        self.compromisos_cumplidos = 0
+        self.monto_total = Decimal('0')
+        self.compromisos_por_pedido: DefaultDict[Any, int] = defaultdict(int)
+
+        # Observaciones
+        self.total_observaciones = 0
+        self.estados_observaciones: DefaultDict[Any, int] = defaultdict(int)
+        self.observaciones_por_proyecto: DefaultDict[Any, int] = defaultdict(int)
+        # min-heap acotado de (fecha_creacion, -orden, observacion)
+        self._recientes: List[Tuple[str, int, Dict[str, Any]]] = []
+
+    # --------------------------- Ingesta ---------------------------
+    #
+    # Cada lista tiene su propio bucle con las referencias en variables
+    # locales: en CPython eso pesa más que la cantidad de pasadas.
+
+    def agregar(self, clave: str, registro: Dict[str, Any]) -> None:
+        """Agrega un único registro de la lista `clave`."""
+        self.agregar_lista(clave, (registro,))
+
+    def agregar_lista(self, clave: str, registros: Iterable[Dict[str, Any]]) -> None:
+        """Agrega un lote de registros de la lista `clave` (las claves desconocidas se ignoran)."""
+        if clave == "proyectos":
+            self._agregar_proyectos(registros)
+        elif clave == "pedidos":
+            self._agregar_pedidos(registros)
+        elif clave == "compromisos":
+            self._agregar_compromisos(registros)
+        elif clave == "observaciones":
+            self._agregar_observaciones(registros)
+
+    def _agregar_proyectos(self, registros: Iterable[Dict[str, Any]]) -> None:
+        proyectos = self.proyectos
+        estados = self.estados_proyectos
+        total = 0
+        for p in registros:
+            total += 1
+            estados[p.get('estado')] += 1
+            proyectos[p.get('id')] = {k: p[k] for k in ('nombre', 'estado') if k in p}
+        self.total_proyectos += total
+
+    def _agregar_pedidos(self, registros: Iterable[Dict[str, Any]]) -> None:
+        pedido_proyecto = self.pedido_proyecto
+        por_proyecto = self.pedidos_por_proyecto
+        total = abiertos = 0
+        for p in registros:
+            total += 1
+            if p.get('estado') == 'abierto':
+                abiertos += 1
+            proyecto_id = p.get('proyecto')
+            pedido_proyecto[p.get('id')] = proyecto_id
+            if proyecto_id:
+                por_proyecto[proyecto_id] += 1
+        self.total_pedidos += total
+        self.pedidos_abiertos += abiertos
+
+    def _agregar_compromisos(self, registros: Iterable[Dict[str, Any]]) -> None:
+        por_pedido = self.compromisos_por_pedido
+        monto_total = self.monto_total
+        total = cumplidos = 0
+        for c in registros:
+            total += 1
+            if c.get('estado') == 'cumplido':
+                cumplidos += 1
+
+            monto = c.get('monto')
+            if monto:
+                try:
+                    monto_total += Decimal(monto if isinstance(monto, str) else str(monto))
+                except (InvalidOperation, ValueError):
+                    pass
+
+            pedido_id = c.get('pedidoId')
+            if pedido_id:
+                por_pedido[pedido_id] += 1
+        self.total_compromisos += total
+        self.compromisos_cumplidos += cumplidos
+        self.monto_total = monto_total
+
+    def _agregar_observaciones(self, registros: Iterable[Dict[str, Any]]) -> None:
+        estados = self.estados_observaciones
+        por_proyecto = self.observaciones_por_proyecto
+        recientes = self._recientes
+        orden = self.total_observaciones
+        for o in registros:
+            estados[o.get('estado')] += 1
+
+            proyecto_id = o.get('proyecto_id')
+            if proyecto_id:
+                por_proyecto[proyecto_id] += 1
+
+            # Top-k de las más recientes. Como `orden` sólo crece, a igual fecha
+            # gana la que llegó primero (mismo resultado que un sort estable)
+            # y basta comparar la fecha contra la mínima del heap.
+            fecha = o.get('fecha_creacion') or ''
+            if len(recientes) < OBSERVACIONES_RECIENTES or fecha > recientes[0][0]:
+                item = (fecha, -orden, {
+                    "id": o.get('id'),
+                    "proyecto_id": proyecto_id,
+                    "estado": o.get('estado', 'desconocido'),
+                    "fecha_creacion": o.get('fecha_creacion'),
+                    "fecha_vencimiento": o.get('fecha_vencimiento'),
+                })
+                if len(recientes) < OBSERVACIONES_RECIENTES:
+                    heapq.heappush(recientes, item)
+                else:
+                    heapq.heapreplace(recientes, item)
+            orden += 1
+        self.total_observaciones = orden
+
+    # --------------------------- Resultado ---------------------------
+
+    def resultado(self) -> Dict[str, Any]:
+        """
+        Devuelve {"metricas", "top_proyectos_observaciones",
+        "top_proyectos_compromisos", "observaciones_recientes"} con el mismo
+        formato que arma dashboard_datos_api. "metricas" contiene sólo las
+        métricas de la API Django (Bonita y sesiones las agrega la vista).
+        """
+        monto_promedio = (
+            self.monto_total / self.total_compromisos if self.total_compromisos > 0 else Decimal('0')
+        )
+
+        metricas = {
+            # Proyectos
+            "total_proyectos": self.total_proyectos,
+            "proyectos_planificacion": self.estados_proyectos.get('planificacion', 0),
+            "proyectos_ejecucion": self.estados_proyectos.get('ejecucion', 0),
+            "proyectos_finalizados": self.estados_proyectos.get('finalizado', 0),
+
+            # Pedidos
+            "total_pedidos": self.total_pedidos,
+            "pedidos_abiertos": self.pedidos_abiertos,
+
+            # Compromisos
+            "total_compromisos": self.total_compromisos,
+            "compromisos_cumplidos": self.compromisos_cumplidos,
+            "monto_total_compromisos": float(self.monto_total),
+            "monto_promedio_compromiso": float(monto_promedio),
+
+            # Observaciones
+            "total_observaciones": self.total_observaciones,
+            "observaciones_pendientes": self.estados_observaciones.get('pendiente', 0),
+            "observaciones_respondidas": self.estados_observaciones.get('respondida', 0),
+            "observaciones_aprobadas": self.estados_observaciones.get('aprobada', 0),
+            "observaciones_rechazadas": self.estados_observaciones.get('rechazada', 0),
+            "observaciones_vencidas": self.estados_observaciones.get('vencida', 0),
+        }
+
+        return {
+            "metricas": metricas,
+            "top_proyectos_observaciones": self._top_observaciones(),
+            "top_proyectos_compromisos": self._top_compromisos(),
+            "observaciones_recientes": self._observaciones_recientes(),
+        }
+
+    def _top_observaciones(self) -> List[Dict[str, Any]]:
+        top = []
+        # nlargest equivale a sorted(..., reverse=True)[:n], empates incluidos
+        for proyecto_id, count in heapq.nlargest(
+                TOP_PROYECTOS, self.observaciones_por_proyecto.items(), key=lambda x: x[1]):
+            proyecto = self.proyectos.get(proyecto_id)
+            if proyecto is not None:
+                top.append({
+                    "id": proyecto_id,
+                    "nombre": proyecto.get('nombre', 'Sin nombre'),
+                    "estado": proyecto.get('estado', 'desconocido'),
+                    "total_observaciones": count
+                })
+        return top
+
+    def _top_compromisos(self) -> List[Dict[str, Any]]:
+        compromisos_por_proyecto: DefaultDict[Any, int] = defaultdict(int)
+        for pedido_id, count in self.compromisos_por_pedido.items():
+            proyecto_id = self.pedido_proyecto.get(pedido_id)
+            if proyecto_id:
+                compromisos_por_proyecto[proyecto_id] += count
+
+        top = []
+        for proyecto_id, count in heapq.nlargest(
+                TOP_PROYECTOS, compromisos_por_proyecto.items(), key=lambda x: x[1]):
+            proyecto = self.proyectos.get(proyecto_id)
+            if proyecto is not None:
+                top.append({
+                    "id": proyecto_id,
+                    "nombre": proyecto.get('nombre', 'Sin nombre'),
+                    "total_pedidos": self.pedidos_por_proyecto.get(proyecto_id, 0),
+                    "total_compromisos": count
+                })
+        return top
+
+    def _observaciones_recientes(self) -> List[Dict[str, Any]]:
+        recientes = []
+        for _fecha, _orden, obs in sorted(self._recientes, key=lambda x: x[:2], reverse=True):
+            proyecto = self.proyectos.get(obs["proyecto_id"])
+            recientes.append({
+                "id": obs["id"],
+                "proyecto_nombre": proyecto.get('nombre', 'Desconocido') if proyecto is not None else 'Desconocido',
+                "estado": obs["estado"],
+                "fecha_creacion": obs["fecha_creacion"],
+                "dias_restantes": dias_restantes(obs["fecha_vencimiento"]),
+            })
+        return recientes
+
+
+def agregar_metricas(data: Dict[str, Any], agregador: Optional[Any] = None) -> Dict[str, Any]:
+    """Atajo: agrega un payload ya parseado de /api/dashboard/metricas/."""
+    if agregador is None:
+        agregador = AgregadorDashboard()
+    for clave in ("proyectos", "pedidos", "compromisos", "observaciones"):
+        agregador.agregar_lista(clave, data.get(clave) or [])
+    return agregador.resultado()
+
+
+# --------------------------- Ingesta en streaming ---------------------------
+
+_ESPACIOS = " \t\n\r"
+# Incluye "" para el caso en que el número termina justo al final del buffer
+_CONTINUACION_NUMERO = ("", "0", "1", "2", "3", "4", "5", "6", "7", "8", "9", ".", "e", "E", "+", "-")
+_decoder = json.JSONDecoder()
+
+
+class _Buffer:
+    """
+    Texto pendiente de parsear, alimentado desde un iterador de chunks de bytes.
+    Sólo retiene lo que todavía no se consumió (más el chunk en curso).
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.texto = ""
+        self.pos = 0
+        self.fin = False
+
+    def leer_mas(self) -> bool:
+        """Descarta lo consumido y agrega el próximo chunk. False si no hay más."""
+        if self.fin:
+            return False
+        self.texto = self.texto[self.pos:]
+        self.pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.texto += self._utf8.decode(chunk)
+                return True
+        self.texto += self._utf8.decode(b"", final=True)
+        self.fin = True
+        return False
+
+    def caracter(self) -> str:
+        """Saltea espacios y devuelve el próximo caracter sin consumirlo ('' al final)."""
+        while True:
+            texto, pos = self.texto, self.pos
+            while pos < len(texto) and texto[pos] in _ESPACIOS:
+                pos += 1
+            self.pos = pos
+            if pos < len(texto):
+                return texto[pos]
+            if not self.leer_mas():
+                return ""
+
+    def valor(self) -> Any:
+        """Parsea el próximo valor JSON completo, leyendo más chunks si hace falta."""
+        self.caracter()
+        while True:
+            try:
+                obj, fin = _decoder.raw_decode(self.texto, self.pos)
+            except json.JSONDecodeError:
+                if not self.leer_mas():
+                    raise
+                continue
+            # Un número al borde del buffer puede estar cortado ("12" de "123",
+            # "1." de "1.5"): si no hay un delimitador después, leemos más.
+            if (
+                    not self.fin
+                    and isinstance(obj, (int, float)) and not isinstance(obj, bool)
+                    and self.texto[fin:fin + 1] in _CONTINUACION_NUMERO
+            ):
+                self.leer_mas()
+                continue
+            self.pos = fin
+            return obj
+
+    def esperar(self, c: str) -> None:
+        if self.caracter() != c:
+            raise ValueError(f"JSON inválido: se esperaba '{c}' en la posición {self.pos}")
+        self.pos += 1
+
+
+def iter_listas_json(
+        chunks: Iterable[bytes],
+        tamanio_lote: int = TAMANIO_LOTE,
+) -> Iterator[Tuple[str, List[Any]]]:
+    """
+    Parser incremental de un objeto JSON cuyos valores son listas
+    (la forma de /api/dashboard/metricas/).
+
+    Consume los bytes a medida que llegan y va devolviendo
+    (clave, lote_de_elementos) con a lo sumo `tamanio_lote` elementos por lote,
+    sin tener nunca el documento completo en memoria. Los valores que no son
+    listas se parsean y se descartan.
+    """
+    buf = _Buffer(chunks)
+    buf.esperar("{")
+    if buf.caracter() == "}":
+        return
+
+    while True:
+        clave = buf.valor()
+        if not isinstance(clave, str):
+            raise ValueError("JSON inválido: se esperaba una clave")
+        buf.esperar(":")
+
+        if buf.caracter() == "[":
+            buf.pos += 1
+            lote: List[Any] = []
+            if buf.caracter() == "]":
+                buf.pos += 1
+            else:
+                while True:
+                    lote.append(buf.valor())
+                    if len(lote) >= tamanio_lote:
+                        yield clave, lote
+                        lote = []
+                    c = buf.caracter()
+                    buf.pos += 1
+                    if c == "]":
+                        break
+                    if c != ",":
+                        raise ValueError(f"JSON inválido en la lista '{clave}'")
+            if lote:
+                yield clave, lote
+        else:
+            buf.valor()
+
+        c = buf.caracter()
+        buf.pos += 1
+        if c == "}":
+            return
+        if c != ",":
+            raise ValueError("JSON inválido: se esperaba ',' o '}'")
+
+
+def agregar_stream(chunks: Iterable[bytes], agregador: Optional[Any] = None) -> Any:
+    """
+    Alimenta un agregador (por defecto un AgregadorDashboard nuevo) directamente
+    desde el cuerpo (en chunks) de /api/dashboard/metricas/.
+    """
+    if agregador is None:
+        agregador = AgregadorDashboard()
+    for clave, lote in iter_listas_json(chunks):
+        agregador.agregar_lista(clave, lote)
+    return agregador
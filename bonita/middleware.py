@@ -0,0 +1,183 @@
+# bonita/middleware.py
+"""
+PlazoMiddleware: plazo de respuesta de cada request (ver bonita/plazos.py)
+y respuestas 503/504 cuando se agota o Bonita está saturado.
+
+CompresionMiddleware: compresión de respuestas (gzip, o brotli si el
+paquete `brotli` está instalado) negociada con Accept-Encoding.
+
+A diferencia de django.middleware.gzip.GZipMiddleware, sólo comprime los
+tipos de RESPUESTAS_COMPRESION_TIPOS (por defecto JSON: las páginas HTML
+llevan el token CSRF y no se comprimen, ver BREACH) y a partir de
+RESPUESTAS_COMPRESION_MINIMO bytes; por debajo no compensa.
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Dict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+from . import plazos
+from .respuestas import JsonResponse
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+
+def _codificaciones_aceptadas(cabecera: str) -> Dict[str, float]:
+    """'gzip;q=0.8, br' -> {"gzip": 0.8, "br": 1.0}"""
+    aceptadas: Dict[str, float] = {}
+    for parte in cabecera.split(","):
+        nombre, _, params = parte.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if nombre:
+            aceptadas[nombre.strip().lower()] = q
+    return aceptadas
+
+
+def comprimir(contenido: bytes, codificacion: str) -> bytes:
+    if codificacion == "br":
+        return brotli.compress(contenido, quality=int(getattr(settings, "RESPUESTAS_BROTLI_CALIDAD", 5)))
+    return compress_string(contenido)
+
+
+def elegir_codificacion(accept_encoding: str) -> str:
+    """'br', 'gzip' o '' según lo que acepta el cliente y lo que tenemos."""
+    aceptadas = _codificaciones_aceptadas(accept_encoding or "")
+    if brotli is not None and aceptadas.get("br", 0) > 0:
+        return "br"
+    if aceptadas.get("gzip", 0) > 0:
+        return "gzip"
+    return ""
+
+
+class CompresionMiddleware:
+    # Sincrónico o async según la cadena (como MiddlewareMixin): bajo ASGI
+    # no obliga a las vistas async a pasar por un hilo
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.minimo = int(getattr(settings, "RESPUESTAS_COMPRESION_MINIMO", 1024))
+        self.tipos = tuple(getattr(settings, "RESPUESTAS_COMPRESION_TIPOS", ("application/json",)))
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._comprimir(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._comprimir(request, await self.get_response(request))
+
+    def _comprimir(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if len(response.content) < self.minimo:
+            return response
+        if not (response.get("Content-Type") or "").startswith(self.tipos):
+            return response
+
+        # La respuesta varía según Accept-Encoding, se comprima o no
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        codificacion = elegir_codificacion(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if not codificacion:
+            return response
+
+        comprimido = comprimir(response.content, codificacion)
+        if len(comprimido) >= len(response.content):
+            return response
+
+        response.content = comprimido
+        response.headers["Content-Length"] = str(len(comprimido))
+        response.headers["Content-Encoding"] = codificacion
+
+        # El cuerpo cambió de bytes: el ETag fuerte pasa a débil (como
+        # GZipMiddleware); If-None-Match se compara en forma débil igual.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+
+        return response
+
+
+def _segundos(request: Any) -> float:
+    """Plazo del request según el nombre de su URL."""
+    por_defecto = float(getattr(settings, "PLAZO_RESPUESTA", 25))
+    try:
+        nombre = resolve(request.path_info).url_name
+    except Resolver404:
+        return por_defecto
+    return float(getattr(settings, "PLAZOS_RESPUESTA", {}).get(nombre, por_defecto))
+
+
+class PlazoMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        plazo = plazos.Plazo(_segundos(request))
+        token = plazos.activar(plazo)
+        try:
+            return self._responder(plazo, self.get_response(request))
+        finally:
+            plazos.desactivar(token)
+
+    async def __acall__(self, request):
+        plazo = plazos.Plazo(_segundos(request))
+        token = plazos.activar(plazo)
+        try:
+            return self._responder(plazo, await self.get_response(request))
+        finally:
+            plazos.desactivar(token)
+
+    def _responder(self, plazo: plazos.Plazo, response):
+        # Las vistas convierten las excepciones en 500: si fue por el control
+        # de admisión o por el plazo, 503/504 con un error que el frontend
+        # pueda mostrar
+        if response.status_code < 500:
+            return response
+        if plazo.reintentar_en is not None:
+            rechazo = JsonResponse(
+                {
+                    "ok": False,
+                    "error": "Servicio saturado",
+                    "detail": "Bonita está atendiendo demasiadas solicitudes. Reintentá en unos segundos.",
+                },
+                status=503,
+            )
+            rechazo["Retry-After"] = str(max(1, math.ceil(plazo.reintentar_en)))
+            return rechazo
+        if plazo.vencido:
+            return JsonResponse(
+                {
+                    "ok": False,
+                    "error": "Tiempo de respuesta agotado",
+                    "detail": f"La operación no terminó en {plazo.segundos:g} s. Reintentá en unos segundos.",
+                },
+                status=504,
+            )
+        return response
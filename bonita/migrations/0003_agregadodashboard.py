@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-19 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bonita', '0002_sesionbonita'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgregadoDashboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=100, unique=True)),
+                ('valor', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('detalle', models.JSONField(blank=True, default=list)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Agregado del dashboard',
+                'verbose_name_plural': 'Agregados del dashboard',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.6 on 2026-10-19 01:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bonita', '0003_agregadodashboard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotMetricas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tomado_en', models.DateTimeField(db_index=True)),
+                ('metricas', models.JSONField(default=dict)),
+            ],
+            options={
+                'verbose_name': 'Snapshot de métricas',
+                'verbose_name_plural': 'Snapshots de métricas',
+                'ordering': ('tomado_en',),
+            },
+        ),
+    ]
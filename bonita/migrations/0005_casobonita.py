@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-19 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bonita', '0004_snapshotmetricas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CasoBonita',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('case_id', models.CharField(max_length=100, unique=True)),
+                ('proceso_id', models.CharField(blank=True, max_length=100)),
+                ('tarea_id', models.CharField(blank=True, max_length=100)),
+                ('tarea_nombre', models.CharField(blank=True, max_length=255)),
+                ('variables', models.JSONField(blank=True, default=dict)),
+                ('sucio', models.BooleanField(default=False)),
+                ('sincronizado_en', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Caso Bonita',
+                'verbose_name_plural': 'Casos Bonita',
+            },
+        ),
+    ]
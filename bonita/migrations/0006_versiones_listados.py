@@ -0,0 +1,45 @@
+# Generated by Django 5.0.6 on 2026-10-19 01:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bonita', '0005_casobonita'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionListado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('case_id', models.CharField(max_length=100)),
+                ('listado', models.CharField(max_length=100)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('hash_contenido', models.CharField(blank=True, max_length=32)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Versión de listado',
+                'verbose_name_plural': 'Versiones de listados',
+                'unique_together': {('case_id', 'listado')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ElementoListado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=100)),
+                ('hash', models.CharField(max_length=32)),
+                ('version', models.PositiveIntegerField()),
+                ('eliminado', models.BooleanField(default=False)),
+                ('listado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='elementos', to='bonita.versionlistado')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['listado', 'version'], name='bonita_elem_listado_3ab9c8_idx')],
+                'unique_together': {('listado', 'clave')},
+            },
+        ),
+    ]
@@ -0,0 +1,125 @@
+# Generated by Django 5.0.6 on 2026-10-19 02:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.dateparse import parse_date
+
+
+def _fecha(valor):
+    try:
+        return parse_date(str(valor or "")[:10])
+    except ValueError:
+        return None
+
+
+def desde_json(apps, schema_editor):
+    """Pasa plan_trabajo["etapas"] y compromisos_aceptados a las tablas hijas."""
+    ProyectoMonitoreo = apps.get_model("bonita", "ProyectoMonitoreo")
+    EtapaPlan = apps.get_model("bonita", "EtapaPlan")
+    CompromisoAceptado = apps.get_model("bonita", "CompromisoAceptado")
+    db = schema_editor.connection.alias
+
+    for snap in ProyectoMonitoreo.objects.using(db).iterator():
+        plan = snap.plan_trabajo if isinstance(snap.plan_trabajo, dict) else {}
+        etapas = plan.get("etapas") if isinstance(plan.get("etapas"), list) else []
+        EtapaPlan.objects.using(db).bulk_create([
+            EtapaPlan(
+                proyecto=snap,
+                orden=orden,
+                nombre=str(etapa.get("nombre") or "")[:255],
+                fecha_inicio_prevista=_fecha(etapa.get("fechaInicioPrevista")),
+                fecha_fin_prevista=_fecha(etapa.get("fechaFinPrevista")),
+                datos=etapa,
+            )
+            for orden, etapa in enumerate(etapas)
+            if isinstance(etapa, dict)
+        ])
+
+        filas = {}
+        lista = snap.compromisos_aceptados if isinstance(snap.compromisos_aceptados, list) else []
+        for item in lista:
+            datos = item if isinstance(item, dict) else {"id": item}
+            try:
+                compromiso_id = int(datos.get("id"))
+            except (TypeError, ValueError):
+                print(f"Compromiso sin id entero en el proyecto {snap.proyecto_id}, se omite: {item!r}")
+                continue
+            filas.setdefault(compromiso_id, CompromisoAceptado(
+                proyecto=snap,
+                compromiso_id=compromiso_id,
+                detalle=str(datos.get("detalle") or ""),
+                fecha=str(datos.get("fecha") or "")[:40],
+                estado=str(datos.get("estado") or "")[:50],
+            ))
+        CompromisoAceptado.objects.using(db).bulk_create(list(filas.values()))
+
+
+def hacia_json(apps, schema_editor):
+    """Inverso: vuelve a armar los JSON a partir de las tablas hijas."""
+    ProyectoMonitoreo = apps.get_model("bonita", "ProyectoMonitoreo")
+    db = schema_editor.connection.alias
+
+    for snap in ProyectoMonitoreo.objects.using(db).iterator():
+        snap.plan_trabajo = {"etapas": [e.datos for e in snap.etapas.order_by("orden")]}
+        snap.compromisos_aceptados = [
+            {"id": c.compromiso_id, "detalle": c.detalle, "fecha": c.fecha, "estado": c.estado}
+            for c in snap.compromisos.order_by("id")
+        ]
+        snap.save(update_fields=["plan_trabajo", "compromisos_aceptados"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bonita', '0006_versiones_listados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompromisoAceptado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('compromiso_id', models.IntegerField()),
+                ('detalle', models.TextField(blank=True)),
+                ('fecha', models.CharField(blank=True, max_length=40)),
+                ('estado', models.CharField(blank=True, max_length=50)),
+                ('aceptado_en', models.DateTimeField(auto_now_add=True)),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compromisos', to='bonita.proyectomonitoreo')),
+            ],
+            options={
+                'verbose_name': 'Compromiso aceptado',
+                'verbose_name_plural': 'Compromisos aceptados',
+                'ordering': ('id',),
+                'indexes': [models.Index(fields=['proyecto', 'estado'], name='bonita_comp_proyect_af6bb5_idx'), models.Index(fields=['proyecto', 'fecha'], name='bonita_comp_proyect_bad9ff_idx'), models.Index(fields=['aceptado_en'], name='bonita_comp_aceptad_3623ec_idx')],
+                'unique_together': {('proyecto', 'compromiso_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='EtapaPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orden', models.PositiveIntegerField()),
+                ('nombre', models.CharField(blank=True, max_length=255)),
+                ('fecha_inicio_prevista', models.DateField(blank=True, null=True)),
+                ('fecha_fin_prevista', models.DateField(blank=True, null=True)),
+                ('datos', models.JSONField(blank=True, default=dict)),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='etapas', to='bonita.proyectomonitoreo')),
+            ],
+            options={
+                'verbose_name': 'Etapa del plan',
+                'verbose_name_plural': 'Etapas del plan',
+                'ordering': ('proyecto', 'orden'),
+                'indexes': [models.Index(fields=['proyecto', 'fecha_inicio_prevista'], name='bonita_etap_proyect_6a25cc_idx')],
+                'unique_together': {('proyecto', 'orden')},
+            },
+        ),
+        migrations.RunPython(desde_json, hacia_json),
+        migrations.RemoveField(
+            model_name='proyectomonitoreo',
+            name='compromisos_aceptados',
+        ),
+        migrations.RemoveField(
+            model_name='proyectomonitoreo',
+            name='plan_trabajo',
+        ),
+    ]
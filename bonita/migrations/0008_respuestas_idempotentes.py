@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-19 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bonita', '0007_tablas_monitoreo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RespuestaIdempotente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('case_id', models.CharField(blank=True, max_length=100)),
+                ('endpoint', models.CharField(max_length=100)),
+                ('clave', models.CharField(max_length=100)),
+                ('huella', models.CharField(max_length=64)),
+                ('status', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('cuerpo', models.BinaryField(blank=True, default=b'')),
+                ('creado_en', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Respuesta idempotente',
+                'verbose_name_plural': 'Respuestas idempotentes',
+                'unique_together': {('case_id', 'endpoint', 'clave')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.6 on 2026-10-19 02:35
+
+from django.db import migrations
+
+
+def borrar_tokens(apps, schema_editor):
+    """Saca el token JWT ("access") que se copiaba en CasoBonita.variables."""
+    CasoBonita = apps.get_model("bonita", "CasoBonita")
+    db = schema_editor.connection.alias
+
+    for caso in CasoBonita.objects.using(db).iterator():
+        variables = caso.variables if isinstance(caso.variables, dict) else {}
+        if "access" in variables:
+            caso.variables = {k: v for k, v in variables.items() if k != "access"}
+            caso.save(update_fields=["variables"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bonita', '0008_respuestas_idempotentes'),
+    ]
+
+    operations = [
+        migrations.RunPython(borrar_tokens, migrations.RunPython.noop),
+    ]
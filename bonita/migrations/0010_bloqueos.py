@@ -0,0 +1,26 @@
+# Generated by Django 5.0.6 on 2026-10-19 02:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bonita', '0009_casos_sin_tokens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bloqueo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=150, unique=True)),
+                ('dueno', models.CharField(max_length=32)),
+                ('vence', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Bloqueo',
+                'verbose_name_plural': 'Bloqueos',
+            },
+        ),
+    ]
@@ -2,11 +2,14 @@ from django.db import models
 
 
 class ProyectoMonitoreo(models.Model):
+    """
+    Snapshot local de un proyecto para el monitoreo. Las etapas del plan de
+    trabajo y los compromisos aceptados están en tablas hijas (EtapaPlan,
+    CompromisoAceptado; ver bonita/monitoreo.py).
+    """
     proyecto_id = models.IntegerField(primary_key=True)
     nombre = models.CharField(max_length=255)
     descripcion = models.TextField(blank=True)
-    plan_trabajo = models.JSONField(default=dict, blank=True)
-    compromisos_aceptados = models.JSONField(default=list, blank=True)
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
 
@@ -14,6 +17,59 @@ class ProyectoMonitoreo(models.Model):
         return f"[{self.proyecto_id}] {self.nombre}"
 
 
+class EtapaPlan(models.Model):
+    """
+    Etapa del plan de trabajo de un proyecto. `datos` guarda la etapa tal
+    como vino (es lo que se devuelve); las fechas se copian a columnas para
+    poder filtrar en SQL.
+    """
+    proyecto = models.ForeignKey(ProyectoMonitoreo, on_delete=models.CASCADE, related_name="etapas")
+    orden = models.PositiveIntegerField()
+    nombre = models.CharField(max_length=255, blank=True)
+    fecha_inicio_prevista = models.DateField(null=True, blank=True)
+    fecha_fin_prevista = models.DateField(null=True, blank=True)
+    datos = models.JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        return f"[{self.proyecto_id}] {self.orden}. {self.nombre}"
+
+    class Meta:
+        ordering = ("proyecto", "orden")
+        unique_together = ("proyecto", "orden")
+        indexes = [models.Index(fields=["proyecto", "fecha_inicio_prevista"])]
+        verbose_name = "Etapa del plan"
+        verbose_name_plural = "Etapas del plan"
+
+
+class CompromisoAceptado(models.Model):
+    """
+    Compromiso aceptado de un proyecto. Sólo se insertan filas (una por
+    aceptación); el orden de aceptación es el del id.
+    `fecha` es la del compromiso tal como la manda el backend (ISO 8601:
+    ordena y filtra bien como texto).
+    """
+    proyecto = models.ForeignKey(ProyectoMonitoreo, on_delete=models.CASCADE, related_name="compromisos")
+    compromiso_id = models.IntegerField()
+    detalle = models.TextField(blank=True)
+    fecha = models.CharField(max_length=40, blank=True)
+    estado = models.CharField(max_length=50, blank=True)
+    aceptado_en = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"[{self.proyecto_id}] compromiso {self.compromiso_id} ({self.estado})"
+
+    class Meta:
+        ordering = ("id",)
+        unique_together = ("proyecto", "compromiso_id")
+        indexes = [
+            models.Index(fields=["proyecto", "estado"]),
+            models.Index(fields=["proyecto", "fecha"]),
+            models.Index(fields=["aceptado_en"]),
+        ]
+        verbose_name = "Compromiso aceptado"
+        verbose_name_plural = "Compromisos aceptados"
+
+
 class SesionBonita(models.Model):
     """
     Guarda la relación entre un usuario de la API y su caso activo en Bonita.
@@ -31,3 +87,149 @@ class SesionBonita(models.Model):
     class Meta:
         verbose_name = "Sesión Bonita"
         verbose_name_plural = "Sesiones Bonita"
+
+
+class AgregadoDashboard(models.Model):
+    """
+    Métricas del dashboard materializadas localmente.
+
+    Los contadores se actualizan de a uno con cada evento del flujo
+    (proyecto creado, pedido registrado, observación enviada, etc.) y se
+    corrigen periódicamente contra /api/dashboard/metricas/. Los listados
+    (top de proyectos, observaciones recientes) se guardan en `detalle`
+    y sólo cambian en cada reconciliación.
+    """
+    clave = models.CharField(max_length=100, unique=True)
+    valor = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    detalle = models.JSONField(default=list, blank=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.clave} = {self.valor}"
+
+    class Meta:
+        verbose_name = "Agregado del dashboard"
+        verbose_name_plural = "Agregados del dashboard"
+
+
+class SnapshotMetricas(models.Model):
+    """
+    Foto periódica de las métricas escalares del dashboard (una fila por
+    toma). Las series de tendencia se arman a partir de estas filas en
+    lugar de recalcular el dashboard.
+    """
+    tomado_en = models.DateTimeField(db_index=True)
+    metricas = models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"Snapshot {self.tomado_en:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        ordering = ("tomado_en",)
+        verbose_name = "Snapshot de métricas"
+        verbose_name_plural = "Snapshots de métricas"
+
+
+class CasoBonita(models.Model):
+    """
+    Modelo de lectura local del estado de un caso activo de Bonita: la tarea
+    humana 'ready' actual y las variables de caso que leen las pantallas.
+
+    Lo mantiene el comando `sincronizar_casos` (consultas en bloque a Bonita)
+    y lo actualizan nuestras propias escrituras (ver bonita/casos.py).
+    `sucio` indica que ejecutamos una tarea del caso y las variables pueden
+    haber cambiado: la próxima lectura va a Bonita.
+    """
+    case_id = models.CharField(max_length=100, unique=True)
+    proceso_id = models.CharField(max_length=100, blank=True)
+    tarea_id = models.CharField(max_length=100, blank=True)
+    tarea_nombre = models.CharField(max_length=255, blank=True)
+    variables = models.JSONField(default=dict, blank=True)
+    sucio = models.BooleanField(default=False)
+    sincronizado_en = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Caso {self.case_id} ({self.tarea_nombre or 'sin tarea'})"
+
+    class Meta:
+        verbose_name = "Caso Bonita"
+        verbose_name_plural = "Casos Bonita"
+
+
+class VersionListado(models.Model):
+    """
+    Versión de un listado de un caso (compromisos, pedidos, observaciones
+    de un proyecto, ...). Sube cada vez que cambia algún elemento; los
+    clientes que hacen polling la mandan en ?since= y reciben sólo lo que
+    cambió (ver bonita/deltas.py).
+    """
+    case_id = models.CharField(max_length=100)
+    listado = models.CharField(max_length=100)
+    version = models.PositiveIntegerField(default=0)
+    # Hash del listado completo: si no cambió no se compara elemento por elemento
+    hash_contenido = models.CharField(max_length=32, blank=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.case_id}/{self.listado} v{self.version}"
+
+    class Meta:
+        unique_together = ("case_id", "listado")
+        verbose_name = "Versión de listado"
+        verbose_name_plural = "Versiones de listados"
+
+
+class ElementoListado(models.Model):
+    """Hash de cada elemento de un listado y la versión en que cambió por última vez."""
+    listado = models.ForeignKey(VersionListado, on_delete=models.CASCADE, related_name="elementos")
+    clave = models.CharField(max_length=100)
+    hash = models.CharField(max_length=32)
+    version = models.PositiveIntegerField()
+    eliminado = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ("listado", "clave")
+        indexes = [models.Index(fields=["listado", "version"])]
+
+
+class RespuestaIdempotente(models.Model):
+    """
+    Primera respuesta de un POST con header Idempotency-Key, por caso,
+    endpoint y clave (ver bonita/idempotencia.py). Mientras `status` es
+    None la request original sigue en curso.
+    """
+    case_id = models.CharField(max_length=100, blank=True)
+    endpoint = models.CharField(max_length=100)
+    clave = models.CharField(max_length=100)
+    # Hash del body: la misma clave con otro contenido es un error del cliente
+    huella = models.CharField(max_length=64)
+    status = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    cuerpo = models.BinaryField(blank=True, default=b"")
+    creado_en = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.endpoint} {self.case_id}/{self.clave} ({self.status or 'en curso'})"
+
+    class Meta:
+        unique_together = ("case_id", "endpoint", "clave")
+        verbose_name = "Respuesta idempotente"
+        verbose_name_plural = "Respuestas idempotentes"
+
+
+class Bloqueo(models.Model):
+    """
+    Lock entre workers (ver bonita/bloqueos.py): existe mientras alguien
+    tiene tomada la `clave`. `vence` libera los que quedaron de un worker
+    que murió.
+    """
+    clave = models.CharField(max_length=150, unique=True)
+    dueno = models.CharField(max_length=32)
+    vence = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.clave} (hasta {self.vence:%H:%M:%S})"
+
+    class Meta:
+        verbose_name = "Bloqueo"
+        verbose_name_plural = "Bloqueos"
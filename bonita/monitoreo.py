@@ -0,0 +1,109 @@
+# bonita/monitoreo.py
+"""
+Snapshot local de los proyectos para el monitoreo (ProyectoMonitoreo y sus
+tablas hijas EtapaPlan y CompromisoAceptado).
+
+- guardar_proyecto(): al iniciar un proyecto, nombre/descripción y etapas
+  del plan de trabajo (una fila por etapa).
+- agregar_compromiso(): al aceptar un compromiso, UN insert; nunca se
+  reescribe la lista completa.
+- etapas() / compromisos(): lecturas para resumen_proyecto_api; los
+  compromisos se pueden filtrar por estado y paginar en SQL.
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from .models import CompromisoAceptado, EtapaPlan, ProyectoMonitoreo
+
+
+def _fecha(valor: Any) -> Optional[date]:
+    """Fecha (YYYY-MM-DD, con o sin hora) o None si no se puede leer."""
+    try:
+        return parse_date(str(valor or "")[:10])
+    except ValueError:
+        return None
+
+
+def _entero(valor: Any) -> Optional[int]:
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def guardar_proyecto(proyecto_id: int, nombre: str, descripcion: str, plan: Any) -> None:
+    """Crea/actualiza el snapshot del proyecto y reemplaza sus etapas."""
+    etapas = plan.get("etapas") if isinstance(plan, dict) else None
+    with transaction.atomic():
+        ProyectoMonitoreo.objects.update_or_create(
+            proyecto_id=proyecto_id,
+            defaults={"nombre": nombre, "descripcion": descripcion},
+        )
+        EtapaPlan.objects.filter(proyecto_id=proyecto_id).delete()
+        EtapaPlan.objects.bulk_create([
+            EtapaPlan(
+                proyecto_id=proyecto_id,
+                orden=orden,
+                nombre=str(etapa.get("nombre") or "")[:255],
+                fecha_inicio_prevista=_fecha(etapa.get("fechaInicioPrevista")),
+                fecha_fin_prevista=_fecha(etapa.get("fechaFinPrevista")),
+                datos=etapa,
+            )
+            for orden, etapa in enumerate(etapas if isinstance(etapas, list) else [])
+            if isinstance(etapa, dict)
+        ])
+
+
+def agregar_compromiso(proyecto_id: int, compromiso: Dict[str, Any]) -> None:
+    """
+    Registra un compromiso aceptado ({"id", "detalle", "fecha", "estado"}).
+    Si ya estaba registrado para el proyecto no hace nada.
+    """
+    compromiso_id = _entero(compromiso.get("id"))
+    if compromiso_id is None:
+        return
+    ProyectoMonitoreo.objects.get_or_create(proyecto_id=proyecto_id, defaults={"nombre": ""})
+    CompromisoAceptado.objects.bulk_create(
+        [
+            CompromisoAceptado(
+                proyecto_id=proyecto_id,
+                compromiso_id=compromiso_id,
+                detalle=str(compromiso.get("detalle") or ""),
+                fecha=str(compromiso.get("fecha") or "")[:40],
+                estado=str(compromiso.get("estado") or "")[:50],
+            )
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def etapas(proyecto_id: int) -> List[Dict[str, Any]]:
+    """Etapas del plan de trabajo, en orden, tal como se cargaron."""
+    return list(EtapaPlan.objects.filter(proyecto_id=proyecto_id).values_list("datos", flat=True))
+
+
+def compromisos(
+        proyecto_id: int,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        estado: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Compromisos aceptados en orden de aceptación. Devuelve (página, total);
+    el total cuenta los que cumplen el filtro de estado.
+    """
+    qs = CompromisoAceptado.objects.filter(proyecto_id=proyecto_id)
+    if estado:
+        qs = qs.filter(estado=estado)
+    total = qs.count()
+    fin = None if limit is None else offset + limit
+    filas = qs.values("compromiso_id", "detalle", "fecha", "estado")[offset:fin]
+    return [
+        {"id": f["compromiso_id"], "detalle": f["detalle"], "fecha": f["fecha"], "estado": f["estado"]}
+        for f in filas
+    ], total
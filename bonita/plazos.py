@@ -0,0 +1,123 @@
+# bonita/plazos.py
+"""
+Plazo (deadline) de cada request.
+
+Los timeouts de un request se acumulan: un chequeo contra la API JWT, la
+espera de una tarea y varias llamadas a Bonita pueden sumar bastante más de
+lo que espera el proxy, que corta la conexión sin respuesta.
+
+PlazoMiddleware (bonita/middleware.py) fija al empezar el request un
+vencimiento (PLAZOS_RESPUESTA por nombre de URL, o PLAZO_RESPUESTA) en un
+ContextVar, y todo lo que sale del request lo respeta:
+
+- restante(timeout): timeout de la próxima llamada (Bonita o API JWT),
+  acotado a lo que queda del plazo;
+- dormir()/adormir(): esperas acotadas al plazo;
+- acotar(): espera una tarea async a lo sumo lo que queda del plazo.
+
+Lo que viene después de ejecutar una tarea de Bonita (execute_task) no se
+puede cortar a mitad de camino sin dejar el proceso a medias: corre dentro
+de sin_plazo().
+
+Cuando el plazo se agota lanzan PlazoVencido. Si el request termina en
+error con el plazo agotado, el middleware responde 504 con JSON (y 503 si
+fue el control de admisión, ver bonita/admision.py).
+
+Fuera de un request (comandos, hilos de fondo) no hay plazo: restante()
+devuelve el timeout pedido.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Awaitable, Iterator, Optional
+
+# Por debajo de esto no vale la pena empezar una llamada
+_MINIMO = 0.05
+
+
+class PlazoVencido(Exception):
+    pass
+
+
+class Plazo:
+    def __init__(self, segundos: float) -> None:
+        self.segundos = segundos
+        self.vence = time.monotonic() + segundos
+        self.vencido = False
+        # Si el control de admisión (bonita/admision.py) rechazó una llamada
+        # del request: segundos para el Retry-After del 503
+        self.reintentar_en: Optional[float] = None
+
+    def restante(self) -> float:
+        return self.vence - time.monotonic()
+
+
+_actual: ContextVar[Optional[Plazo]] = ContextVar("plazo", default=None)
+
+
+def actual() -> Optional[Plazo]:
+    return _actual.get()
+
+
+def activar(plazo: Optional[Plazo]) -> Token:
+    """Fija el plazo del contexto actual; devuelve el token para desactivar()."""
+    return _actual.set(plazo)
+
+
+def desactivar(token: Token) -> None:
+    _actual.reset(token)
+
+
+@contextmanager
+def sin_plazo() -> Iterator[None]:
+    """El bloque corre sin el plazo del request (y después se restaura)."""
+    token = activar(None)
+    try:
+        yield
+    finally:
+        desactivar(token)
+
+
+def restante(timeout: Optional[float] = None) -> Optional[float]:
+    """
+    min(timeout, lo que queda del plazo). Sin plazo devuelve `timeout`.
+    Lanza PlazoVencido si ya no queda tiempo.
+    """
+    plazo = _actual.get()
+    if plazo is None:
+        return timeout
+    queda = plazo.restante()
+    if queda < _MINIMO:
+        _vencer(plazo)
+    return queda if timeout is None else min(timeout, queda)
+
+
+def _vencer(plazo: Plazo) -> None:
+    plazo.vencido = True
+    raise PlazoVencido(f"Se agotó el plazo de {plazo.segundos:g} s del request")
+
+
+def dormir(segundos: float) -> None:
+    time.sleep(restante(segundos))
+
+
+async def adormir(segundos: float) -> None:
+    await asyncio.sleep(restante(segundos))
+
+
+async def acotar(espera: Awaitable[Any]) -> Any:
+    """Espera `espera` a lo sumo lo que queda del plazo (al vencer, la cancela)."""
+    try:
+        timeout = restante()
+    except PlazoVencido:
+        # Ya vencido: `espera` no se llega a esperar, se cierra igual
+        if asyncio.iscoroutine(espera):
+            espera.close()
+        raise
+    try:
+        return await asyncio.wait_for(espera, timeout=timeout)
+    except asyncio.TimeoutError:
+        _vencer(_actual.get())
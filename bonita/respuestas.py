@@ -0,0 +1,239 @@
+# bonita/respuestas.py
+"""
+Utilidades para las respuestas JSON de la API.
+
+- JsonCrudoResponse: incluye texto JSON crudo sin volver a parsearlo. Las
+  variables de caso como proyectosJson o pedidosJson ya son texto JSON;
+  parsearlas sólo para que JsonResponse las vuelva a serializar es CPU y
+  memoria desperdiciadas.
+- con_etag: ETags fuertes y GET condicional (If-None-Match -> 304).
+- JsonResponse: reemplazo de django.http.JsonResponse que serializa con
+  orjson si está instalado (varias veces más rápido) y si no con la stdlib.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+_CIERRES = {"[": "]", "{": "}"}
+
+# Hash de los textos que ya se validaron como JSON (LRU por worker, hasta
+# RESPUESTAS_JSON_VALIDADOS entradas): cada valor se parsea una sola vez
+_validados: "OrderedDict[bytes, None]" = OrderedDict()
+_validados_lock = threading.Lock()
+
+# --------------------------- Serialización ---------------------------
+
+# Fechas, Decimal, etc. pasan por DjangoJSONEncoder: mismo formato que la stdlib
+_OPCIONES_ORJSON = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson is not None else 0
+)
+_django_encoder = DjangoJSONEncoder()
+
+
+def orjson_disponible() -> bool:
+    return orjson is not None and getattr(settings, "RESPUESTAS_JSON_MOTOR", "auto") != "stdlib"
+
+
+def dumps(data: Any) -> bytes:
+    """
+    Serializa a JSON (bytes UTF-8). Usa orjson si está disponible y cae a
+    json.dumps + DjangoJSONEncoder si no, o si orjson no puede con el dato
+    (p. ej. enteros de más de 64 bits).
+    """
+    if orjson_disponible():
+        try:
+            return orjson.dumps(data, default=_django_encoder.default, option=_OPCIONES_ORJSON)
+        except TypeError:
+            pass
+    return json.dumps(data, cls=DjangoJSONEncoder).encode("utf-8")
+
+
+class JsonResponse(HttpResponse):
+    """
+    Reemplazo directo de django.http.JsonResponse con el serializador rápido.
+    Con un `encoder` distinto de DjangoJSONEncoder o `json_dumps_params` se
+    usa la stdlib, igual que Django.
+    """
+
+    def __init__(
+            self,
+            data: Any,
+            encoder: type = DjangoJSONEncoder,
+            safe: bool = True,
+            json_dumps_params: Optional[Dict[str, Any]] = None,
+            **kwargs: Any,
+    ) -> None:
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the safe parameter to False."
+            )
+        kwargs.setdefault("content_type", "application/json")
+        if encoder is DjangoJSONEncoder and not json_dumps_params:
+            contenido = dumps(data)
+        else:
+            contenido = json.dumps(data, cls=encoder, **(json_dumps_params or {}))
+        super().__init__(content=contenido, **kwargs)
+
+
+def _rechazar_constante(nombre: str) -> Any:
+    # NaN/Infinity: json.loads los acepta pero no son JSON válido
+    raise ValueError(nombre)
+
+
+def _parsea(texto: str) -> bool:
+    try:
+        if orjson is not None:
+            orjson.loads(texto)
+        else:
+            json.loads(texto, parse_constant=_rechazar_constante)
+    except ValueError:  # orjson.JSONDecodeError también es ValueError
+        return False
+    return True
+
+
+def es_json_compuesto(texto: Any) -> bool:
+    """
+    True si `texto` es un arreglo u objeto JSON válido que se puede pegar
+    tal cual en una respuesta. Primero un chequeo barato (abre con [ o { y
+    cierra con el delimitador que corresponde); después se parsea una vez y
+    el resultado se recuerda por hash del texto, así el mismo valor no se
+    vuelve a parsear. Lo que no pasa cae al camino con json.loads() de la
+    vista.
+    """
+    if not isinstance(texto, str):
+        return False
+    texto = texto.strip()
+    if len(texto) < 2 or _CIERRES.get(texto[0]) != texto[-1]:
+        return False
+
+    clave = hashlib.blake2b(texto.encode("utf-8"), digest_size=16).digest()
+    with _validados_lock:
+        if clave in _validados:
+            _validados.move_to_end(clave)
+            return True
+    if not _parsea(texto):
+        return False
+    maximo = int(getattr(settings, "RESPUESTAS_JSON_VALIDADOS", 256))
+    with _validados_lock:
+        _validados[clave] = None
+        while len(_validados) > maximo:
+            _validados.popitem(last=False)
+    return True
+
+
+class JsonCrudoResponse(HttpResponse):
+    """
+    Como JsonResponse(data), pero agrega al final del objeto los campos de
+    `crudos` ({clave: texto_json}) pegando el texto sin decodificarlo.
+    Validar los textos (es_json_compuesto) es responsabilidad de la vista:
+    uno inválido deja el cuerpo entero inválido.
+    """
+
+    def __init__(self, data: Dict[str, Any], crudos: Dict[str, str], **kwargs: Any) -> None:
+        kwargs.setdefault("content_type", "application/json")
+        partes = [dumps(data)[:-1]]
+        separador = b"," if data else b""
+        for clave, texto in crudos.items():
+            partes.append(separador + dumps(clave) + b":" + texto.strip().encode("utf-8"))
+            separador = b","
+        partes.append(b"}")
+        super().__init__(content=b"".join(partes), **kwargs)
+
+
+# --------------------------- ETags ---------------------------
+
+def calcular_etag(*partes: Any) -> str:
+    """ETag fuerte (entre comillas) a partir de strings/bytes/None."""
+    h = hashlib.blake2b(digest_size=16)
+    for parte in partes:
+        if parte is None:
+            parte = b"\x00"
+        elif not isinstance(parte, bytes):
+            parte = str(parte).encode("utf-8")
+        h.update(len(parte).to_bytes(8, "big"))
+        h.update(parte)
+    return quote_etag(h.hexdigest())
+
+
+def no_modificado(req: HttpRequest, etag: str) -> Optional[HttpResponse]:
+    """304 si If-None-Match coincide con `etag` (GET/HEAD); si no, None."""
+    resp = get_conditional_response(req, etag=etag)
+    if resp is not None:
+        resp.headers["ETag"] = etag
+        patch_cache_control(resp, private=True, no_cache=True)
+    return resp
+
+
+def etiquetar(req: HttpRequest, resp: HttpResponse, etag: str) -> HttpResponse:
+    """
+    Agrega ETag y "private, no-cache" (el navegador revalida siempre) a una
+    respuesta 200 y la cambia por 304 si If-None-Match coincide.
+    """
+    if resp.status_code != 200 or resp.streaming:
+        return resp
+    resp.headers["ETag"] = etag
+    patch_cache_control(resp, private=True, no_cache=True)
+    return get_conditional_response(req, etag=etag, response=resp)
+
+
+def _etag_local_seguro(etag_local, req: HttpRequest) -> Optional[str]:
+    if etag_local is None:
+        return None
+    try:
+        return etag_local(req)
+    except Exception as e:
+        print(f"Advertencia: no se pudo calcular el ETag local: {e}")
+        return None
+
+
+def con_etag(etag_local: Optional[Callable[[HttpRequest], Optional[str]]] = None):
+    """
+    GET condicional para vistas de sólo lectura.
+
+    `etag_local(req)` calcula el ETag con datos locales (modelo de lectura,
+    versión de un cache) o devuelve None si no los hay. Si el ETag coincide
+    con If-None-Match se responde 304 sin ejecutar la vista (ni ir a Bonita).
+
+    Si no hay ETag local, se ejecuta la vista y el ETag sale del hash del
+    cuerpo: no se ahorra el trabajo, pero sí la transferencia.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(req: HttpRequest, *args, **kwargs):
+            if req.method not in ("GET", "HEAD"):
+                return vista(req, *args, **kwargs)
+
+            etag = _etag_local_seguro(etag_local, req)
+            if etag is not None:
+                resp = no_modificado(req, etag)
+                if resp is not None:
+                    return resp
+
+            resp = vista(req, *args, **kwargs)
+            if resp.status_code != 200 or resp.streaming:
+                return resp
+
+            # Si la vista acaba de traer los datos locales, el ETag local ya
+            # está disponible: se usa ése, así la próxima vez coincide antes
+            # de ejecutar la vista.
+            etag = etag or _etag_local_seguro(etag_local, req) or calcular_etag(resp.content)
+            return etiquetar(req, resp, etag)
+
+        return envoltura
+
+    return decorador
@@ -0,0 +1,137 @@
+import threading
+import time
+
+from django.test import SimpleTestCase, override_settings
+
+from bonita import admision, plazos
+
+
+@override_settings(
+    BONITA_CUPOS={"interactivo": 1, "fondo": 1, "masivo": 1},
+    BONITA_COLA=8,
+    BONITA_COLA_ESPERA=5,
+)
+class LimitadorTests(SimpleTestCase):
+    def setUp(self):
+        self.limitador = admision.Limitador()
+
+    def llenar(self):
+        for _ in range(3):
+            self.limitador.entrar("interactivo")
+
+    def test_cola_llena_es_saturado(self):
+        self.llenar()
+
+        with override_settings(BONITA_COLA=0):
+            with self.assertRaises(admision.Saturado):
+                self.limitador.entrar("interactivo")
+        self.assertEqual(self.limitador.metricas()["carriles"]["interactivo"]["rechazadas"], 1)
+
+    def test_espera_agotada_es_saturado(self):
+        self.llenar()
+
+        with override_settings(BONITA_COLA_ESPERA=0.05):
+            with self.assertRaises(admision.Saturado):
+                self.limitador.entrar("interactivo")
+        self.assertEqual(self.limitador.metricas()["enCola"], 0)
+
+    def test_lugar_liberado_pasa_al_que_espera(self):
+        self.llenar()
+        resultado = {}
+        hilo = threading.Thread(target=lambda: resultado.update(cupo=self.limitador.entrar("interactivo")))
+        hilo.start()
+        limite = time.monotonic() + 2
+        while not self.limitador._colas["interactivo"] and time.monotonic() < limite:
+            time.sleep(0.005)
+
+        self.limitador.salir("fondo")
+        hilo.join(2)
+
+        self.assertEqual(resultado, {"cupo": "fondo"})
+        self.assertEqual(self.limitador.metricas()["enCurso"], 3)
+
+    def test_espera_acotada_al_plazo(self):
+        self.llenar()
+
+        plazo = plazos.Plazo(0.2)
+        token = plazos.activar(plazo)
+        try:
+            t0 = time.monotonic()
+            with self.assertRaises(admision.Saturado):
+                self.limitador.entrar("interactivo")
+            self.assertLess(time.monotonic() - t0, 1)
+        finally:
+            plazos.desactivar(token)
+        # Anotado en el plazo para el Retry-After del 503
+        self.assertIsNotNone(plazo.reintentar_en)
+        self.assertEqual(len(self.limitador._colas["interactivo"]), 0)
+
+
+@override_settings(
+    BONITA_CUPOS={"interactivo": 1, "fondo": 1, "masivo": 1},
+    BONITA_COLA=8,
+    BONITA_COLA_ESPERA=5,
+)
+class CarrilesTests(SimpleTestCase):
+    def setUp(self):
+        self.limitador = admision.Limitador()
+
+    def esperar_en_cola(self, carril):
+        """Entra a `carril` en un hilo; devuelve (hilo, resultado) cuando ya está en la cola."""
+        resultado = {}
+
+        def entrar():
+            try:
+                resultado["cupo"] = self.limitador.entrar(carril)
+            except admision.Saturado as e:
+                resultado["error"] = e
+
+        hilo = threading.Thread(target=entrar)
+        en_cola = len(self.limitador._colas[carril])
+        hilo.start()
+        limite = time.monotonic() + 2
+        while len(self.limitador._colas[carril]) == en_cola and time.monotonic() < limite:
+            time.sleep(0.005)
+        self.assertEqual(len(self.limitador._colas[carril]), en_cola + 1)
+        return hilo, resultado
+
+    def test_carril_desconocido(self):
+        with self.assertRaises(ValueError):
+            self.limitador.lugar("urgente")
+
+    def test_interactivo_usa_cupos_de_menor_prioridad(self):
+        cupos = [self.limitador.entrar("interactivo") for _ in range(3)]
+
+        self.assertEqual(cupos, ["interactivo", "fondo", "masivo"])
+
+    def test_masivo_no_toma_cupos_de_mayor_prioridad(self):
+        self.assertEqual(self.limitador.entrar("masivo"), "masivo")
+
+        with override_settings(BONITA_COLA_ESPERA=0.05):
+            with self.assertRaises(admision.Saturado):
+                self.limitador.entrar("masivo")
+
+        # Los cupos de interactivo y fondo siguen libres
+        self.assertEqual(self.limitador.entrar("fondo"), "fondo")
+        self.assertEqual(self.limitador.entrar("interactivo"), "interactivo")
+
+    def test_lugar_liberado_pasa_al_carril_de_mayor_prioridad(self):
+        for _ in range(3):
+            self.limitador.entrar("interactivo")
+        hilo_masivo, masivo = self.esperar_en_cola("masivo")
+        hilo_interactivo, interactivo = self.esperar_en_cola("interactivo")
+
+        # El cupo masivo lo pueden usar los dos: va al interactivo, que llegó después
+        self.limitador.salir("masivo")
+        hilo_interactivo.join(2)
+        self.assertEqual(interactivo, {"cupo": "masivo"})
+        self.assertTrue(hilo_masivo.is_alive())
+
+        # El cupo de fondo no lo puede usar masivo: queda libre
+        self.limitador.salir("fondo")
+        self.assertTrue(hilo_masivo.is_alive())
+        self.assertEqual(self.limitador.metricas()["carriles"]["fondo"]["ocupados"], 0)
+
+        self.limitador.salir("masivo")
+        hilo_masivo.join(2)
+        self.assertEqual(masivo, {"cupo": "masivo"})
@@ -0,0 +1,80 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from bonita import agregados
+from bonita.metricas import AgregadorDashboard, agregar_metricas
+from bonita.metricas_numpy import AgregadorColumnar, numpy_disponible
+from bonita.models import AgregadoDashboard
+from bonita.tests.test_metricas import DATOS
+
+
+class AgregadosTests(TestCase):
+    def setUp(self):
+        self.resultado = agregar_metricas(DATOS)
+
+    def test_sin_reconciliar_no_hay_datos_ni_eventos(self):
+        agregados.registrar_evento("proyecto_creado")
+
+        self.assertIsNone(agregados.leer())
+        self.assertFalse(AgregadoDashboard.objects.exists())
+
+    def test_guardar_y_leer(self):
+        agregados.guardar(self.resultado)
+
+        self.assertEqual(agregados.leer(), self.resultado)
+
+    def test_eventos_ajustan_los_contadores(self):
+        agregados.guardar(self.resultado)
+
+        agregados.registrar_evento("observacion_respondida")
+        agregados.registrar_evento("compromiso_registrado", monto="4.9")
+
+        m = agregados.leer()["metricas"]
+        self.assertEqual((m["observaciones_pendientes"], m["observaciones_respondidas"]), (1, 1))
+        self.assertEqual(m["total_compromisos"], 5)
+        self.assertEqual(m["monto_total_compromisos"], 20.0)
+        self.assertEqual(m["monto_promedio_compromiso"], 4.0)
+
+    def test_guardar_conserva_lo_que_un_evento_toco_despues(self):
+        agregados.guardar(self.resultado)
+        desde = timezone.now()
+        agregados.registrar_evento("pedido_registrado")
+
+        # La API se consultó antes del evento: su total no lo incluye
+        agregados.guardar(self.resultado, desde=desde)
+
+        m = agregados.leer()["metricas"]
+        self.assertEqual(m["total_pedidos"], 4)
+        self.assertEqual(m["total_proyectos"], 3)
+
+    def test_max_edad(self):
+        agregados.guardar(self.resultado)
+        AgregadoDashboard.objects.filter(clave=agregados.CLAVE_RECONCILIACION).update(
+            actualizado_en=timezone.now() - timedelta(seconds=120)
+        )
+
+        self.assertIsNone(agregados.leer(max_edad=60))
+        self.assertIsNotNone(agregados.leer(max_edad=300))
+
+    def test_reconciliar_con_la_api_caida_no_toca_la_tabla(self):
+        agregados.guardar(self.resultado)
+
+        with mock.patch.object(agregados, "calcular_desde_api", return_value=None):
+            resultado = agregados.reconciliar()
+
+        self.assertTrue(resultado["stale"])
+        self.assertEqual(resultado["metricas"], self.resultado["metricas"])
+
+    def test_reconciliar_sin_datos_y_api_caida(self):
+        with mock.patch.object(agregados, "calcular_desde_api", return_value=None):
+            self.assertIsNone(agregados.reconciliar())
+
+    def test_motor_segun_settings(self):
+        with override_settings(DASHBOARD_MOTOR="python"):
+            self.assertIsInstance(agregados.nuevo_agregador(), AgregadorDashboard)
+        with override_settings(DASHBOARD_MOTOR="numpy"):
+            esperado = AgregadorColumnar if numpy_disponible() else AgregadorDashboard
+            self.assertIsInstance(agregados.nuevo_agregador(), esperado)
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import threading
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from bonita import bonita_client_async, bucle, plazos, views
+from bonita.bonita_client_async import AsyncBonitaClient
+from bonita.bonita_client import _sesion
+from bonita.tests.test_bonita_client import respuesta
+
+
+@override_settings(BONITA_BASE_URL="http://bonita.test/bonita")
+class AsyncBonitaClientTests(SimpleTestCase):
+    def setUp(self):
+        _sesion.borrar("actual")
+        self.addCleanup(_sesion.borrar, "actual")
+        self.pedidos = []
+        self.respuestas = []
+
+        async def pedir(method, url, timeout=15.0, **kwargs):
+            self.pedidos.append((method, url.replace("http://bonita.test/bonita", ""), kwargs.get("headers") or {}))
+            return self.respuestas.pop(0)
+
+        parche = mock.patch.object(bonita_client_async, "pedir", pedir)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def login_ok(self):
+        r = respuesta(None, status=204)
+        r.cookies.set("JSESSIONID", "s1")
+        r.cookies.set("X-Bonita-API-Token", "csrf1")
+        return r
+
+    def test_login_se_comparte_entre_clientes(self):
+        self.respuestas = [self.login_ok()]
+
+        async def dos_logins():
+            uno, otro = AsyncBonitaClient(), AsyncBonitaClient()
+            await uno.login()
+            await otro.login()
+            return otro
+
+        otro = async_to_sync(dos_logins)()
+
+        self.assertEqual([p[1] for p in self.pedidos], ["/loginservice"])
+        self.assertEqual(otro._h()["X-Bonita-API-Token"], "csrf1")
+        self.assertIn("JSESSIONID=s1", otro._h()["Cookie"])
+
+    def test_sesion_vencida_se_relogea_y_repite(self):
+        _sesion.set("actual", {"cookies": {"JSESSIONID": "viejo"}, "csrf": "x"})
+        self.respuestas = [respuesta({}, status=401), self.login_ok(), respuesta({"id": "1"})]
+
+        async def leer():
+            cli = AsyncBonitaClient()
+            await cli.login()
+            return await cli.get_case("1")
+
+        self.assertEqual(async_to_sync(leer)(), {"id": "1"})
+        self.assertEqual([p[1] for p in self.pedidos], ["/API/bpm/case/1", "/loginservice", "/API/bpm/case/1"])
+        self.assertIn("JSESSIONID=s1", self.pedidos[-1][2]["Cookie"])
+
+    def test_paginar_y_contar(self):
+        self.respuestas = [
+            respuesta([{"id": str(i)} for i in range(100)]),
+            respuesta([{"id": "100"}]),
+            respuesta([{"id": "1"}], **{"Content-Range": "0-0/321"}),
+        ]
+
+        async def usar():
+            cli = AsyncBonitaClient()
+            return len(await cli.list_cases(state="started")), await cli.count_cases()
+
+        self.assertEqual(async_to_sync(usar)(), (101, 321))
+
+    def test_variable_inexistente(self):
+        self.respuestas = [respuesta({}, status=404)]
+
+        self.assertIsNone(async_to_sync(AsyncBonitaClient().get_case_variable)("1", "nada"))
+
+
+class PoolFalso:
+    def __init__(self, loops):
+        self.loops = loops
+
+    async def request(self, method, url, timeout=None, **kwargs):
+        self.loops.append(asyncio.get_running_loop())
+        return "ok"
+
+
+@skipUnless(bonita_client_async.httpx is not None, "httpx no está instalado")
+class PedirTests(SimpleTestCase):
+    def setUp(self):
+        self.loops = []
+        parche = mock.patch.object(bonita_client_async, "_pool", lambda loop: PoolFalso(self.loops))
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_loop_de_un_solo_request_pide_desde_el_loop_de_fondo(self):
+        self.assertEqual(async_to_sync(bonita_client_async.pedir)("GET", "http://x"), "ok")
+
+        self.assertIs(self.loops[0], bucle.loop())
+
+    def test_loop_duradero_usa_su_pool(self):
+        async def en_servidor():
+            bucle.marcar_duradero()
+            await bonita_client_async.pedir("GET", "http://x")
+            return asyncio.get_running_loop()
+
+        self.assertIs(async_to_sync(en_servidor)(), self.loops[0])
+
+
+class ClienteAsyncFalso:
+    """Lo que usan las vistas async de AsyncBonitaClient, con tareas en memoria."""
+
+    def __init__(self, tareas):
+        self.tareas = tareas
+        self.ejecutadas = []
+
+    async def login(self):
+        pass
+
+    async def get_user_id_by_username(self, username):
+        return "u1"
+
+    async def wait_ready_task_in_case(self, case_id, nombre, timeout_sec=12.0):
+        return self.tareas.get(nombre)
+
+    async def assign_task(self, task_id, user_id):
+        pass
+
+    async def execute_task(self, task_id, contrato):
+        self.ejecutadas.append((task_id, contrato))
+
+
+class VistaAsyncTests(TestCase):
+    def salir(self, cli):
+        req = RequestFactory().post("/x", data={"caseId": "1"}, content_type="application/json")
+        with mock.patch.object(views, "AsyncBonitaClient", lambda: cli):
+            return async_to_sync(views.red_ongs_salir_api)(req)
+
+    def test_ejecuta_la_tarea_activa_del_ciclo(self):
+        cli = ClienteAsyncFalso({"Revisar pedidos": {"id": "t9", "name": "Revisar pedidos"}})
+
+        resp = self.salir(cli)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(cli.ejecutadas, [("t9", {"seguirColaborando": False, "verOtroProyecto": False})])
+
+    def test_sin_tarea_se_asume_finalizado(self):
+        resp = self.salir(ClienteAsyncFalso({}))
+
+        self.assertIn("note", json.loads(resp.content))
+
+
+@override_settings(BONITA_BASE_URL="http://bonita.test/bonita")
+class CancelacionTests(SimpleTestCase):
+    def test_cancelar_la_espera_deja_de_consultar(self):
+        consultas = []
+
+        async def pedir(method, url, timeout=15.0, **kwargs):
+            consultas.append(url)
+            return respuesta([])
+
+        async def cliente_se_va():
+            tarea = asyncio.ensure_future(
+                AsyncBonitaClient().wait_ready_task_in_case("1", timeout_sec=5, interval_sec=0.01)
+            )
+            await asyncio.sleep(0.05)
+            tarea.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await tarea
+            hechas = len(consultas)
+            await asyncio.sleep(0.05)
+            return hechas
+
+        with mock.patch.object(bonita_client_async, "pedir", pedir):
+            hechas = async_to_sync(cliente_se_va)()
+
+        self.assertGreater(hechas, 0)
+        self.assertEqual(len(consultas), hechas)
+
+    def envio(self, terminado):
+        async def completar():
+            # Corre sin el plazo del request
+            self.assertIsNone(plazos.restante())
+            await asyncio.sleep(0.1)
+            terminado.set()
+            return {"ok": True}, 200
+
+        return completar()
+
+    def test_loop_duradero_el_envio_sigue_si_se_cancela_la_vista(self):
+        terminado = asyncio.Event
+
+        async def vista_cancelada():
+            bucle.marcar_duradero()
+            listo = terminado()
+            vista = asyncio.ensure_future(views._sin_cancelar(self.envio(listo)))
+            await asyncio.sleep(0.02)
+            vista.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await vista
+            await asyncio.wait_for(listo.wait(), 1)
+            return listo.is_set()
+
+        self.assertTrue(async_to_sync(vista_cancelada)())
+
+    def test_loop_de_un_request_el_envio_sigue_en_el_loop_de_fondo(self):
+        terminado = threading.Event()
+
+        async def vista_cancelada():
+            vista = asyncio.ensure_future(views._sin_cancelar(self.envio(terminado)))
+            await asyncio.sleep(0.02)
+            vista.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await vista
+
+        async_to_sync(vista_cancelada)()
+
+        # El loop de la vista ya terminó; el envío sigue en el de fondo
+        self.assertTrue(terminado.wait(1))
+
+    def test_plazo_vencido_responde_y_el_envio_termina(self):
+        terminado = threading.Event()
+
+        async def vista():
+            # Más que plazos._MINIMO: el plazo vence durante la espera
+            token = plazos.activar(plazos.Plazo(0.08))
+            try:
+                return await views._sin_cancelar(self.envio(terminado))
+            finally:
+                plazos.desactivar(token)
+
+        with self.assertRaises(plazos.PlazoVencido):
+            async_to_sync(vista)()
+        self.assertTrue(terminado.wait(1))
+
+    def test_completa_la_reserva_idempotente(self):
+        terminado = threading.Event()
+        completar = mock.Mock()
+
+        with mock.patch.object(views.idempotencia, "continuar", return_value="reserva"), \
+                mock.patch.object(views.idempotencia, "completar", completar):
+            self.assertEqual(async_to_sync(views._sin_cancelar)(self.envio(terminado)), ({"ok": True}, 200))
+
+        reserva, resp = completar.call_args.args
+        self.assertEqual((reserva, resp.status_code, json.loads(resp.content)), ("reserva", 200, {"ok": True}))
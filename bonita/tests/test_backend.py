@@ -0,0 +1,94 @@
+import time
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from bonita import backend
+
+
+@override_settings(BACKEND_CIRCUITO_FALLOS=2, BACKEND_CIRCUITO_ABIERTO=0.05)
+class CircuitoTests(SimpleTestCase):
+    def setUp(self):
+        self.circuito = backend.Circuito("observaciones")
+
+    def abrir(self):
+        for _ in range(2):
+            self.circuito.registrar(self.circuito.permitir(), exito=False)
+
+    def test_se_abre_con_fallas_seguidas(self):
+        self.circuito.registrar(self.circuito.permitir(), exito=False)
+        self.assertEqual(self.circuito.metricas()["estado"], "cerrado")
+
+        self.circuito.registrar(self.circuito.permitir(), exito=False)
+
+        self.assertEqual(self.circuito.metricas()["estado"], "abierto")
+        with self.assertRaises(backend.CircuitoAbierto):
+            self.circuito.permitir()
+        self.assertEqual(self.circuito.metricas()["rechazadas"], 1)
+
+    def test_un_exito_reinicia_las_fallas(self):
+        self.circuito.registrar(self.circuito.permitir(), exito=False)
+        self.circuito.registrar(self.circuito.permitir(), exito=True)
+        self.circuito.registrar(self.circuito.permitir(), exito=False)
+
+        self.assertEqual(self.circuito.metricas()["estado"], "cerrado")
+
+    def test_semiabierto_deja_pasar_una_sola_prueba(self):
+        self.abrir()
+        time.sleep(0.06)
+
+        self.assertTrue(self.circuito.permitir())
+        self.assertEqual(self.circuito.metricas()["estado"], "semiabierto")
+        with self.assertRaises(backend.CircuitoAbierto):
+            self.circuito.permitir()
+
+        self.circuito.registrar(True, exito=True)
+        self.assertEqual(self.circuito.metricas()["estado"], "cerrado")
+        self.assertFalse(self.circuito.permitir())
+
+    def test_prueba_fallida_vuelve_a_abrir(self):
+        self.abrir()
+        time.sleep(0.06)
+
+        self.circuito.registrar(self.circuito.permitir(), exito=False)
+
+        self.assertEqual(self.circuito.metricas()["estado"], "abierto")
+        with self.assertRaises(backend.CircuitoAbierto):
+            self.circuito.permitir()
+        self.assertEqual(self.circuito.metricas()["aperturas"], 1)
+
+    def test_prueba_que_no_se_hizo_no_cuenta(self):
+        self.abrir()
+        time.sleep(0.06)
+
+        self.circuito.liberar(self.circuito.permitir())
+
+        self.assertTrue(self.circuito.permitir())
+
+    def test_llamar_devuelve_la_ultima_respuesta_buena(self):
+        url = "http://backend.test/api/proyectos/1/observaciones/"
+        headers = {"Authorization": f"Bearer prueba-{time.monotonic()}"}
+        ok = mock.Mock(status_code=200, text='{"total": 3}', headers={"Content-Type": "application/json"})
+
+        with mock.patch.dict(backend._circuitos, {"observaciones": self.circuito}), \
+                mock.patch("bonita.backend.requests.request") as request:
+            request.return_value = ok
+            self.assertIs(backend.llamar("observaciones", "GET", url, timeout=3, vieja=True, headers=headers), ok)
+
+            request.side_effect = requests.ConnectionError("caído")
+            for _ in range(2):
+                vieja = backend.llamar("observaciones", "GET", url, timeout=3, vieja=True, headers=headers)
+                self.assertTrue(backend.es_vieja(vieja))
+                self.assertEqual(vieja.json(), {"total": 3})
+            self.assertEqual(self.circuito.metricas()["estado"], "abierto")
+
+            # Con el circuito abierto ni se llama al backend
+            llamadas = request.call_count
+            vieja = backend.llamar("observaciones", "GET", url, timeout=3, vieja=True, headers=headers)
+            self.assertTrue(backend.es_vieja(vieja))
+            self.assertEqual(request.call_count, llamadas)
+
+            # Sin respuesta guardada (o sin `vieja`) el error sigue
+            with self.assertRaises(backend.CircuitoAbierto):
+                backend.llamar("observaciones", "GET", url, timeout=3, headers=headers)
@@ -0,0 +1,81 @@
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from bonita.basedatos import configurar_conexion
+
+
+class CursorFalso:
+    def __init__(self, sentencias):
+        self.sentencias = sentencias
+
+    def execute(self, sql):
+        self.sentencias.append(sql)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class ConexionFalsa:
+    def __init__(self, vendor="sqlite", **settings_dict):
+        self.vendor = vendor
+        self.settings_dict = settings_dict
+        self.sentencias = []
+
+    def cursor(self):
+        return CursorFalso(self.sentencias)
+
+
+class ConfigurarConexionTests(SimpleTestCase):
+    def test_aplica_los_pragmas_validos(self):
+        conexion = ConexionFalsa(PRAGMAS={
+            "journal_mode": "WAL", "synchronous": "normal", "busy_timeout": "5000",
+            "cache_size": 1, "synchronous_": "x",
+        })
+
+        configurar_conexion(None, conexion)
+
+        self.assertEqual(conexion.sentencias, [
+            "PRAGMA journal_mode = wal", "PRAGMA synchronous = normal", "PRAGMA busy_timeout = 5000",
+        ])
+
+    def test_valores_invalidos_no_llegan_al_sql(self):
+        conexion = ConexionFalsa(PRAGMAS={"journal_mode": "wal; DROP TABLE x"})
+
+        configurar_conexion(None, conexion)
+
+        self.assertEqual(conexion.sentencias, [])
+
+    def test_begin_immediate(self):
+        conexion = ConexionFalsa(TRANSACCIONES="immediate")
+
+        configurar_conexion(None, conexion)
+        conexion._start_transaction_under_autocommit()
+
+        self.assertEqual(conexion.sentencias, ["BEGIN IMMEDIATE"])
+
+    def test_otros_motores_no_se_tocan(self):
+        conexion = ConexionFalsa(vendor="postgresql", PRAGMAS={"synchronous": "off"}, TRANSACCIONES="immediate")
+
+        configurar_conexion(None, conexion)
+
+        self.assertEqual(conexion.sentencias, [])
+        self.assertFalse(hasattr(conexion, "_start_transaction_under_autocommit"))
+
+
+class ConexionRealTests(TestCase):
+    def test_la_conexion_de_la_app_queda_configurada(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("sólo SQLite")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            synchronous = cursor.fetchone()[0]
+            cursor.execute("PRAGMA busy_timeout")
+            busy_timeout = cursor.fetchone()[0]
+
+        pragmas = connection.settings_dict.get("PRAGMAS") or {}
+        esperado = {"off": 0, "normal": 1, "full": 2, "extra": 3}[str(pragmas.get("synchronous", "full")).lower()]
+        self.assertEqual(synchronous, esperado)
+        self.assertEqual(busy_timeout, int(pragmas.get("busy_timeout", busy_timeout)))
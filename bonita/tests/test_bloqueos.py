@@ -0,0 +1,31 @@
+import time
+
+from django.test import TestCase
+
+from bonita import bloqueos, plazos
+from bonita.models import Bloqueo
+
+
+class BloqueoPlazoTests(TestCase):
+    def test_la_espera_no_pasa_el_plazo(self):
+        with bloqueos.bloqueo("caso:1") as tomado:
+            self.assertTrue(tomado)
+
+            token = plazos.activar(plazos.Plazo(0.2))
+            try:
+                t0 = time.monotonic()
+                with self.assertRaises(plazos.PlazoVencido):
+                    with bloqueos.bloqueo("caso:1", espera=10):
+                        pass
+                self.assertLess(time.monotonic() - t0, 1)
+            finally:
+                plazos.desactivar(token)
+
+        self.assertFalse(Bloqueo.objects.exists())
+
+    def test_sin_plazo_espera_lo_pedido(self):
+        with bloqueos.bloqueo("caso:1"):
+            t0 = time.monotonic()
+            with bloqueos.bloqueo("caso:1", espera=0.2) as tomado:
+                self.assertFalse(tomado)
+            self.assertGreaterEqual(time.monotonic() - t0, 0.2)
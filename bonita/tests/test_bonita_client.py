@@ -0,0 +1,99 @@
+import hashlib
+import json
+
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from bonita import bonita_client
+from bonita.bonita_client import BonitaClient
+
+
+def respuesta(datos, status=200, **headers):
+    r = requests.Response()
+    r.status_code = status
+    r._content = json.dumps(datos).encode("utf-8")
+    r.headers["Content-Type"] = "application/json"
+    r.headers.update(headers)
+    return r
+
+
+class BonitaFalsa:
+    """Reemplaza Session.get: registra las búsquedas y responde `paginas`."""
+
+    def __init__(self, paginas=None, **headers):
+        self.paginas = paginas or {}
+        self.headers = headers
+        self.pedidos = []
+
+    def __call__(self, url, params=None, **kwargs):
+        params = dict((k, v) for k, v in (params or []) if k in ("p", "c"))
+        self.pedidos.append((url.rsplit("/API/", 1)[1], params))
+        return respuesta(self.paginas.get(int(params.get("p", 0)), []), **self.headers)
+
+
+class ConteoTests(SimpleTestCase):
+    def test_count_cases_lee_content_range(self):
+        cli = BonitaClient()
+        cli.s.get = bonita = BonitaFalsa({0: [{"id": "1"}]}, **{"Content-Range": "0-0/4213"})
+
+        self.assertEqual(cli.count_cases(state="started"), 4213)
+        # Una sola fila, no la lista entera
+        self.assertEqual(bonita.pedidos, [("bpm/case", {"p": "0", "c": "1"})])
+
+    def test_count_cases_sin_content_range_cuenta_la_pagina(self):
+        cli = BonitaClient()
+        cli.s.get = BonitaFalsa({0: [{"id": "1"}]})
+
+        self.assertEqual(cli.count_cases(), 1)
+
+    def test_list_processes_pagina_y_se_cachea(self):
+        bonita_client._metadatos.borrar("procesos")
+        self.addCleanup(bonita_client._metadatos.borrar, "procesos")
+        cli = BonitaClient()
+        cli.s.get = bonita = BonitaFalsa({0: [{"id": str(i)} for i in range(100)], 1: [{"id": "100"}]})
+
+        self.assertEqual(len(cli.list_processes()), 101)
+        self.assertEqual(len(cli.list_processes()), 101)
+        self.assertEqual([p for _, p in bonita.pedidos], [{"p": "0", "c": "100"}, {"p": "1", "c": "100"}])
+
+
+class DecodeJsonTests(SimpleTestCase):
+    def setUp(self):
+        bonita_client._decodificados.clear()
+
+    def test_formas_de_la_variable(self):
+        decode = BonitaClient.decode_json
+
+        self.assertEqual(decode('[1, 2]'), [1, 2])
+        self.assertEqual(decode(json.dumps('[1, 2]')), [1, 2])
+        self.assertEqual(decode([1]), [1])
+        for vacio in (None, "", "  ", "null", "no es json"):
+            self.assertEqual(decode(vacio, default="d"), "d", vacio)
+
+    def test_tipo_esperado(self):
+        self.assertEqual(BonitaClient.decode_json('{"a": 1}', expected=list, default=[]), [])
+        self.assertEqual(BonitaClient.decode_json('{"a": 1}', expected=dict), {"a": 1})
+
+    def test_textos_largos_se_decodifican_una_vez(self):
+        texto = json.dumps([{"id": i, "nombre": "x" * 20} for i in range(20)])
+
+        primero = BonitaClient.decode_json(texto)
+        segundo = BonitaClient.decode_json(" " + texto + "\n")
+
+        self.assertIs(segundo, primero)
+
+    def test_textos_cortos_no_se_cachean(self):
+        BonitaClient.decode_json("[1]")
+
+        self.assertEqual(len(bonita_client._decodificados), 0)
+
+    @override_settings(BONITA_JSON_CACHE_SIZE=2)
+    def test_lru_acotado(self):
+        textos = [json.dumps(["x" * 300, i]) for i in range(3)]
+        for texto in textos:
+            BonitaClient.decode_json(texto)
+        BonitaClient.decode_json(textos[0])
+
+        # Queda el más reciente y el que se volvió a usar
+        claves = [hashlib.blake2b(t.encode("utf-8"), digest_size=16).digest() for t in textos]
+        self.assertEqual(list(bonita_client._decodificados), [claves[2], claves[0]])
@@ -0,0 +1,211 @@
+import threading
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from bonita import cache
+
+
+class Reloj:
+    """Reemplaza el módulo time de bonita.cache: el tiempo avanza a mano."""
+
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def monotonic(self):
+        return self.ahora
+
+    def time(self):
+        return self.ahora
+
+
+class StaleWhileRevalidateTests(SimpleTestCase):
+    def setUp(self):
+        self.reloj = Reloj()
+        parche = mock.patch.object(cache, "time", self.reloj)
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.calculos = 0
+
+    def calcular(self):
+        self.calculos += 1
+        return self.calculos
+
+    def esperar_refresco(self, swr):
+        limite = time.monotonic() + 2
+        while swr._refrescando and time.monotonic() < limite:
+            time.sleep(0.01)
+
+    def test_fresco_no_recalcula(self):
+        swr = cache.StaleWhileRevalidate(self.calcular, ttl=10, max_stale=60)
+
+        self.assertEqual(swr.obtener(), (1, 0.0))
+        self.reloj.ahora += 5
+        self.assertEqual(swr.obtener(), (1, 5.0))
+        self.assertEqual(self.calculos, 1)
+
+    def test_viejo_responde_al_instante_y_refresca_en_fondo(self):
+        swr = cache.StaleWhileRevalidate(self.calcular, ttl=10, max_stale=60)
+        swr.obtener()
+        self.reloj.ahora += 20
+
+        self.assertEqual(swr.obtener(), (1, 20.0))
+        self.esperar_refresco(swr)
+
+        self.assertEqual(swr.obtener(), (2, 0.0))
+
+    def test_refresco_single_flight(self):
+        liberar = threading.Event()
+
+        def lento():
+            liberar.wait(2)
+            return self.calcular()
+
+        swr = cache.StaleWhileRevalidate(lento, ttl=10, max_stale=60)
+        swr._guardar(0)
+        self.reloj.ahora += 20
+
+        for _ in range(5):
+            self.assertEqual(swr.obtener()[0], 0)
+        liberar.set()
+        self.esperar_refresco(swr)
+
+        self.assertEqual(self.calculos, 1)
+
+    def test_pasado_max_stale_calcula_en_el_momento(self):
+        swr = cache.StaleWhileRevalidate(self.calcular, ttl=10, max_stale=60)
+        swr.obtener()
+        self.reloj.ahora += 61
+
+        self.assertEqual(swr.obtener(), (2, 0.0))
+
+    def test_error_en_fondo_conserva_el_valor(self):
+        swr = cache.StaleWhileRevalidate(mock.Mock(side_effect=RuntimeError("caído")), ttl=10, max_stale=60)
+        swr._guardar("viejo")
+        self.reloj.ahora += 20
+
+        self.assertEqual(swr.obtener()[0], "viejo")
+        self.esperar_refresco(swr)
+        self.assertEqual(swr.obtener()[0], "viejo")
+
+    def test_valor_degradado_vence_antes(self):
+        swr = cache.StaleWhileRevalidate(
+            self.calcular, ttl=30, max_stale=60, ttl_degradado=5, degradado=lambda v: v == 1,
+        )
+        swr.obtener()
+        self.reloj.ahora += 6
+
+        swr.obtener()
+        self.esperar_refresco(swr)
+        self.assertEqual(self.calculos, 2)
+
+        # El valor nuevo no está degradado: vuelve el ttl normal
+        self.reloj.ahora += 20
+        self.assertEqual(swr.obtener()[0], 2)
+        self.assertEqual(self.calculos, 2)
+
+    def test_invalidar(self):
+        swr = cache.StaleWhileRevalidate(self.calcular, ttl=10, max_stale=60)
+        swr.obtener()
+
+        swr.invalidar()
+
+        self.assertEqual(swr.obtener()[0], 2)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "test-cache"}},
+    BONITA_CACHE_LOCAL_TAMANIO=2, BONITA_CACHE_LOCAL_TTL=5, BONITA_CACHE_BETA=1.0,
+)
+class CacheDosNivelesTests(SimpleTestCase):
+    def setUp(self):
+        self.reloj = Reloj()
+        parche = mock.patch.object(cache, "time", self.reloj)
+        parche.start()
+        self.addCleanup(parche.stop)
+        caches["default"].clear()
+        # Dos workers: cada uno con su LRU, el mismo cache compartido
+        self.uno = cache.CacheDosNiveles("prueba", ttl=60)
+        self.otro = cache.CacheDosNiveles("prueba", ttl=60)
+
+    def test_lo_que_guarda_un_worker_lo_ve_el_otro(self):
+        self.uno.set("a", 1)
+
+        self.assertEqual(self.otro.get("a"), 1)
+        self.assertEqual(self.otro.get("falta", "d"), "d")
+
+    def test_borrado_visible_en_el_otro_worker_al_vencer_su_copia_local(self):
+        self.uno.set("a", 1)
+        self.otro.get("a")
+        self.uno.borrar("a")
+
+        self.assertEqual(self.otro.get("a"), 1)
+        self.reloj.ahora += 6
+        self.assertIsNone(self.otro.get("a"))
+
+    def test_vence_con_el_ttl(self):
+        self.uno.set("a", 1, ttl=10)
+        self.reloj.ahora += 11
+
+        self.assertIsNone(self.uno.get("a"))
+        self.assertIsNone(self.otro.get("a"))
+
+    def test_lru_local_acotado(self):
+        for clave in ("a", "b", "c"):
+            self.uno.set(clave, clave)
+
+        self.assertEqual(list(self.uno._local), ["b", "c"])
+        # Lo que salió del LRU sigue en el nivel compartido
+        self.assertEqual(self.uno.get("a"), "a")
+
+    def test_obtener_calcula_una_vez_y_respeta_guardar_si(self):
+        calcular = mock.Mock(side_effect=[1, 2, None, None])
+
+        self.assertEqual(self.uno.obtener("a", calcular), 1)
+        self.assertEqual(self.otro.obtener("a", calcular), 1)
+        self.assertEqual(calcular.call_count, 1)
+
+        # Lo que guardar_si rechaza se vuelve a calcular
+        self.uno.obtener("b", calcular, guardar_si=lambda valor: False)
+        self.uno.obtener("c", calcular, guardar_si=lambda valor: valor is not None)
+        self.uno.obtener("c", calcular, guardar_si=lambda valor: valor is not None)
+        self.assertEqual(calcular.call_count, 4)
+
+    def test_expiracion_anticipada(self):
+        self.uno.set("a", "viejo", ttl=10, delta=5.0)
+        self.reloj.ahora += 9
+
+        # U casi 1 -> -log(1-U) enorme: el cálculo se adelanta
+        with mock.patch.object(cache.random, "random", return_value=0.999999):
+            self.assertEqual(self.uno.obtener("a", lambda: "nuevo"), "nuevo")
+        # U = 0 -> sin adelanto
+        self.uno.set("b", "viejo", ttl=10, delta=5.0)
+        self.reloj.ahora += 9
+        with mock.patch.object(cache.random, "random", return_value=0.0):
+            self.assertEqual(self.uno.obtener("b", lambda: "nuevo"), "viejo")
+
+    def test_sin_cache_compartido_sigue_con_el_local(self):
+        roto = mock.Mock(**{m + ".side_effect": ConnectionError("caído") for m in ("get", "set", "delete")})
+        with mock.patch.object(cache, "caches", {"default": roto}):
+            self.uno.set("a", 1)
+            self.assertEqual(self.uno.get("a"), 1)
+            self.assertEqual(self.otro.obtener("b", lambda: 2), 2)
+            self.uno.borrar("a")
+            self.assertIsNone(self.uno.get("a"))
+
+    def test_api_async(self):
+        async def calcular():
+            return 7
+
+        async def usar():
+            await self.uno.aset("a", 1)
+            valor = await self.otro.aget("a")
+            calculado = await self.otro.aobtener("b", calcular)
+            await self.uno.aborrar("a")
+            return valor, calculado, await self.uno.aget("a")
+
+        self.assertEqual(async_to_sync(usar)(), (1, 7, None))
+        self.assertEqual(self.uno.get("b"), 7)
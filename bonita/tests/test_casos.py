@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from bonita import casos
+from bonita.models import CasoBonita
+
+
+class ClienteFalso:
+    """Lo mínimo de BonitaClient que usa el modelo de lectura."""
+
+    logueado = True
+
+    def __init__(self):
+        self.casos = {"1": {"id": "1", "processDefinitionId": "p"}}
+        self.tareas = {"1": {"id": "t1", "name": "Evaluar propuestas", "rootCaseId": "1"}}
+        self.variables = {"1": {"proyectosJson": "[]", "access": "jwt-secreto"}}
+        self.lecturas = []
+
+    def list_cases(self, state=None):
+        return list(self.casos.values())
+
+    def list_ready_tasks(self):
+        return list(self.tareas.values())
+
+    def get_case_variables(self, case_id):
+        self.lecturas.append(case_id)
+        return [{"name": n, "type": "java.lang.String", "value": v} for n, v in self.variables[case_id].items()]
+
+    def get_case_variable(self, case_id, nombre):
+        valor = self.variables[case_id].get(nombre)
+        return None if valor is None else {"type": "java.lang.String", "value": valor}
+
+
+@override_settings(CASOS_LECTURA_MAX_EDAD=30)
+class SincronizarTests(TestCase):
+    def setUp(self):
+        self.cli = ClienteFalso()
+        casos.sincronizar(self.cli)
+        self.cli.lecturas.clear()
+
+    def envejecer(self, segundos=60):
+        CasoBonita.objects.update(sincronizado_en=timezone.now() - timedelta(seconds=segundos))
+
+    def test_guarda_solo_las_variables_del_modelo(self):
+        fila = CasoBonita.objects.get(case_id="1")
+
+        self.assertEqual(fila.tarea_id, "t1")
+        self.assertEqual(fila.variables["proyectosJson"]["value"], "[]")
+        # El token JWT del caso nunca se guarda
+        self.assertNotIn("access", fila.variables)
+
+    def test_misma_tarea_y_fila_fresca_no_relee(self):
+        antes = CasoBonita.objects.get(case_id="1").sincronizado_en
+
+        r = casos.sincronizar(self.cli)
+
+        self.assertEqual(r["refrescados"], 0)
+        self.assertEqual(self.cli.lecturas, [])
+        self.assertEqual(CasoBonita.objects.get(case_id="1").sincronizado_en, antes)
+
+    def test_fila_vieja_se_relee_aunque_no_cambie_la_tarea(self):
+        self.envejecer()
+        self.cli.variables["1"]["proyectosJson"] = '[{"id": 1}]'
+
+        r = casos.sincronizar(self.cli)
+
+        self.assertEqual(r["refrescados"], 1)
+        self.assertEqual(casos.variables_frescas("1")["proyectosJson"]["value"], '[{"id": 1}]')
+
+    def test_sin_releer_la_fila_envejece(self):
+        """Sincronizar no renueva la fecha de variables que no volvió a leer."""
+        self.envejecer(20)
+        with override_settings(CASOS_LECTURA_MAX_EDAD=25):
+            casos.sincronizar(self.cli)
+            self.assertEqual(self.cli.lecturas, [])
+        self.envejecer(40)
+
+        self.assertIsNone(casos.variables_frescas("1"))
+
+    def test_cambio_de_tarea_relee(self):
+        self.cli.tareas["1"] = {"id": "t2", "name": "Acumular compromiso en el plan", "rootCaseId": "1"}
+
+        casos.sincronizar(self.cli)
+
+        self.assertEqual(self.cli.lecturas, ["1"])
+        self.assertEqual(CasoBonita.objects.get(case_id="1").tarea_nombre, "Acumular compromiso en el plan")
+
+    def test_borra_los_casos_que_ya_no_estan_activos(self):
+        self.cli.casos.clear()
+
+        r = casos.sincronizar(self.cli)
+
+        self.assertEqual(r["borrados"], 1)
+        self.assertFalse(CasoBonita.objects.exists())
+
+
+@override_settings(CASOS_LECTURA_MAX_EDAD=30)
+class LecturaTests(TestCase):
+    def setUp(self):
+        self.cli = ClienteFalso()
+        casos.sincronizar(self.cli)
+        self.cli.lecturas.clear()
+
+    def test_fila_fresca_no_va_a_bonita(self):
+        self.assertEqual(casos.variable("1", "proyectosJson", self.cli)["value"], "[]")
+        self.assertEqual(self.cli.lecturas, [])
+
+    def test_fila_sucia_relee(self):
+        casos.registrar_tarea("1", {"id": "t2", "name": "Otra"})
+        self.cli.variables["1"]["proyectosJson"] = "[1]"
+
+        self.assertEqual(casos.variable("1", "proyectosJson", self.cli)["value"], "[1]")
+        self.assertEqual(self.cli.lecturas, ["1"])
+        self.assertFalse(CasoBonita.objects.get(case_id="1").sucio)
+
+    def test_variables_fuera_del_modelo_van_a_bonita(self):
+        self.assertEqual(casos.variable("1", "access", self.cli)["value"], "jwt-secreto")
+
+    def test_guardar_variable_escribe_en_la_fila(self):
+        casos.guardar_variable("1", "proyectosJson", "java.lang.String", "[2]")
+        casos.guardar_variable("1", "access", "java.lang.String", "otro")
+
+        variables = CasoBonita.objects.get(case_id="1").variables
+        self.assertEqual(variables["proyectosJson"]["value"], "[2]")
+        self.assertNotIn("access", variables)
@@ -0,0 +1,59 @@
+import gzip
+import json
+
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from bonita.middleware import CompresionMiddleware, elegir_codificacion
+from bonita.respuestas import JsonResponse
+
+GRANDE = {"items": [{"id": i, "nombre": "proyecto"} for i in range(200)]}
+
+
+@override_settings(RESPUESTAS_COMPRESION_MINIMO=1024)
+class CompresionTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def pasar(self, resp, accept="gzip, deflate"):
+        return CompresionMiddleware(lambda req: resp)(self.factory.get("/x", HTTP_ACCEPT_ENCODING=accept))
+
+    def test_json_grande_se_comprime(self):
+        resp = JsonResponse(GRANDE)
+        resp["ETag"] = '"abc"'
+
+        resp = self.pasar(resp)
+
+        self.assertEqual(resp["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(resp.content)), GRANDE)
+        self.assertEqual(resp["Content-Length"], str(len(resp.content)))
+        self.assertEqual(resp["ETag"], 'W/"abc"')
+        self.assertIn("Accept-Encoding", resp["Vary"])
+
+    def test_no_comprime(self):
+        casos = {
+            "chico": (JsonResponse({"ok": True}), "gzip"),
+            "html": (HttpResponse("<p>x</p>" * 500), "gzip"),
+            "cliente sin gzip": (JsonResponse(GRANDE), "identity"),
+            "gzip con q=0": (JsonResponse(GRANDE), "gzip;q=0"),
+        }
+        for nombre, (resp, accept) in casos.items():
+            self.assertFalse(self.pasar(resp, accept).has_header("Content-Encoding"), nombre)
+
+    def test_sin_gzip_igual_avisa_vary(self):
+        self.assertIn("Accept-Encoding", self.pasar(JsonResponse(GRANDE), "identity")["Vary"])
+
+    def test_elegir_codificacion(self):
+        self.assertEqual(elegir_codificacion("gzip;q=0.5, identity"), "gzip")
+        self.assertEqual(elegir_codificacion(""), "")
+        self.assertEqual(elegir_codificacion("gzip;q=basura"), "")
+
+    def test_cadena_async(self):
+        async def vista(req):
+            return JsonResponse(GRANDE)
+
+        middleware = CompresionMiddleware(vista)
+        resp = async_to_sync(middleware)(self.factory.get("/x", HTTP_ACCEPT_ENCODING="gzip"))
+
+        self.assertEqual(resp["Content-Encoding"], "gzip")
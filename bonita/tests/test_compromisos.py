@@ -0,0 +1,85 @@
+import json
+
+from django.test import TestCase
+
+from bonita import monitoreo, views
+
+
+class BonitaCompromisos:
+    """Variables de un caso en memoria con la API de BonitaClient que usa el append."""
+
+    def __init__(self, aceptados):
+        self.valores = {
+            "compromisosJson": json.dumps([{"id": 7, "detalle": "Paneles", "fecha": "2025-01-01", "estado": "aceptado"}]),
+            "body_compromiso_cumplido": json.dumps({"compromisoId": "7", "estado": "entregado"}),
+            "compromisosAceptadosJson": json.dumps(aceptados),
+            "proyectoId": "5",
+        }
+        self.escrituras = []
+        # Escrituras de otro worker que pisan la nuestra (una por PUT)
+        self.pisadas = []
+        self.falla_put = None
+
+    def get_case_variables(self, case_id):
+        return [{"name": n, "type": "java.lang.String", "value": v} for n, v in self.valores.items()]
+
+    def get_case_variable(self, case_id, nombre):
+        return {"type": "java.lang.String", "value": self.valores[nombre]}
+
+    def update_case_variable(self, case_id, nombre, valor, var_type=None):
+        if self.falla_put:
+            raise self.falla_put
+        self.escrituras.append(json.loads(valor))
+        self.valores[nombre] = valor
+        if self.pisadas:
+            self.valores[nombre] = json.dumps(self.pisadas.pop(0))
+
+    def aceptados(self):
+        return [c["id"] if isinstance(c, dict) else c for c in json.loads(self.valores["compromisosAceptadosJson"])]
+
+
+class AppendCompromisoTests(TestCase):
+    def test_agrega_con_el_estado_final_y_registra_local(self):
+        cli = BonitaCompromisos([{"id": 3}])
+
+        views._append_compromiso_aceptado(cli, "1", 7)
+
+        self.assertEqual(len(cli.escrituras), 1)
+        self.assertEqual(cli.escrituras[0][-1], {"id": 7, "detalle": "Paneles", "fecha": "2025-01-01", "estado": "entregado"})
+        self.assertEqual(cli.aceptados(), [3, 7])
+        self.assertEqual(monitoreo.compromisos(5)[0], [cli.escrituras[0][-1]])
+
+    def test_ya_estaba_no_escribe(self):
+        cli = BonitaCompromisos(["7"])
+
+        views._append_compromiso_aceptado(cli, "1", 7)
+
+        self.assertEqual(cli.escrituras, [])
+        self.assertEqual(monitoreo.compromisos(5)[1], 1)
+
+    def test_escritura_pisada_se_mezcla_y_reintenta(self):
+        cli = BonitaCompromisos([{"id": 3}])
+        cli.pisadas = [[{"id": 3}, {"id": 9}]]
+
+        views._append_compromiso_aceptado(cli, "1", 7)
+
+        self.assertEqual(len(cli.escrituras), 2)
+        self.assertEqual(cli.aceptados(), [3, 9, 7])
+        self.assertEqual(monitoreo.compromisos(5)[1], 1)
+
+    def test_si_no_queda_en_bonita_no_se_registra_local(self):
+        cli = BonitaCompromisos([])
+        cli.falla_put = RuntimeError("Bonita 500")
+
+        views._append_compromiso_aceptado(cli, "1", 7)
+
+        self.assertEqual(monitoreo.compromisos(5)[1], 0)
+
+    def test_siempre_pisada_se_rinde(self):
+        cli = BonitaCompromisos([])
+        cli.pisadas = [[{"id": n}] for n in range(10, 10 + views._APPEND_REINTENTOS)]
+
+        views._append_compromiso_aceptado(cli, "1", 7)
+
+        self.assertEqual(len(cli.escrituras), views._APPEND_REINTENTOS)
+        self.assertEqual(monitoreo.compromisos(5)[1], 0)
@@ -0,0 +1,98 @@
+import json
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from bonita import deltas
+from bonita.models import VersionListado
+
+
+class CalcularTests(TestCase):
+    def calcular(self, items, since=None):
+        return deltas.calcular("10", "compromisos", items, since=since)
+
+    def test_sin_since_responde_completo(self):
+        token, cambios = self.calcular([{"id": 1}])
+
+        self.assertIsNone(cambios)
+        self.assertRegex(token, r"^\d+\.1$")
+
+    def test_sin_cambios(self):
+        token, _ = self.calcular([{"id": 1, "estado": "a"}])
+        token2, cambios = self.calcular([{"id": 1, "estado": "a"}], since=token)
+
+        self.assertEqual(token2, token)
+        self.assertEqual(cambios, {"sinCambios": True, "cambiados": [], "claves": [], "eliminados": []})
+
+    def test_agregados_modificados_y_eliminados(self):
+        token, _ = self.calcular([{"id": 1, "estado": "a"}, {"id": 2, "estado": "a"}, {"id": 3}])
+
+        actuales = [{"id": 4}, {"id": 1, "estado": "b"}, {"id": 3}]
+        token2, cambios = self.calcular(actuales, since=token)
+
+        self.assertNotEqual(token2, token)
+        self.assertFalse(cambios["sinCambios"])
+        self.assertEqual(cambios["cambiados"], [{"id": 4}, {"id": 1, "estado": "b"}])
+        self.assertEqual(cambios["claves"], ["4", "1"])
+        self.assertEqual(cambios["eliminados"], ["2"])
+        self.assertEqual(cambios["orden"], ["4", "1", "3"])
+
+    def test_desde_una_version_anterior_acumula_los_cambios(self):
+        t1, _ = self.calcular([{"id": 1}])
+        self.calcular([{"id": 1}, {"id": 2}])
+        self.calcular([{"id": 1}, {"id": 2}, {"id": 3}])
+
+        _, cambios = self.calcular([{"id": 1}, {"id": 2}, {"id": 3}], since=t1)
+
+        self.assertEqual(cambios["claves"], ["2", "3"])
+
+    def test_elementos_sin_id_y_repetidos(self):
+        token, _ = self.calcular(["a", "a"])
+        _, cambios = self.calcular(["a", "a", "b"], since=token)
+
+        claves = deltas.claves(["a", "a", "b"])
+        self.assertEqual(claves[1], claves[0] + "#1")
+        self.assertEqual(cambios["cambiados"], ["b"])
+        self.assertEqual(cambios["claves"], [claves[2]])
+        self.assertEqual(cambios["orden"], claves)
+
+    def test_token_invalido_responde_completo(self):
+        token, _ = self.calcular([{"id": 1}])
+        otro, _ = deltas.calcular("11", "compromisos", [{"id": 1}])
+        pk, _, version = token.partition(".")
+
+        for since in ("basura", otro, f"{pk}.{int(version) + 5}"):
+            self.assertIsNone(self.calcular([{"id": 1}], since=since)[1], since)
+
+
+class RegistrarTests(TestCase):
+    def test_raw_evita_decodificar_si_no_cambio(self):
+        items = [{"id": 1}]
+        raw = json.dumps(items)
+        deltas.registrar("10", "pedidos", items, raw=raw)
+
+        def no_decodificar():
+            raise AssertionError("no tenía que decodificar")
+
+        version = deltas.registrar("10", "pedidos", no_decodificar, raw=raw)
+        self.assertEqual(version.version, 1)
+
+    def test_sin_cambios_no_escribe(self):
+        deltas.registrar("10", "pedidos", [{"id": 1}])
+
+        with CaptureQueriesContext(connection) as consultas:
+            version = deltas.registrar("10", "pedidos", [{"id": 1}])
+
+        self.assertEqual(version.version, 1)
+        self.assertEqual(len(consultas), 1)
+        self.assertTrue(consultas[0]["sql"].lstrip().upper().startswith("SELECT"))
+
+    def test_hash_igual_sin_elementos_nuevos_no_sube_la_version(self):
+        deltas.registrar("10", "pedidos", [{"id": 1}])
+        VersionListado.objects.update(hash_contenido="")
+
+        version = deltas.registrar("10", "pedidos", [{"id": 1}])
+
+        self.assertEqual(version.version, 1)
+        self.assertNotEqual(VersionListado.objects.get().hash_contenido, "")
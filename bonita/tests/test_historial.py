@@ -0,0 +1,75 @@
+import json
+from datetime import datetime, timedelta, timezone as tz
+
+from django.test import RequestFactory, TestCase, override_settings
+
+from bonita import historial, views
+from bonita.models import SnapshotMetricas
+
+T0 = datetime(2025, 1, 1, tzinfo=tz.utc)
+
+
+class SerieTests(TestCase):
+    def setUp(self):
+        # Un snapshot por hora durante 4 horas
+        for h, (proyectos, pedidos) in enumerate([(1, 10), (2, 20), (4, 30), (8, 40)]):
+            historial.guardar_snapshot(
+                {"total_proyectos": proyectos, "total_pedidos": pedidos, "top": [1], "activo": True},
+                tomado_en=T0 + timedelta(hours=h),
+            )
+
+    def test_solo_guarda_escalares(self):
+        self.assertEqual(set(SnapshotMetricas.objects.first().metricas), {"total_proyectos", "total_pedidos"})
+
+    def test_baldes_y_agregaciones(self):
+        hasta = T0 + timedelta(hours=4)
+
+        por_defecto = historial.serie(T0, hasta, puntos=2)
+        self.assertEqual(por_defecto["tiempos"], [T0.isoformat(), (T0 + timedelta(hours=2)).isoformat()])
+        self.assertEqual(por_defecto["series"]["total_proyectos"], [2, 8])
+
+        for agregacion, esperado in (("promedio", [1.5, 6]), ("min", [1, 4]), ("max", [2, 8])):
+            s = historial.serie(T0, hasta, puntos=2, agregacion=agregacion)
+            self.assertEqual(s["series"]["total_proyectos"], esperado, agregacion)
+
+    def test_baldes_vacios_no_se_devuelven(self):
+        s = historial.serie(T0, T0 + timedelta(hours=8), puntos=8, claves=["total_pedidos"])
+
+        self.assertEqual(len(s["tiempos"]), 4)
+        self.assertEqual(s["series"], {"total_pedidos": [10, 20, 30, 40]})
+
+    def test_metrica_faltante_es_none(self):
+        historial.guardar_snapshot({"otra": 1}, tomado_en=T0 + timedelta(hours=5))
+
+        s = historial.serie(T0, T0 + timedelta(hours=6), puntos=6, claves=["otra", "total_pedidos"])
+
+        self.assertEqual(s["series"]["otra"], [None, None, None, None, 1])
+        self.assertEqual(s["series"]["total_pedidos"][-1], None)
+
+    @override_settings(DASHBOARD_SNAPSHOT_INTERVALO=3600)
+    def test_guardar_si_corresponde(self):
+        historial.guardar_si_corresponde({"total_proyectos": 1})
+        historial.guardar_si_corresponde({"total_proyectos": 2})
+
+        self.assertEqual(SnapshotMetricas.objects.count(), 5)
+
+    def test_purgar(self):
+        self.assertEqual(historial.purgar(dias=1), 4)
+        self.assertEqual(historial.purgar(dias=0), 0)
+
+
+class HistorialApiTests(TestCase):
+    def get(self, **params):
+        return views.historial_dashboard_api(RequestFactory().get("/x", params))
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.get(puntos="muchos").status_code, 400)
+        self.assertEqual(self.get(agregacion="mediana").status_code, 400)
+        self.assertEqual(self.get(desde="2025-01-02", hasta="2025-01-01").status_code, 400)
+
+    def test_serie(self):
+        historial.guardar_snapshot({"total_proyectos": 3}, tomado_en=T0 + timedelta(minutes=30))
+
+        resp = self.get(desde="2025-01-01T00:00:00+00:00", hasta="2025-01-01T01:00:00+00:00", puntos="1")
+
+        self.assertEqual(json.loads(resp.content)["data"]["series"], {"total_proyectos": [3]})
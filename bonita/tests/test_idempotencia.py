@@ -0,0 +1,123 @@
+import hashlib
+from datetime import timedelta
+
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from bonita import idempotencia, plazos
+from bonita.models import RespuestaIdempotente
+from bonita.respuestas import JsonResponse
+
+
+class IdempotenciaTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.llamadas = 0
+        self.status = 201
+
+        @idempotencia.idempotente
+        def vista(req):
+            self.llamadas += 1
+            return JsonResponse({"ok": self.status < 500, "n": self.llamadas}, status=self.status)
+
+        self.vista = vista
+
+    def post(self, body='{"caseId": "7"}', clave="k1"):
+        req = self.factory.post("/x", data=body, content_type="application/json", HTTP_IDEMPOTENCY_KEY=clave)
+        return self.vista(req)
+
+    def test_reserva_y_repeticion(self):
+        primera = self.post()
+        segunda = self.post()
+
+        self.assertEqual(primera.status_code, 201)
+        self.assertEqual(segunda.status_code, 201)
+        self.assertEqual(segunda.content, primera.content)
+        self.assertEqual(segunda["Idempotent-Replayed"], "true")
+        self.assertEqual(self.llamadas, 1)
+
+    def test_sin_header_ejecuta_siempre(self):
+        req = self.factory.post("/x", data="{}", content_type="application/json")
+        self.vista(req)
+        self.vista(req)
+
+        self.assertEqual(self.llamadas, 2)
+        self.assertFalse(RespuestaIdempotente.objects.exists())
+
+    def test_misma_clave_otro_body_es_422(self):
+        self.post()
+        r = self.post(body='{"caseId": "7", "otro": 1}')
+
+        self.assertEqual(r.status_code, 422)
+        self.assertEqual(self.llamadas, 1)
+
+    def test_5xx_libera_la_clave(self):
+        self.status = 500
+        self.assertEqual(self.post().status_code, 500)
+        self.assertFalse(RespuestaIdempotente.objects.exists())
+
+        self.status = 201
+        self.assertEqual(self.post().status_code, 201)
+        self.assertEqual(self.llamadas, 2)
+
+    def test_en_curso_espera_dentro_del_plazo(self):
+        huella = hashlib.sha256(b'{"caseId": "7"}').hexdigest()
+        RespuestaIdempotente.objects.create(case_id="7", endpoint="vista", clave="k1", huella=huella)
+        token = plazos.activar(plazos.Plazo(0.3))
+        try:
+            with self.assertRaises(plazos.PlazoVencido):
+                self.post()
+        finally:
+            plazos.desactivar(token)
+        self.assertEqual(self.llamadas, 0)
+
+    @override_settings(IDEMPOTENCIA_EN_CURSO_MAX=60)
+    def test_reserva_abandonada_se_retoma(self):
+        self.post()
+        # La request original murió con su worker sin guardar la respuesta
+        RespuestaIdempotente.objects.update(status=None, creado_en=timezone.now() - timedelta(seconds=120))
+
+        r = self.post()
+
+        self.assertEqual(r.status_code, 201)
+        self.assertFalse(r.has_header("Idempotent-Replayed"))
+        self.assertEqual(self.llamadas, 2)
+
+    def test_continuacion_guarda_la_respuesta(self):
+        reservas = []
+
+        @idempotencia.idempotente
+        def vista(req):
+            reservas.append(idempotencia.continuar())
+            return JsonResponse({"ok": False}, status=500)
+
+        req = self.factory.post("/x", data="{}", content_type="application/json", HTTP_IDEMPOTENCY_KEY="k2")
+        self.assertEqual(vista(req).status_code, 500)
+        # El 500 no libera la clave: la continuación sigue a cargo
+        self.assertIsNone(RespuestaIdempotente.objects.get().status)
+
+        idempotencia.completar(reservas[0], JsonResponse({"ok": True}, status=201))
+        r = vista(req)
+
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(r["Idempotent-Replayed"], "true")
+        self.assertEqual(len(reservas), 1)
+
+
+class PlantillasTests(TestCase):
+    """Los formularios mandan Idempotency-Key con el helper compartido."""
+
+    PLANTILLAS = (
+        "compromiso", "consejo", "consejo_evaluar", "evaluar_propuestas",
+        "monitoreo", "nuevo", "pedido", "revisar", "ver_pedidos",
+    )
+
+    def test_incluyen_el_helper_una_vez(self):
+        from django.template.loader import render_to_string
+
+        for nombre in self.PLANTILLAS:
+            html = render_to_string(f"bonita/{nombre}.html", {})
+            self.assertEqual(html.count("function fetchIdempotente"), 1, nombre)
+            self.assertIn('fetchIdempotente("', html, nombre)
+            # la clave depende del cuerpo: nadie la pide por su cuenta
+            self.assertNotIn('claveEnvio("', html, nombre)
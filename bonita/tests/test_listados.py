@@ -0,0 +1,83 @@
+import json
+
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from bonita import casos, listados, views
+from bonita.tests.test_casos import ClienteFalso
+
+ITEMS = [
+    {"id": 3, "nombre": "b", "monto": 10},
+    {"id": 1, "nombre": "A", "monto": None},
+    {"id": 2, "nombre": "c", "monto": 5},
+    {"id": 4, "nombre": "d"},
+]
+
+
+def parametros(**query):
+    return listados.leer_parametros(RequestFactory().get("/x", query))
+
+
+class ListadosTests(SimpleTestCase):
+    def test_sin_parametros_no_esta_activo(self):
+        listado = parametros()
+
+        self.assertFalse(listado.activo)
+        self.assertTrue(listado.quiere("cualquiera"))
+
+    def test_parametros_invalidos(self):
+        for query in ({"limit": "x"}, {"limit": "0"}, {"limit": str(listados.LIMITE_MAXIMO + 1)},
+                      {"offset": "-1"}, {"offset": "y"}):
+            with self.assertRaises(ValueError, msg=query):
+                parametros(**query)
+
+    def test_orden_ascendente_y_descendente_con_none_al_final(self):
+        asc, _ = listados.paginar(ITEMS, parametros(sort="monto"))
+        desc, _ = listados.paginar(ITEMS, parametros(sort="-monto"))
+
+        self.assertEqual([x["id"] for x in asc], [2, 3, 1, 4])
+        self.assertEqual([x["id"] for x in desc], [3, 2, 1, 4])
+
+    def test_orden_de_textos_sin_mayusculas(self):
+        pagina, _ = listados.paginar(ITEMS, parametros(sort="nombre"))
+
+        self.assertEqual([x["nombre"] for x in pagina], ["A", "b", "c", "d"])
+
+    def test_pagina_y_total(self):
+        params = parametros(sort="id", limit="2", offset="1")
+        pagina, total = listados.paginar(ITEMS, params)
+
+        self.assertEqual(([x["id"] for x in pagina], total), ([2, 3], 4))
+        self.assertEqual(listados.meta(params, total, len(pagina)), {"total": 4, "offset": 1, "limit": 2, "count": 2})
+        # La lista original (compartida con el cache) no cambia
+        self.assertEqual(ITEMS[0]["id"], 3)
+
+    def test_proyeccion(self):
+        params = parametros(fields="id, nombre,id")
+        pagina = listados.proyectar(ITEMS[:2], params)
+
+        self.assertEqual(params.campos, ("id", "nombre"))
+        self.assertEqual(pagina, [{"id": 3, "nombre": "b"}, {"id": 1, "nombre": "A"}])
+        self.assertFalse(params.quiere("monto"))
+
+
+@override_settings(CASOS_LECTURA_MAX_EDAD=30)
+class ListadoVistaTests(TestCase):
+    def setUp(self):
+        cli = ClienteFalso()
+        cli.variables["1"]["proyectosJson"] = json.dumps(ITEMS)
+        casos.sincronizar(cli)
+
+    def get(self, query):
+        return views.revisar_proyectos_api(RequestFactory().get(f"/x?case=1&{query}"))
+
+    def test_pagina_proyectada(self):
+        cuerpo = json.loads(self.get("fields=id&sort=-id&limit=2&offset=1").content)
+
+        self.assertEqual(cuerpo["proyectos"], [{"id": 3}, {"id": 2}])
+        self.assertEqual((cuerpo["total"], cuerpo["count"]), (4, 2))
+
+    def test_parametro_invalido_es_400(self):
+        resp = self.get("limit=muchos")
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(json.loads(resp.content)["error"], "limit debe ser un entero")
@@ -0,0 +1,163 @@
+import json
+from unittest import skipUnless
+
+from django.test import SimpleTestCase
+
+from bonita import metricas
+from bonita.management.commands.bench_dashboard import generar_dataset, mismos_resultados
+from bonita.metricas import AgregadorDashboard, agregar_metricas, agregar_stream, iter_listas_json
+from bonita.metricas_numpy import AgregadorColumnar, numpy_disponible
+
+DATOS = {
+    "proyectos": [
+        {"id": 1, "nombre": "Escuela", "estado": "ejecucion"},
+        {"id": 2, "nombre": "Huerta", "estado": "planificacion"},
+        {"id": 3, "nombre": "Plaza", "estado": "ejecucion"},
+    ],
+    "pedidos": [
+        {"id": 10, "proyecto": 1, "estado": "abierto"},
+        {"id": 11, "proyecto": 1, "estado": "cerrado"},
+        {"id": 12, "proyecto": 2, "estado": "abierto"},
+    ],
+    "compromisos": [
+        {"id": 100, "pedidoId": 10, "estado": "cumplido", "monto": "10.10"},
+        {"id": 101, "pedidoId": 11, "estado": "pendiente", "monto": 5},
+        {"id": 102, "pedidoId": 12, "estado": "cumplido", "monto": "no es un número"},
+        {"id": 103, "pedidoId": 99, "estado": "pendiente"},
+    ],
+    "observaciones": [
+        {"id": 1000, "proyecto_id": 1, "estado": "pendiente", "fecha_creacion": "2025-01-02T00:00:00Z"},
+        {"id": 1001, "proyecto_id": 3, "estado": "aprobada", "fecha_creacion": "2025-01-03T00:00:00Z"},
+        {"id": 1002, "proyecto_id": 3, "estado": "vencida", "fecha_creacion": "2025-01-03T00:00:00Z"},
+        {"id": 1003, "proyecto_id": 3, "estado": "pendiente", "fecha_creacion": "2025-01-01T00:00:00Z"},
+    ],
+}
+
+
+class AgregadorDashboardTests(SimpleTestCase):
+    def test_metricas(self):
+        m = agregar_metricas(DATOS)["metricas"]
+
+        self.assertEqual(
+            (m["total_proyectos"], m["proyectos_ejecucion"], m["proyectos_planificacion"]), (3, 2, 1)
+        )
+        self.assertEqual((m["total_pedidos"], m["pedidos_abiertos"]), (3, 2))
+        self.assertEqual((m["total_compromisos"], m["compromisos_cumplidos"]), (4, 2))
+        # Los montos se suman en Decimal; los inválidos se ignoran
+        self.assertEqual(m["monto_total_compromisos"], 15.1)
+        self.assertAlmostEqual(m["monto_promedio_compromiso"], 15.1 / 4)
+        self.assertEqual((m["total_observaciones"], m["observaciones_pendientes"]), (4, 2))
+
+    def test_tops(self):
+        r = agregar_metricas(DATOS)
+
+        self.assertEqual(
+            [(p["id"], p["total_observaciones"]) for p in r["top_proyectos_observaciones"]], [(3, 3), (1, 1)]
+        )
+        # El compromiso del pedido 99 (sin proyecto) no cuenta
+        self.assertEqual(
+            [(p["id"], p["total_pedidos"], p["total_compromisos"]) for p in r["top_proyectos_compromisos"]],
+            [(1, 2, 2), (2, 1, 1)],
+        )
+
+    def test_recientes_a_igual_fecha_gana_la_primera(self):
+        recientes = agregar_metricas(DATOS)["observaciones_recientes"]
+
+        self.assertEqual([o["id"] for o in recientes], [1001, 1002, 1000, 1003])
+        self.assertEqual(recientes[0]["proyecto_nombre"], "Plaza")
+
+    def test_recientes_acotadas(self):
+        obs = [{"id": i, "fecha_creacion": f"2025-01-{i:02d}"} for i in range(1, 21)]
+
+        recientes = agregar_metricas({"observaciones": obs})["observaciones_recientes"]
+
+        self.assertEqual(len(recientes), metricas.OBSERVACIONES_RECIENTES)
+        self.assertEqual(recientes[0]["id"], 20)
+
+    def test_orden_entre_listas_y_lotes_no_importa(self):
+        agregador = AgregadorDashboard()
+        for clave in ("observaciones", "compromisos", "pedidos", "proyectos"):
+            for registro in DATOS[clave]:
+                agregador.agregar(clave, registro)
+
+        self.assertEqual(agregador.resultado(), agregar_metricas(DATOS))
+
+    def test_vacio(self):
+        m = agregar_metricas({})["metricas"]
+
+        self.assertEqual(m["total_proyectos"], 0)
+        self.assertEqual(m["monto_promedio_compromiso"], 0.0)
+
+
+def en_chunks(texto, tamanio):
+    datos = texto.encode("utf-8")
+    return [datos[i:i + tamanio] for i in range(0, len(datos), tamanio)]
+
+
+class IterListasJsonTests(SimpleTestCase):
+    def listas(self, texto, tamanio_chunk=7, tamanio_lote=1000):
+        salida = {}
+        for clave, lote in iter_listas_json(en_chunks(texto, tamanio_chunk), tamanio_lote):
+            salida.setdefault(clave, []).extend(lote)
+        return salida
+
+    def test_cualquier_corte_de_chunks(self):
+        texto = json.dumps({"a": [1, 23, 4.5e2, -0.25, True, None], "b": [{"x": "ñandú €"}, "s"], "c": []})
+
+        for tamanio in (1, 2, 3, 5, 64):
+            self.assertEqual(
+                self.listas(texto, tamanio), {"a": [1, 23, 450.0, -0.25, True, None], "b": [{"x": "ñandú €"}, "s"]},
+                tamanio,
+            )
+
+    def test_lotes_acotados(self):
+        texto = json.dumps({"a": list(range(10))})
+
+        lotes = [lote for _, lote in iter_listas_json(en_chunks(texto, 4), tamanio_lote=3)]
+
+        self.assertEqual(lotes, [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]])
+
+    def test_valores_que_no_son_listas_se_descartan(self):
+        texto = ' { "total": 12345, "meta": {"a": [1]}, "a": [ 1 ] } '
+
+        self.assertEqual(self.listas(texto, 3), {"a": [1]})
+
+    def test_objeto_vacio(self):
+        self.assertEqual(self.listas("{}"), {})
+
+    def test_json_invalido(self):
+        for texto in ('[1, 2]', '{"a": [1 2]}', '{"a": [1]', '{"a": [1]] }'):
+            with self.assertRaises(ValueError, msg=texto):
+                self.listas(texto, 2)
+
+    def test_agregar_stream_igual_que_en_memoria(self):
+        agregador = agregar_stream(en_chunks(json.dumps(DATOS), 11))
+
+        self.assertEqual(agregador.resultado(), agregar_metricas(DATOS))
+
+
+@skipUnless(numpy_disponible(), "NumPy no está instalado")
+class AgregadorColumnarTests(SimpleTestCase):
+    def assertMismoResultado(self, datos):
+        python = agregar_metricas(datos)
+        columnar = agregar_metricas(datos, AgregadorColumnar())
+        self.assertTrue(mismos_resultados(python, columnar), (python, columnar))
+
+    def test_mismo_resultado_que_el_motor_python(self):
+        self.assertMismoResultado(DATOS)
+
+    def test_dataset_sintetico(self):
+        self.assertMismoResultado(generar_dataset(5000, seed=7))
+
+    def test_ids_no_enteros_y_estados_desconocidos(self):
+        datos = {
+            "proyectos": [{"id": "a", "nombre": "A", "estado": "otro"}, {"id": "b", "nombre": "B"}],
+            "pedidos": [{"id": "p1", "proyecto": "a"}, {"id": "p2", "proyecto": None}],
+            "compromisos": [{"pedidoId": "p1", "monto": "1.5"}, {"pedidoId": "p2"}],
+            "observaciones": [{"proyecto_id": "b", "estado": "rara", "fecha_vencimiento": "no es fecha"}],
+        }
+
+        self.assertMismoResultado(datos)
+
+    def test_vacio(self):
+        self.assertMismoResultado({})
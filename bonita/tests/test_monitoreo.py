@@ -0,0 +1,78 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+
+from bonita import monitoreo
+from bonita.models import EtapaPlan
+
+PLAN = {"etapas": [
+    {"nombre": "Obra", "fechaInicioPrevista": "2025-03-01T00:00:00", "fechaFinPrevista": "no es fecha"},
+    {"nombre": "Cierre"},
+    "basura",
+]}
+
+
+class MonitoreoTests(TestCase):
+    def setUp(self):
+        monitoreo.guardar_proyecto(5, "Escuela", "Techo nuevo", PLAN)
+
+    def test_etapas_en_orden_tal_como_vinieron(self):
+        self.assertEqual(monitoreo.etapas(5), PLAN["etapas"][:2])
+        primera = EtapaPlan.objects.get(proyecto_id=5, orden=0)
+        self.assertEqual(str(primera.fecha_inicio_prevista), "2025-03-01")
+        self.assertIsNone(primera.fecha_fin_prevista)
+
+    def test_guardar_otra_vez_reemplaza_las_etapas(self):
+        monitoreo.guardar_proyecto(5, "Escuela", "", {"etapas": [{"nombre": "Única"}]})
+
+        self.assertEqual(monitoreo.etapas(5), [{"nombre": "Única"}])
+
+    def test_compromisos_sin_repetir_filtrados_y_paginados(self):
+        for i, estado in ((1, "pendiente"), (2, "cumplido"), (3, "pendiente"), (1, "cumplido")):
+            monitoreo.agregar_compromiso(5, {"id": str(i), "detalle": f"c{i}", "estado": estado})
+        monitoreo.agregar_compromiso(5, {"id": "sin número"})
+
+        todos, total = monitoreo.compromisos(5)
+        self.assertEqual(([c["id"] for c in todos], total), ([1, 2, 3], 3))
+        self.assertEqual(todos[0]["estado"], "pendiente")
+
+        pagina, total = monitoreo.compromisos(5, limit=1, offset=1, estado="pendiente")
+        self.assertEqual(([c["id"] for c in pagina], total), ([3], 2))
+
+    def test_compromiso_de_un_proyecto_sin_snapshot(self):
+        monitoreo.agregar_compromiso(9, {"id": 1})
+
+        self.assertEqual(monitoreo.compromisos(9)[1], 1)
+
+
+class Migracion0007Tests(TransactionTestCase):
+    antes = [("bonita", "0006_versiones_listados")]
+    despues = [("bonita", "0007_tablas_monitoreo")]
+
+    def migrar(self, destino):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(destino)
+        return executor.loader.project_state(destino).apps
+
+    def tearDown(self):
+        self.migrar(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_json_a_tablas_y_vuelta(self):
+        apps = self.migrar(self.antes)
+        apps.get_model("bonita", "ProyectoMonitoreo").objects.create(
+            proyecto_id=5, nombre="Escuela",
+            plan_trabajo=PLAN,
+            compromisos_aceptados=[{"id": "7", "detalle": "x", "estado": "cumplido"}, 8, {"id": "?"}, 7],
+        )
+
+        apps = self.migrar(self.despues)
+        etapas = apps.get_model("bonita", "EtapaPlan").objects.order_by("orden")
+        compromisos = apps.get_model("bonita", "CompromisoAceptado").objects.order_by("id")
+        self.assertEqual([e.datos for e in etapas], PLAN["etapas"][:2])
+        self.assertEqual([(c.compromiso_id, c.estado) for c in compromisos], [(7, "cumplido"), (8, "")])
+
+        apps = self.migrar(self.antes)
+        snap = apps.get_model("bonita", "ProyectoMonitoreo").objects.get()
+        self.assertEqual(snap.plan_trabajo, {"etapas": PLAN["etapas"][:2]})
+        self.assertEqual([c["id"] for c in snap.compromisos_aceptados], [7, 8])
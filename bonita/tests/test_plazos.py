@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from bonita import plazos
+from bonita.middleware import PlazoMiddleware
+from bonita.respuestas import JsonResponse
+
+
+class PlazosTests(SimpleTestCase):
+    def activar(self, segundos):
+        plazo = plazos.Plazo(segundos)
+        token = plazos.activar(plazo)
+        self.addCleanup(plazos.desactivar, token)
+        return plazo
+
+    def test_sin_plazo_devuelve_el_timeout(self):
+        self.assertEqual(plazos.restante(15), 15)
+        self.assertIsNone(plazos.restante())
+
+    def test_timeout_acotado_a_lo_que_queda(self):
+        self.activar(1)
+
+        self.assertLessEqual(plazos.restante(15), 1)
+        self.assertGreater(plazos.restante(15), 0.5)
+        self.assertEqual(plazos.restante(0.2), 0.2)
+
+    def test_plazo_agotado(self):
+        plazo = self.activar(0.01)
+        time.sleep(0.02)
+
+        with self.assertRaises(plazos.PlazoVencido):
+            plazos.restante(15)
+        self.assertTrue(plazo.vencido)
+
+    def test_dormir_no_pasa_el_plazo(self):
+        self.activar(0.1)
+
+        t0 = time.monotonic()
+        plazos.dormir(5)
+
+        self.assertLess(time.monotonic() - t0, 1)
+        with self.assertRaises(plazos.PlazoVencido):
+            plazos.dormir(5)
+
+    def test_acotar_cancela_la_espera(self):
+        async def lenta():
+            token = plazos.activar(plazos.Plazo(0.2))
+            try:
+                await plazos.acotar(asyncio.sleep(5))
+            finally:
+                plazos.desactivar(token)
+
+        t0 = time.monotonic()
+        with self.assertRaises(plazos.PlazoVencido):
+            async_to_sync(lenta)()
+        self.assertLess(time.monotonic() - t0, 1)
+
+    def test_acotar_con_el_plazo_vencido_cierra_la_espera(self):
+        async def espera():
+            await asyncio.sleep(5)
+
+        corrutina = espera()
+
+        async def vencida():
+            token = plazos.activar(plazos.Plazo(0))
+            try:
+                await plazos.acotar(corrutina)
+            finally:
+                plazos.desactivar(token)
+
+        with self.assertRaises(plazos.PlazoVencido):
+            async_to_sync(vencida)()
+        self.assertIsNone(corrutina.cr_frame)
+
+    def test_sin_plazo_lo_restaura(self):
+        plazo = self.activar(0.01)
+        time.sleep(0.02)
+
+        with plazos.sin_plazo():
+            self.assertEqual(plazos.restante(15), 15)
+        self.assertIs(plazos.actual(), plazo)
+
+    def test_middleware_responde_504_y_503(self):
+        middleware = PlazoMiddleware(lambda req: None)
+        error = JsonResponse({"ok": False}, status=500)
+
+        vencido = plazos.Plazo(10)
+        vencido.vencido = True
+        self.assertEqual(middleware._responder(vencido, error).status_code, 504)
+
+        saturado = plazos.Plazo(10)
+        saturado.reintentar_en = 2.5
+        r = middleware._responder(saturado, error)
+        self.assertEqual(r.status_code, 503)
+        self.assertEqual(r["Retry-After"], "3")
+
+        self.assertEqual(middleware._responder(vencido, JsonResponse({"ok": True})).status_code, 200)
@@ -0,0 +1,168 @@
+import datetime
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.test import RequestFactory, TestCase, override_settings
+
+from bonita import casos, views
+from bonita import respuestas
+from bonita.respuestas import JsonCrudoResponse, JsonResponse, con_etag, dumps, es_json_compuesto
+from bonita.tests.test_casos import ClienteFalso
+
+
+class ConEtagTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.llamadas = 0
+        self.etag = '"v1"'
+
+    def vista(self, etag_local=None):
+        @con_etag(etag_local)
+        def vista(req):
+            self.llamadas += 1
+            return JsonResponse({"ok": True, "n": 1})
+
+        return vista
+
+    def test_etag_local_responde_304_sin_ejecutar_la_vista(self):
+        vista = self.vista(lambda req: self.etag)
+
+        primera = vista(self.factory.get("/x"))
+        segunda = vista(self.factory.get("/x", HTTP_IF_NONE_MATCH=primera["ETag"]))
+
+        self.assertEqual(primera["ETag"], '"v1"')
+        self.assertEqual(segunda.status_code, 304)
+        self.assertEqual(self.llamadas, 1)
+
+    def test_etag_local_distinto_ejecuta(self):
+        vista = self.vista(lambda req: self.etag)
+        primera = vista(self.factory.get("/x"))
+        self.etag = '"v2"'
+
+        segunda = vista(self.factory.get("/x", HTTP_IF_NONE_MATCH=primera["ETag"]))
+
+        self.assertEqual(segunda.status_code, 200)
+        self.assertEqual(segunda["ETag"], '"v2"')
+
+    def test_sin_etag_local_usa_el_cuerpo(self):
+        vista = self.vista()
+        primera = vista(self.factory.get("/x"))
+
+        segunda = vista(self.factory.get("/x", HTTP_IF_NONE_MATCH=primera["ETag"]))
+
+        self.assertEqual(segunda.status_code, 304)
+        self.assertEqual(self.llamadas, 2)
+
+    def test_post_no_se_condiciona(self):
+        vista = self.vista(lambda req: self.etag)
+
+        resp = vista(self.factory.post("/x", HTTP_IF_NONE_MATCH='"v1"'))
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn("ETag", resp)
+
+
+@override_settings(CASOS_LECTURA_MAX_EDAD=30)
+class ProyectosEnEjecucionEtagTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        cli = ClienteFalso()
+        cli.variables["1"]["proyectosJson"] = json.dumps([{"id": 7, "nombre": "Escuela"}])
+        casos.sincronizar(cli)
+
+    def get(self, query, **headers):
+        return views.obtener_proyectos_en_ejecucion_api(self.factory.get(f"/x?case=1&{query}", **headers))
+
+    def test_sin_limites_el_304_no_va_a_bonita(self):
+        primera = self.get("fields=id,nombre")
+        self.assertEqual(json.loads(primera.content)["proyectos"], [{"id": 7, "nombre": "Escuela"}])
+
+        with mock.patch.object(views.BonitaClient, "login", side_effect=AssertionError("fue a Bonita")):
+            segunda = self.get("fields=id,nombre", HTTP_IF_NONE_MATCH=primera["ETag"])
+
+        self.assertEqual(segunda.status_code, 304)
+
+    def test_con_limites_no_hay_etag_local(self):
+        req = self.factory.get("/x?case=1")
+
+        self.assertIsNone(views._etag_proyectos_en_ejecucion(req))
+        self.assertIsNotNone(views._etag_proyectos_en_ejecucion(self.factory.get("/x?case=1&fields=id")))
+
+
+class JsonCrudoTests(TestCase):
+    def test_es_json_compuesto(self):
+        for texto in ('[1, 2]', ' {"a": [1]} ', "[]"):
+            self.assertTrue(es_json_compuesto(texto), texto)
+        for texto in (None, 1, "", "1", '"[1]"', "[1,", "[1}", "[NaN]", "[1] [2]", "{'a': 1}"):
+            self.assertFalse(es_json_compuesto(texto), texto)
+
+    def test_se_pega_sin_decodificar(self):
+        crudo = '[{"id": 1, "nombre": "Escuela"}]'
+
+        resp = JsonCrudoResponse({"ok": True, "caseId": "1"}, {"proyectos": crudo})
+
+        self.assertIn(crudo.encode("utf-8"), resp.content)
+        self.assertEqual(
+            json.loads(resp.content), {"ok": True, "caseId": "1", "proyectos": json.loads(crudo)}
+        )
+
+    def test_sin_campos_decodificados(self):
+        resp = JsonCrudoResponse({}, {"a": "[1]", "b": ' {"x": 2} '})
+
+        self.assertEqual(json.loads(resp.content), {"a": [1], "b": {"x": 2}})
+
+
+@override_settings(CASOS_LECTURA_MAX_EDAD=30)
+class ListadoCrudoTests(TestCase):
+    def proyectos(self, crudo):
+        cli = ClienteFalso()
+        cli.variables["1"]["proyectosJson"] = crudo
+        casos.sincronizar(cli)
+        return views.revisar_proyectos_api(RequestFactory().get("/x?case=1"))
+
+    def test_variable_valida_va_tal_cual(self):
+        crudo = '[ {"id": 7,   "nombre": "Escuela"} ]'
+
+        resp = self.proyectos(crudo)
+
+        self.assertIn(crudo.encode("utf-8"), resp.content)
+        self.assertEqual(json.loads(resp.content)["proyectos"], [{"id": 7, "nombre": "Escuela"}])
+
+    def test_doble_codificada_se_decodifica(self):
+        resp = self.proyectos(json.dumps('[{"id": 7}]'))
+
+        self.assertEqual(json.loads(resp.content)["proyectos"], [{"id": 7}])
+
+
+class SerializacionTests(TestCase):
+    DATOS = {
+        "fecha": datetime.datetime(2025, 1, 2, 3, 4, 5, 678000),
+        "dia": datetime.date(2025, 1, 2),
+        "monto": Decimal("10.50"),
+        "texto": "ñandú",
+        "lista": [1, 2.5, None, True],
+    }
+
+    def test_mismo_resultado_que_la_stdlib(self):
+        with override_settings(RESPUESTAS_JSON_MOTOR="stdlib"):
+            stdlib = json.loads(dumps(self.DATOS))
+        self.assertEqual(json.loads(dumps(self.DATOS)), stdlib)
+        self.assertEqual(stdlib["fecha"], "2025-01-02T03:04:05.678")
+        self.assertEqual(stdlib["monto"], "10.50")
+
+    def test_enteros_enormes_caen_a_la_stdlib(self):
+        self.assertEqual(json.loads(dumps({"n": 2 ** 70})), {"n": 2 ** 70})
+
+    def test_json_response_como_la_de_django(self):
+        with self.assertRaises(TypeError):
+            JsonResponse([1])
+        resp = JsonResponse([1], safe=False, json_dumps_params={"indent": 2})
+
+        self.assertEqual(resp["Content-Type"], "application/json")
+        self.assertEqual(resp.content, b"[\n  1\n]")
+
+    @mock.patch.object(respuestas, "orjson", None)
+    def test_sin_orjson(self):
+        self.assertFalse(respuestas.orjson_disponible())
+        self.assertEqual(json.loads(dumps({"a": Decimal("1")})), {"a": "1"})
@@ -25,7 +25,10 @@ from bonita.views import (
     resumen_proyecto_api,
     red_ongs_salir_api,
     debug_case_variables_api,
+    admision_metricas_api,
+    backend_circuitos_api,
     dashboard_datos_api,
+    historial_dashboard_api,
 )
 
 urlpatterns = [
@@ -62,6 +65,9 @@ urlpatterns = [
 
     # Dashboard gerencial
     path("dashboard/datos/", dashboard_datos_api, name="bonita_dashboard_datos"),
+    path("dashboard/historial/", historial_dashboard_api, name="bonita_dashboard_historial"),
+    path("admision/metricas/", admision_metricas_api, name="bonita_admision_metricas"),
+    path("backend/circuitos/", backend_circuitos_api, name="bonita_backend_circuitos"),
 
     # Evaluar propuestas / monitoreo
     path("revisar-compromisos/", revisar_compromisos_api, name="bonita_revisar_compromisos"),
@@ -1,15 +1,33 @@
 from __future__ import annotations
+import asyncio
 import json
+import os
 import time
-from typing import Any, Dict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
 
 from django.conf import settings
-from django.http import JsonResponse, HttpRequest
+from django.http import HttpRequest
 from django.shortcuts import render
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 import requests
+from asgiref.sync import sync_to_async
 
 from .bonita_client import BonitaClient
+from .bonita_client_async import AsyncBonitaClient
+from .cache import CacheDosNiveles, StaleWhileRevalidate
+from .idempotencia import idempotente
+from . import admision, agregados, backend, bloqueos, bucle, casos, deltas, historial, idempotencia, listados, monitoreo, plazos
+from .respuestas import (
+    JsonCrudoResponse,
+    JsonResponse,
+    calcular_etag,
+    con_etag,
+    es_json_compuesto,
+    etiquetar,
+    no_modificado,
+)
 from .validators import validate_iniciar_payload
 from .models import ProyectoMonitoreo, SesionBonita  # <--- AGREGADO SesionBonita
 
@@ -30,7 +48,7 @@ def _marcar_observaciones_vencidas_si_aplica(proyecto_id: int, jwt_token: str) -
             "Content-Type": "application/json",
         }
 
-        requests.post(url, headers=headers, timeout=5)
+        backend.llamar("observaciones", "POST", url, headers=headers, timeout=5)
     except Exception:
         pass
 
@@ -139,6 +157,169 @@ def _json(req: HttpRequest) -> Dict[str, Any]:
         return {}
 
 
+def _etag_variables(*nombres: str):
+    """
+    ETag local para las vistas que sólo devuelven variables de caso: hash
+    de esas variables en el modelo de lectura. None (se calcula del cuerpo)
+    si el caso no está al día localmente.
+    """
+    def etag(req: HttpRequest):
+        case_id = (req.GET.get("case") or "").strip()
+        if not case_id:
+            return None
+        variables = casos.variables_frescas(case_id)
+        if variables is None:
+            return None
+        # La query string entra en el ETag: ?fields/?limit cambian el cuerpo
+        return calcular_etag(
+            req.get_full_path(), *[(variables.get(n) or {}).get("value") for n in nombres]
+        )
+    return etag
+
+
+def _etag_proyectos_en_ejecucion(req: HttpRequest):
+    """
+    ETag local de obtener_proyectos_en_ejecucion_api: el de proyectosJson,
+    salvo que la respuesta lleve limite_observaciones (sale de la API
+    backend y no hay copia local que lo respalde).
+    """
+    try:
+        listado = listados.leer_parametros(req)
+    except ValueError:
+        return None
+    if listado.quiere("limite_observaciones"):
+        return None
+    return _etag_variables("proyectosJson")(req)
+
+
+def _respuesta_listado(case_id: str, clave: str, raw: str, listado: listados.Listado, since: Optional[str] = None):
+    """
+    Respuesta de un listado guardado como JSON en una variable de caso.
+
+    Sin fields/sort/limit/offset el texto va tal cual (sin parsear); si no,
+    se decodifica (cache de BonitaClient), se ordena, pagina y proyecta.
+    Incluye el token "version"; con ?since= responde sólo los cambios
+    (ver bonita/deltas.py).
+    """
+    def items():
+        return BonitaClient.decode_json(raw, expected=list, default=[])
+
+    version, cambios = deltas.calcular(case_id, clave, items, since=since, raw=raw)
+    base: Dict[str, Any] = {"ok": True, "caseId": case_id}
+    if version is not None:
+        base["version"] = version
+    if cambios is not None:
+        return _respuesta_delta(base, clave, cambios, listado)
+
+    if not listado.activo and es_json_compuesto(raw):
+        return JsonCrudoResponse(base, {clave: raw}, status=200)
+
+    items = BonitaClient.decode_json(raw, default=[])
+    if not listado.activo or not isinstance(items, list):
+        return JsonResponse({**base, clave: items}, status=200)
+
+    pagina, total = listados.paginar(items, listado)
+    pagina = listados.proyectar(pagina, listado)
+    return JsonResponse(
+        {**base, clave: pagina, **listados.meta(listado, total, len(pagina))},
+        status=200,
+    )
+
+
+def _respuesta_delta(base: Dict[str, Any], clave: str, cambios: Dict[str, Any], listado: listados.Listado):
+    """
+    Respuesta a ?since=: sólo los elementos agregados/modificados (con
+    ?fields= aplicado, sin paginar) con sus claves, las claves de los
+    eliminados y, si algo cambió, el orden de las claves del listado.
+    """
+    orden = {"orden": cambios["orden"]} if "orden" in cambios else {}
+    return JsonResponse(
+        {
+            **base,
+            "delta": True,
+            "sinCambios": cambios["sinCambios"],
+            clave: listados.proyectar(cambios["cambiados"], listado),
+            "claves": cambios["claves"],
+            "eliminados": cambios["eliminados"],
+            **orden,
+        },
+        status=200,
+    )
+
+
+def _claves_de(todos: List[Any], pagina: List[Any]) -> List[str]:
+    """Claves de delta (bonita/deltas.py) de `pagina`, que sale de `todos`."""
+    claves = deltas.claves(todos)
+    if pagina is todos:
+        return claves
+    por_objeto = {id(item): clave for item, clave in zip(todos, claves)}
+    return [por_objeto[id(item)] for item in pagina]
+
+
+def _listado_o_error(req: HttpRequest):
+    """(Listado, None) o (None, respuesta 400) si los parámetros son inválidos."""
+    try:
+        return listados.leer_parametros(req), None
+    except ValueError as e:
+        return None, JsonResponse({"ok": False, "error": str(e)}, status=400)
+
+
+# --------------------------- Trabajo que sobrevive al cliente ---------------------------
+
+# Bajo ASGI, si el cliente se desconecta Django cancela la vista async: las
+# esperas (wait_ready_task_in_case, asyncio.sleep) se cortan ahí y dejan de
+# consultar a Bonita. Lo que viene después de ejecutar una tarea no se puede
+# dejar a medias: corre en _sin_cancelar(). Lo mismo si se agota el plazo
+# del request (bonita/plazos.py): la vista responde 504 y el trabajo termina
+# igual. La respuesta queda en la RespuestaIdempotente del request para el
+# reintento del cliente (bonita/idempotencia.py).
+#
+# Tareas en curso en un loop duradero (referencia fuerte: que no las junte
+# el GC si la vista ya se canceló)
+_en_curso: Set["asyncio.Task"] = set()
+
+
+async def _sin_cancelar(corrutina) -> tuple:
+    """
+    Corre `corrutina` (que devuelve (payload, status)) hasta el final aunque
+    se cancele la vista o se agote su plazo.
+
+    Bajo ASGI corre en el loop del servidor. Bajo WSGI el loop de la vista se
+    cierra con el request y cancelaría la tarea: corre en el loop de fondo
+    (bonita/bucle.py).
+    """
+    reserva = idempotencia.continuar()
+
+    async def correr() -> tuple:
+        # Sigue aunque el cliente se vaya: sin el plazo del request (la
+        # tarea corre en una copia del contexto, la vista lo conserva)
+        plazos.activar(None)
+        try:
+            resultado = await corrutina
+        except BaseException:
+            if reserva is not None:
+                await sync_to_async(idempotencia.completar)(reserva, None)
+            raise
+        if reserva is not None:
+            payload, status = resultado
+            await sync_to_async(idempotencia.completar)(reserva, JsonResponse(payload, status=status))
+        return resultado
+
+    loop = asyncio.get_running_loop()
+    if bucle.es_duradero(loop):
+        tarea = asyncio.ensure_future(correr())
+        _en_curso.add(tarea)
+        tarea.add_done_callback(_en_curso.discard)
+        espera = asyncio.shield(tarea)
+    else:
+        espera = bucle.esperar(bucle.en_fondo(correr()))
+    try:
+        return await plazos.acotar(espera)
+    except asyncio.CancelledError:
+        print("Info: cliente desconectado; el envío sigue en segundo plano")
+        raise
+
+
 # --------------------------- API: LOGIN ---------------------------
 
 @csrf_exempt
@@ -237,7 +418,7 @@ def login_api(req: HttpRequest):
 
 
 @csrf_exempt
-def next_step_api(req: HttpRequest):
+async def next_step_api(req: HttpRequest):
     """
     Dado un caseId, busca la tarea pendiente (ready) en Bonita
     y decide a qué pantalla debe ir el usuario.
@@ -247,6 +428,9 @@ def next_step_api(req: HttpRequest):
 
     Si no se puede determinar un rol válido (rol = 'desconocido'),
     devuelve 403 y NO redirige a ninguna página.
+
+    Sólo lee: si el cliente se desconecta (ASGI) la espera se cancela y no
+    queda nada pendiente.
     """
     if req.method != "POST":
         return JsonResponse({"error": "POST only"}, status=405)
@@ -257,45 +441,41 @@ def next_step_api(req: HttpRequest):
         return JsonResponse({"ok": False, "error": "Falta caseId"}, status=400)
 
     try:
-        cli = BonitaClient()
-        cli.login()
+        cli = AsyncBonitaClient()
+        await cli.login()
 
         proyecto_id = None
         pedido_id = None
         rol_usuario = None
 
+        # Las tres variables en paralelo; si alguna falla queda en None
+        var_proyecto, var_pedido, var_rol = await asyncio.gather(
+            cli.get_case_variable(case_id, "proyectoId"),
+            cli.get_case_variable(case_id, "pedidoId"),
+            cli.get_case_variable(case_id, "rol"),
+            return_exceptions=True,
+        )
+
         # Leer proyectoId
-        try:
-            var_proyecto = cli.get_case_variable(case_id, "proyectoId")
-            if var_proyecto and "value" in var_proyecto:
-                val = var_proyecto["value"]
-                if val is not None and str(val).strip() and str(val).lower() != "null":
-                    proyecto_id = str(val).strip()
-        except Exception:
-            pass
+        if isinstance(var_proyecto, dict) and "value" in var_proyecto:
+            val = var_proyecto["value"]
+            if val is not None and str(val).strip() and str(val).lower() != "null":
+                proyecto_id = str(val).strip()
 
         # Leer pedidoId
-        try:
-            var_pedido = cli.get_case_variable(case_id, "pedidoId")
-            if var_pedido and "value" in var_pedido:
-                val = var_pedido["value"]
-                if val is not None and str(val).strip() and str(val).lower() != "null":
-                    pedido_id = str(val).strip()
-        except Exception:
-            pass
+        if isinstance(var_pedido, dict) and "value" in var_pedido:
+            val = var_pedido["value"]
+            if val is not None and str(val).strip() and str(val).lower() != "null":
+                pedido_id = str(val).strip()
 
         # Leer rol
-        try:
-            var_rol = cli.get_case_variable(case_id, "rol")
-            if var_rol and "value" in var_rol:
-                val = var_rol["value"]
-                if val:
-                    rol_usuario = str(val).strip()
-        except Exception:
-            pass
+        if isinstance(var_rol, dict) and "value" in var_rol:
+            val = var_rol["value"]
+            if val:
+                rol_usuario = str(val).strip()
 
         # Aca probamos un poco más de tiempo para que aparezca la primera tarea
-        task = cli.wait_ready_task_in_case(
+        task = await cli.wait_ready_task_in_case(
             case_id,
             task_name=None,
             timeout_sec=8,  # antes 3
@@ -498,7 +678,7 @@ def debug_case_variables_api(req: HttpRequest):
             f"{cli.api}/bpm/caseVariable",
             params=[("p", "0"), ("c", "100"), ("f", f"case_id={case_id}")],
             headers=cli._h(),
-            timeout=cli._timeout,
+            timeout=cli._plazo(),
         )
         r.raise_for_status()
         variables = r.json() if r.text else []
@@ -518,6 +698,7 @@ def debug_case_variables_api(req: HttpRequest):
 
 
 @csrf_exempt
+@con_etag(_etag_variables("respuestasJson"))
 def obtener_datos_evaluacion_api(req: HttpRequest):
     """
     Lee la variable 'respuestasJson' del caso en Bonita.
@@ -528,18 +709,16 @@ def obtener_datos_evaluacion_api(req: HttpRequest):
         return JsonResponse({"error": "Falta caseId"}, status=400)
 
     try:
-        cli = BonitaClient()
-        cli.login()
-
         # Leemos la variable donde el conector GET guardó la respuesta
-        var = cli.get_case_variable(case_id, "respuestasJson")
+        # (modelo de lectura local; va a Bonita sólo si no está al día)
+        var = casos.variable(case_id, "respuestasJson")
 
         lista = []
         if var and "value" in var and var["value"]:
-            try:
-                lista = json.loads(var["value"])
-            except:
-                pass
+            # JSON válido a simple vista: se pega sin parsear
+            if es_json_compuesto(var["value"]):
+                return JsonCrudoResponse({"ok": True}, {"respuestas": var["value"]})
+            lista = BonitaClient.decode_json(var["value"], default=[])
 
         return JsonResponse({"ok": True, "respuestas": lista})
 
@@ -548,6 +727,7 @@ def obtener_datos_evaluacion_api(req: HttpRequest):
 
 
 @csrf_exempt
+@idempotente
 def enviar_evaluacion_consejo_api(req: HttpRequest):
     """
     Completa la tarea 'Evaluar Respuestas' en Bonita.
@@ -583,6 +763,8 @@ def enviar_evaluacion_consejo_api(req: HttpRequest):
         }
         cli.execute_task(task["id"], contract)
 
+        agregados.registrar_evento("observacion_aprobada" if aprobada else "observacion_rechazada")
+
         return JsonResponse({"ok": True})
 
     except Exception as e:
@@ -592,7 +774,8 @@ def enviar_evaluacion_consejo_api(req: HttpRequest):
 # --------------------------- API: Iniciar proyecto ---------------------------
 
 @csrf_exempt
-def iniciar_proyecto_api(req: HttpRequest):
+@idempotente
+async def iniciar_proyecto_api(req: HttpRequest):
     """
     Empuja el contrato de 'Definir plan de trabajo y económico'.
     Si no existe un caseId válido, instancia el proceso.
@@ -613,11 +796,11 @@ def iniciar_proyecto_api(req: HttpRequest):
     case_id_in = str(data.get("caseId") or "").strip()
 
     try:
-        cli = BonitaClient()
-        cli.login()
+        cli = AsyncBonitaClient()
+        await cli.login()
 
         assignee_username = getattr(settings, "BONITA_ASSIGNEE", "walter.bates")
-        user_id = cli.get_user_id_by_username(assignee_username)
+        user_id = await cli.get_user_id_by_username(assignee_username)
         if not user_id:
             return JsonResponse(
                 {"error": "Usuario Bonita no encontrado", "detail": assignee_username},
@@ -628,7 +811,7 @@ def iniciar_proyecto_api(req: HttpRequest):
         if case_id_in:
             case_id = case_id_in
         else:
-            proc_id = cli.get_process_definition_id(
+            proc_id = await cli.get_process_definition_id(
                 getattr(settings, "BONITA_PROCESS_NAME", "ProjectPlanning"),
                 getattr(settings, "BONITA_PROCESS_VERSION", "1.0"),
             )
@@ -637,13 +820,13 @@ def iniciar_proyecto_api(req: HttpRequest):
 
             api_user = str(data.get("apiUser") or data.get("username") or "").strip()
             api_pass = str(data.get("apiPass") or data.get("password") or "").strip()
-            inst = cli.instantiate_process(proc_id, {"apiUser": api_user, "apiPass": api_pass})
+            inst = await cli.instantiate_process(proc_id, {"apiUser": api_user, "apiPass": api_pass})
             case_id = str((inst or {}).get("caseId") or (inst or {}).get("id") or "")
             if not case_id:
                 return JsonResponse({"error": "No se obtuvo caseId"}, status=500)
 
         # Buscar tarea "Definir plan..."
-        task = cli.wait_ready_task_in_case(
+        task = await cli.wait_ready_task_in_case(
             case_id,
             task_name="Definir plan de trabajo y economico",
             timeout_sec=15,
@@ -654,93 +837,85 @@ def iniciar_proyecto_api(req: HttpRequest):
                 status=409,
             )
 
-        # Asignar y ejecutar tarea
-        cli.assign_task(task["id"], user_id)
-        payload_contrato = {
-            "nombre": str(data.get("nombre") or ""),
-            "descripcion": str(data.get("descripcion") or ""),
-            "planTrabajo": json.dumps(data.get("planTrabajo") or {}, ensure_ascii=False),
-            "planEconomico": json.dumps(data.get("planEconomico") or {}, ensure_ascii=False),
-        }
-        cli.execute_task(task["id"], payload_contrato)
-
-        # ---------- Esperar a que el conector cree el proyecto ----------
-        proyecto_id = None
-        raw_body_proyecto = None
-
-        deadline = time.time() + 10  # hasta 10 segundos
-        last_raw_pid = None
-
-        while time.time() < deadline and proyecto_id is None:
-            # 1) Intento directo: variable proyectoId
-            var_pid = cli.get_case_variable(case_id, "proyectoId")
-            if var_pid and "value" in var_pid:
-                v = (var_pid["value"] or "").strip()
-                last_raw_pid = v
-                if v and v.lower() != "null":
-                    try:
-                        proyecto_id = int(v)
-                    except ValueError:
-                        proyecto_id = v
-                    break
+        async def completar() -> tuple:
+            # Asignar y ejecutar tarea
+            await cli.assign_task(task["id"], user_id)
+            payload_contrato = {
+                "nombre": str(data.get("nombre") or ""),
+                "descripcion": str(data.get("descripcion") or ""),
+                "planTrabajo": json.dumps(data.get("planTrabajo") or {}, ensure_ascii=False),
+                "planEconomico": json.dumps(data.get("planEconomico") or {}, ensure_ascii=False),
+            }
+            await cli.execute_task(task["id"], payload_contrato)
+
+            # ---------- Esperar a que el conector cree el proyecto ----------
+            proyecto_id = None
+            raw_body_proyecto = None
+
+            deadline = time.time() + 10  # hasta 10 segundos
+            last_raw_pid = None
+
+            while time.time() < deadline and proyecto_id is None:
+                # 1) Intento directo: variable proyectoId
+                var_pid = await cli.get_case_variable(case_id, "proyectoId")
+                if var_pid and "value" in var_pid:
+                    v = (var_pid["value"] or "").strip()
+                    last_raw_pid = v
+                    if v and v.lower() != "null":
+                        try:
+                            proyecto_id = int(v)
+                        except ValueError:
+                            proyecto_id = v
+                        break
 
-            time.sleep(0.4)
+                await asyncio.sleep(0.4)
+
+            # 2) Si sigue en None, probar leyendo body_proyecto y parseando JSON
+            var_proy = await cli.get_case_variable(case_id, "body_proyecto")
+            if var_proy and "value" in var_proy:
+                raw_body_proyecto = (var_proy["value"] or "").strip()
+                if proyecto_id is None:
+                    # body_proyecto puede venir doblemente codificado
+                    obj = BonitaClient.decode_json(raw_body_proyecto, dict)
+                    if obj is not None:
+                        proyecto_id = (
+                                obj.get("id")
+                                or obj.get("proyectoId")
+                                or obj.get("id_proyecto")
+                        )
 
-        # 2) Si sigue en None, probar leyendo body_proyecto y parseando JSON
-        var_proy = cli.get_case_variable(case_id, "body_proyecto")
-        if var_proy and "value" in var_proy:
-            raw_body_proyecto = (var_proy["value"] or "").strip()
-            if proyecto_id is None and raw_body_proyecto and raw_body_proyecto.lower() != "null":
-                try:
-                    obj = json.loads(raw_body_proyecto)
-                except Exception:
-                    obj = None
+            if proyecto_id not in (None, "", []):
+                await sync_to_async(agregados.registrar_evento)("proyecto_creado")
 
-                if isinstance(obj, str):
+            # ---------- Guardar snapshot en la BD local ----------
+            try:
+                if proyecto_id not in (None, "", []):
                     try:
-                        obj2 = json.loads(obj)
-                        obj = obj2
-                    except Exception:
-                        pass
-
-                if isinstance(obj, dict):
-                    proyecto_id = (
-                            obj.get("id")
-                            or obj.get("proyectoId")
-                            or obj.get("id_proyecto")
-                    )
-
-        # ---------- Guardar snapshot en la BD local ----------
-        try:
-            if proyecto_id not in (None, "", []):
-                try:
-                    pid_int = int(proyecto_id)
-                except (TypeError, ValueError):
-                    pid_int = None
-
-                if pid_int is not None:
-                    ProyectoMonitoreo.objects.update_or_create(
-                        proyecto_id=pid_int,
-                        defaults={
-                            "nombre": str(data.get("nombre") or ""),
-                            "descripcion": str(data.get("descripcion") or ""),
-                            "plan_trabajo": data.get("planTrabajo") or {},
-                        },
-                    )
-        except Exception:
-            # No romper el flujo si falla sólo el snapshot
-            pass
+                        pid_int = int(proyecto_id)
+                    except (TypeError, ValueError):
+                        pid_int = None
+
+                    if pid_int is not None:
+                        await sync_to_async(monitoreo.guardar_proyecto)(
+                            pid_int,
+                            str(data.get("nombre") or ""),
+                            str(data.get("descripcion") or ""),
+                            data.get("planTrabajo") or {},
+                        )
+            except Exception:
+                # No romper el flujo si falla sólo el snapshot
+                pass
 
-        return JsonResponse(
-            {
+            return {
                 "ok": True,
                 "caseId": case_id,
                 "avanzado": True,
                 "proyectoId": proyecto_id,
                 "rawBodyProyecto": raw_body_proyecto,
-            },
-            status=201,
-        )
+            }, 201
+
+        payload, status = await _sin_cancelar(completar())
+        return JsonResponse(payload, status=status)
 
     except Exception as e:
         return JsonResponse(
@@ -752,6 +927,7 @@ def iniciar_proyecto_api(req: HttpRequest):
 # --------------------------- API: Registrar pedido ---------------------------
 
 @csrf_exempt
+@idempotente
 def registrar_pedido_api(req: HttpRequest):
     """
     Completa la tarea 'Registrar pedido' en Bonita.
@@ -819,35 +995,37 @@ def registrar_pedido_api(req: HttpRequest):
         }
         cli.execute_task(task["id"], payload_contrato)
 
-        # Leer variables que dejó el conector de salida
-        pedido_id = None
-        status_code_pedido = None
-        body_pedido_json = None
-        body_pedido_raw = None
+        # La tarea ya se ejecutó: lo que sigue no se corta por el plazo
+        with plazos.sin_plazo():
+            # Leer variables que dejó el conector de salida
+            pedido_id = None
+            status_code_pedido = None
+            body_pedido_json = None
+            body_pedido_raw = None
+
+            var_id = cli.get_case_variable(case_id, "pedidoId")
+            if var_id and "value" in var_id:
+                v = var_id["value"]
+                try:
+                    pedido_id = int(v)
+                except Exception:
+                    pedido_id = v
 
-        var_id = cli.get_case_variable(case_id, "pedidoId")
-        if var_id and "value" in var_id:
-            v = var_id["value"]
-            try:
-                pedido_id = int(v)
-            except Exception:
-                pedido_id = v
+            var_status = cli.get_case_variable(case_id, "status_code_pedido")
+            if var_status and "value" in var_status:
+                v = var_status["value"]
+                try:
+                    status_code_pedido = int(v)
+                except Exception:
+                    status_code_pedido = v
 
-        var_status = cli.get_case_variable(case_id, "status_code_pedido")
-        if var_status and "value" in var_status:
-            v = var_status["value"]
-            try:
-                status_code_pedido = int(v)
-            except Exception:
-                status_code_pedido = v
+            var_body = cli.get_case_variable(case_id, "body_pedido")
+            if var_body and "value" in var_body and (var_body["value"] or "").strip():
+                body_pedido_raw = var_body["value"]
+                body_pedido_json = BonitaClient.decode_json(body_pedido_raw)
 
-        var_body = cli.get_case_variable(case_id, "body_pedido")
-        if var_body and "value" in var_body and (var_body["value"] or "").strip():
-            body_pedido_raw = var_body["value"]
-            try:
-                body_pedido_json = json.loads(body_pedido_raw)
-            except Exception:
-                body_pedido_json = None
+            if pedido_id not in (None, ""):
+                agregados.registrar_evento("pedido_registrado")
 
         resp: Dict[str, Any] = {
             "ok": True,
@@ -871,6 +1049,7 @@ def registrar_pedido_api(req: HttpRequest):
 
 
 @csrf_exempt
+@idempotente
 def elegir_proyecto_api(req: HttpRequest):
     """
     Completa la tarea 'Revisar proyectos' seteando proyectoSeleccionadoId.
@@ -940,11 +1119,13 @@ def elegir_proyecto_api(req: HttpRequest):
         }
         cli.execute_task(task["id"], contract_payload)
 
-        # Guardar explícitamente el proyectoId en la variable del caso
-        try:
-            cli.update_case_variable(case_id, "proyectoId", str(proyecto_id_int))
-        except Exception:
-            pass
+        # La tarea ya se ejecutó: lo que sigue no se corta por el plazo
+        with plazos.sin_plazo():
+            # Guardar explícitamente el proyectoId en la variable del caso
+            try:
+                cli.update_case_variable(case_id, "proyectoId", str(proyecto_id_int))
+            except Exception:
+                pass
 
         return JsonResponse(
             {"ok": True, "caseId": case_id, "proyectoId": proyecto_id_int},
@@ -961,32 +1142,32 @@ def elegir_proyecto_api(req: HttpRequest):
 # --------------------------- API: Revisar proyectos ---------------------------
 
 @csrf_exempt
+@con_etag(_etag_variables("proyectosJson"))
 def revisar_proyectos_api(req: HttpRequest):
     """
     Devuelve lo que dejó el conector ON_ENTER de la tarea 'Revisar proyecto'
     en la variable de proceso 'proyectosJson'.
+
+    Admite ?fields=, ?sort=, ?limit= y ?offset= (ver bonita/listados.py)
+    y ?since=<version> (ver bonita/deltas.py).
     """
     case_id = (req.GET.get("case") or _json(req).get("caseId") or "").strip()
     if not case_id:
         return JsonResponse({"error": "Falta caseId/case"}, status=400)
 
-    try:
-        cli = BonitaClient()
-        cli.login()
+    listado, error = _listado_o_error(req)
+    if error:
+        return error
 
-        var = cli.get_case_variable(case_id, "proyectosJson")
+    try:
+        var = casos.variable(case_id, "proyectosJson")
         if not var or "value" not in var or not (var["value"] or "").strip():
             return JsonResponse(
                 {"ok": True, "caseId": case_id, "proyectos": [], "mensaje": "No hay proyectos"},
                 status=200,
             )
 
-        try:
-            proyectos = json.loads(var["value"])
-        except Exception:
-            proyectos = []
-
-        return JsonResponse({"ok": True, "caseId": case_id, "proyectos": proyectos}, status=200)
+        return _respuesta_listado(case_id, "proyectos", var["value"], listado, req.GET.get("since"))
     except Exception as e:
         return JsonResponse(
             {"error": "Error consultando Bonita", "detail": str(e)},
@@ -998,20 +1179,25 @@ def revisar_proyectos_api(req: HttpRequest):
 
 
 @csrf_exempt
+@con_etag(_etag_variables("pedidosJson"))
 def revisar_pedidos_proyecto_api(req: HttpRequest):
     """
     Devuelve lo que dejó el conector ON_ENTER de la tarea 'Revisar pedidos'
     en la variable de proceso 'pedidosJson'.
+
+    Admite ?fields=, ?sort=, ?limit= y ?offset= (ver bonita/listados.py)
+    y ?since=<version> (ver bonita/deltas.py).
     """
     case_id = (req.GET.get("case") or _json(req).get("caseId") or "").strip()
     if not case_id:
         return JsonResponse({"error": "Falta caseId/case"}, status=400)
 
-    try:
-        cli = BonitaClient()
-        cli.login()
+    listado, error = _listado_o_error(req)
+    if error:
+        return error
 
-        var = cli.get_case_variable(case_id, "pedidosJson")
+    try:
+        var = casos.variable(case_id, "pedidosJson")
         if not var or "value" not in var or not (var["value"] or "").strip():
             return JsonResponse(
                 {
@@ -1023,15 +1209,7 @@ def revisar_pedidos_proyecto_api(req: HttpRequest):
                 status=200,
             )
 
-        try:
-            pedidos = json.loads(var["value"])
-        except Exception:
-            pedidos = []
-
-        return JsonResponse(
-            {"ok": True, "caseId": case_id, "pedidos": pedidos},
-            status=200,
-        )
+        return _respuesta_listado(case_id, "pedidos", var["value"], listado, req.GET.get("since"))
     except Exception as e:
         return JsonResponse(
             {"error": "Error consultando Bonita", "detail": str(e)},
@@ -1040,6 +1218,7 @@ def revisar_pedidos_proyecto_api(req: HttpRequest):
 
 
 @csrf_exempt
+@idempotente
 def finalizar_revision_pedidos_api(req: HttpRequest):
     """
     Completa la tarea 'Revisar pedidos' en Bonita seteando verOtroProyecto.
@@ -1108,6 +1287,7 @@ def finalizar_revision_pedidos_api(req: HttpRequest):
 # bonita/views.py (agregar al final junto al resto de APIs)
 
 @csrf_exempt
+@idempotente
 def registrar_compromiso_api(req: HttpRequest):
     """
     Completa la tarea 'Registrar compromiso' en Bonita.
@@ -1188,35 +1368,40 @@ def registrar_compromiso_api(req: HttpRequest):
         }
         cli.execute_task(task["id"], payload_contrato)
 
-        # (lo demás igual que antes)
-        compromiso_id = None
-        status_code_comp = None
-        body_comp_json = None
-        body_comp_raw = None
+        # La tarea ya se ejecutó: lo que sigue no se corta por el plazo
+        with plazos.sin_plazo():
+            # (lo demás igual que antes)
+            compromiso_id = None
+            status_code_comp = None
+            body_comp_json = None
+            body_comp_raw = None
+
+            var_id = cli.get_case_variable(case_id, "compromisoId")
+            if var_id and "value" in var_id:
+                v = var_id["value"]
+                try:
+                    compromiso_id = int(v)
+                except Exception:
+                    compromiso_id = v
 
-        var_id = cli.get_case_variable(case_id, "compromisoId")
-        if var_id and "value" in var_id:
-            v = var_id["value"]
-            try:
-                compromiso_id = int(v)
-            except Exception:
-                compromiso_id = v
+            var_status = cli.get_case_variable(case_id, "status_code_compromiso")
+            if var_status and "value" in var_status:
+                v = var_status["value"]
+                try:
+                    status_code_comp = int(v)
+                except Exception:
+                    status_code_comp = v
 
-        var_status = cli.get_case_variable(case_id, "status_code_compromiso")
-        if var_status and "value" in var_status:
-            v = var_status["value"]
-            try:
-                status_code_comp = int(v)
-            except Exception:
-                status_code_comp = v
+            var_body = cli.get_case_variable(case_id, "body_compromiso")
+            if var_body and "value" in var_body and (var_body["value"] or "").strip():
+                body_comp_raw = var_body["value"]
+                body_comp_json = BonitaClient.decode_json(body_comp_raw)
 
-        var_body = cli.get_case_variable(case_id, "body_compromiso")
-        if var_body and "value" in var_body and (var_body["value"] or "").strip():
-            body_comp_raw = var_body["value"]
-            try:
-                body_comp_json = json.loads(body_comp_raw)
-            except Exception:
-                body_comp_json = None
+            if compromiso_id not in (None, ""):
+                agregados.registrar_evento(
+                    "compromiso_registrado",
+                    monto=body_comp_json.get("monto") if isinstance(body_comp_json, dict) else None,
+                )
 
         resp: Dict[str, Any] = {
             "ok": True,
@@ -1243,6 +1428,38 @@ def registrar_compromiso_api(req: HttpRequest):
 
 # --------------------------- Helpers para observaciones ---------------------------
 
+# Límite mensual de observaciones por proyecto, compartido entre workers
+# (bonita/cache.py). Se borra al enviar una observación del proyecto.
+_limites_observaciones = CacheDosNiveles("observaciones:limite", ttl=60)
+
+
+def _consultar_limite(api_base: str, proyecto_id: Any, jwt_token: str) -> Optional[dict]:
+    """
+    GET /observaciones/limite/ del proyecto; None si el backend no lo
+    informa. Con el backend caído, el último límite conocido con "stale".
+    """
+    res_limite = backend.llamar(
+        "limite",
+        "GET",
+        f"{api_base}/api/proyectos/{proyecto_id}/observaciones/limite/",
+        headers={
+            "Authorization": f"Bearer {jwt_token}",
+            "Content-Type": "application/json"
+        },
+        timeout=5,
+        vieja=True,
+    )
+    if res_limite.status_code == 200:
+        if backend.es_vieja(res_limite):
+            return {**res_limite.json(), "stale": True}
+        return res_limite.json()
+    if res_limite.status_code == 404:
+        print(f"Info: Endpoint de límite no implementado para proyecto {proyecto_id}, usando cálculo manual")
+    else:
+        print(f"Advertencia: Error obteniendo límite para proyecto {proyecto_id}: Status {res_limite.status_code}")
+    return None
+
+
 def calcular_limite_manual(proyecto: dict) -> dict:
     """
     Calcula el límite de observaciones basándose en el total de observaciones del proyecto.
@@ -1286,6 +1503,7 @@ def calcular_limite_manual(proyecto: dict) -> dict:
 
 
 @csrf_exempt
+@con_etag(_etag_proyectos_en_ejecucion)
 def obtener_proyectos_en_ejecucion_api(req: HttpRequest):
     """
     Devuelve la lista de proyectos en ejecución para que el Consejo Directivo 
@@ -1298,18 +1516,29 @@ def obtener_proyectos_en_ejecucion_api(req: HttpRequest):
     
     Espera en GET o POST:
       - caseId o case
+
+    Admite ?fields=, ?sort=, ?limit= y ?offset= (ver bonita/listados.py).
+    El orden y la página se aplican antes de enriquecer: los límites de
+    observaciones se consultan sólo para los proyectos de la página, y sólo
+    si ?fields= incluye limite_observaciones (o no se indica). Sin límites,
+    el GET condicional se resuelve con el modelo de lectura.
     """
     case_id = (req.GET.get("case") or _json(req).get("caseId") or "").strip()
     if not case_id:
         return JsonResponse({"error": "Falta caseId/case"}, status=400)
 
+    listado, error = _listado_o_error(req)
+    if error:
+        return error
+
     try:
+        # El cliente sólo hace login si hay que ir a Bonita
         cli = BonitaClient()
-        cli.login()
 
         # Leer la variable 'proyectosJson' que debería contener los proyectos
-        # en ejecución obtenidos por el conector de entrada de Bonita
-        var = cli.get_case_variable(case_id, "proyectosJson")
+        # en ejecución obtenidos por el conector de entrada de Bonita (del
+        # modelo de lectura, como el ETag)
+        var = casos.variable(case_id, "proyectosJson", cli)
 
         if not var or "value" not in var or not (var["value"] or "").strip():
             return JsonResponse(
@@ -1322,50 +1551,54 @@ def obtener_proyectos_en_ejecucion_api(req: HttpRequest):
                 status=200,
             )
 
-        try:
-            proyectos = json.loads(var["value"])
-            # Si proyectos es una lista, devolver tal cual
-            # Si es un objeto con propiedad "proyectos", extraerla
-            if isinstance(proyectos, dict) and "proyectos" in proyectos:
-                proyectos = proyectos["proyectos"]
-        except Exception as e:
+        proyectos = BonitaClient.decode_json(var["value"])
+        if proyectos is None:
             return JsonResponse(
-                {"error": "Error parseando proyectos", "detail": str(e)},
+                {"error": "Error parseando proyectos", "detail": "proyectosJson no es JSON válido"},
                 status=500,
             )
+        # Si proyectos es una lista, devolver tal cual
+        # Si es un objeto con propiedad "proyectos", extraerla
+        if isinstance(proyectos, dict) and "proyectos" in proyectos:
+            proyectos = proyectos["proyectos"]
+
+        paginacion: Dict[str, Any] = {}
+        if isinstance(proyectos, list):
+            if listado.activo:
+                proyectos, total = listados.paginar(proyectos, listado)
+                paginacion = listados.meta(listado, total, len(proyectos))
+            # El valor decodificado es compartido (cache) y abajo se le agrega
+            # el límite a cada proyecto: trabajamos sobre copias
+            proyectos = [dict(p) if isinstance(p, dict) else p for p in proyectos]
+
+        enriquecer = listado.quiere("limite_observaciones")
 
         # Enriquecer cada proyecto con información del límite mensual
         # Obtener token JWT del caso para consultar límites
-        var_access = cli.get_case_variable(case_id, "access")
         jwt_token = None
-        if var_access and "value" in var_access:
-            jwt_token = var_access["value"]
+        if enriquecer:
+            var_access = casos.variable(case_id, "access", cli)
+            if var_access and "value" in var_access:
+                jwt_token = var_access["value"]
 
-        if jwt_token and isinstance(proyectos, list):
+        if not enriquecer:
+            pass
+        elif jwt_token and isinstance(proyectos, list):
             api_base = getattr(settings, "API_BASE_URL", "http://127.0.0.1:8000")
             for proyecto in proyectos:
                 try:
                     proyecto_id = proyecto.get("id")
                     if proyecto_id:
-                        res_limite = requests.get(
-                            f"{api_base}/api/proyectos/{proyecto_id}/observaciones/limite/",
-                            headers={
-                                "Authorization": f"Bearer {jwt_token}",
-                                "Content-Type": "application/json"
-                            },
-                            timeout=5
+                        limite_info = _limites_observaciones.obtener(
+                            str(proyecto_id),
+                            lambda: _consultar_limite(api_base, proyecto_id, jwt_token),
+                            ttl=float(getattr(settings, "OBSERVACIONES_LIMITE_CACHE_TTL", 60)),
+                            guardar_si=lambda valor: valor is not None,
                         )
-                        if res_limite.status_code == 200:
-                            limite_info = res_limite.json()
+                        if limite_info is not None:
                             proyecto["limite_observaciones"] = limite_info
                         else:
                             # Endpoint no implementado o error - usar cálculo manual (fallback)
-                            if res_limite.status_code == 404:
-                                print(
-                                    f"Info: Endpoint de límite no implementado para proyecto {proyecto_id}, usando cálculo manual")
-                            else:
-                                print(
-                                    f"Advertencia: Error obteniendo límite para proyecto {proyecto_id}: Status {res_limite.status_code}")
                             proyecto["limite_observaciones"] = calcular_limite_manual(proyecto)
                 except Exception as e:
                     print(f"Excepción obteniendo límite para proyecto {proyecto.get('id')}: {e}")
@@ -1376,12 +1609,16 @@ def obtener_proyectos_en_ejecucion_api(req: HttpRequest):
             for proyecto in proyectos:
                 proyecto["limite_observaciones"] = calcular_limite_manual(proyecto)
 
+        if listado.campos is not None and isinstance(proyectos, list):
+            proyectos = listados.proyectar(proyectos, listado)
+
         return JsonResponse(
             {
                 "ok": True,
                 "caseId": case_id,
                 "proyectos": proyectos,
-                "count": len(proyectos) if isinstance(proyectos, list) else 0
+                "count": len(proyectos) if isinstance(proyectos, list) else 0,
+                **paginacion,
             },
             status=200
         )
@@ -1394,7 +1631,8 @@ def obtener_proyectos_en_ejecucion_api(req: HttpRequest):
 
 
 @csrf_exempt
-def enviar_observaciones_consejo_api(req: HttpRequest):
+@idempotente
+async def enviar_observaciones_consejo_api(req: HttpRequest):
     """
     Completa la tarea 'Revisar proyecto y cargar observaciones' del proceso 
     Consejo Directivo.
@@ -1436,11 +1674,11 @@ def enviar_observaciones_consejo_api(req: HttpRequest):
         return JsonResponse({"ok": False, "error": "proyectoId debe ser entero"}, status=400)
 
     try:
-        cli = BonitaClient()
-        cli.login()
+        cli = AsyncBonitaClient()
+        await cli.login()
 
         # Obtener el token JWT del caso para verificar el límite
-        var_access = cli.get_case_variable(case_id, "access")
+        var_access = await cli.get_case_variable(case_id, "access")
         jwt_token = None
         if var_access and "value" in var_access:
             jwt_token = var_access["value"]
@@ -1449,13 +1687,15 @@ def enviar_observaciones_consejo_api(req: HttpRequest):
         if jwt_token:
             api_base = getattr(settings, "API_BASE_URL", "http://127.0.0.1:8000")
             try:
-                res_limite = requests.get(
+                res_limite = await backend.allamar(
+                    "limite",
+                    "GET",
                     f"{api_base}/api/proyectos/{proyecto_id}/observaciones/limite/",
                     headers={
                         "Authorization": f"Bearer {jwt_token}",
                         "Content-Type": "application/json"
                     },
-                    timeout=10
+                    timeout=10,
                 )
 
                 if res_limite.status_code == 200:
@@ -1478,7 +1718,7 @@ def enviar_observaciones_consejo_api(req: HttpRequest):
                 print(f"Advertencia: No se pudo verificar límite de observaciones: {e}")
 
         assignee_username = getattr(settings, "BONITA_ASSIGNEE", "walter.bates")
-        user_id = cli.get_user_id_by_username(assignee_username)
+        user_id = await cli.get_user_id_by_username(assignee_username)
         if not user_id:
             return JsonResponse(
                 {"ok": False, "error": "Usuario Bonita no encontrado", "detail": assignee_username},
@@ -1486,7 +1726,7 @@ def enviar_observaciones_consejo_api(req: HttpRequest):
             )
 
         # Buscar tarea "Revisar proyecto y cargar observaciones"
-        task = cli.wait_ready_task_in_case(
+        task = await cli.wait_ready_task_in_case(
             case_id,
             task_name="Revisar proyecto y cargar observaciones",
             timeout_sec=15,
@@ -1504,72 +1744,73 @@ def enviar_observaciones_consejo_api(req: HttpRequest):
                 status=200,
             )
 
-        # Asignar y ejecutar con el contrato
-        cli.assign_task(task["id"], user_id)
-        payload_contrato = {
-            "proyectoId": proyecto_id,
-            "observaciones": observaciones,
-            "continuarRevisando": continuar_revisando,
-        }
-        cli.execute_task(task["id"], payload_contrato)
+        async def completar() -> tuple:
+            # Asignar y ejecutar con el contrato
+            await cli.assign_task(task["id"], user_id)
+            payload_contrato = {
+                "proyectoId": proyecto_id,
+                "observaciones": observaciones,
+                "continuarRevisando": continuar_revisando,
+            }
+            await cli.execute_task(task["id"], payload_contrato)
+            await _limites_observaciones.aborrar(str(proyecto_id))
+
+            # Esperar a que el conector de salida complete
+            # y leer las variables que dejó
+            observacion_id = None
+            status_code = None
+            body_observacion = None
+
+            # Dar tiempo al conector para ejecutarse
+            await asyncio.sleep(1)
+
+            var_id, var_status, var_body = await asyncio.gather(
+                cli.get_case_variable(case_id, "observacionId"),
+                cli.get_case_variable(case_id, "status_code_observacion"),
+                cli.get_case_variable(case_id, "body_observacion"),
+            )
 
-        # Esperar a que el conector de salida complete
-        # y leer las variables que dejó
-        observacion_id = None
-        status_code = None
-        body_observacion = None
+            if var_id and "value" in var_id:
+                v = var_id["value"]
+                try:
+                    observacion_id = int(v)
+                except Exception:
+                    observacion_id = v
 
-        # Dar tiempo al conector para ejecutarse
-        time.sleep(1)
+            if var_status and "value" in var_status:
+                v = var_status["value"]
+                try:
+                    status_code = int(v)
+                except Exception:
+                    status_code = v
 
-        var_id = cli.get_case_variable(case_id, "observacionId")
-        if var_id and "value" in var_id:
-            v = var_id["value"]
-            try:
-                observacion_id = int(v)
-            except Exception:
-                observacion_id = v
+            if var_body and "value" in var_body and (var_body["value"] or "").strip():
+                body_observacion = BonitaClient.decode_json(var_body["value"], default=var_body["value"])
 
-        var_status = cli.get_case_variable(case_id, "status_code_observacion")
-        if var_status and "value" in var_status:
-            v = var_status["value"]
-            try:
-                status_code = int(v)
-            except Exception:
-                status_code = v
+            # Verificar si el conector devolvió un error 429 (límite alcanzado)
+            if status_code == 429:
+                error_msg = "Límite de observaciones mensuales alcanzado"
+                error_detail = "Ya se alcanzó el límite de 2 observaciones este mes"
+                obs_realizadas = 2
+                fecha_reset = None
 
-        var_body = cli.get_case_variable(case_id, "body_observacion")
-        if var_body and "value" in var_body and (var_body["value"] or "").strip():
-            try:
-                body_observacion = json.loads(var_body["value"])
-            except Exception:
-                body_observacion = var_body["value"]
+                if body_observacion and isinstance(body_observacion, dict):
+                    error_detail = body_observacion.get("detail", error_detail)
+                    obs_realizadas = body_observacion.get("observaciones_realizadas", 2)
+                    fecha_reset = body_observacion.get("fecha_reset")
 
-        # Verificar si el conector devolvió un error 429 (límite alcanzado)
-        if status_code == 429:
-            error_msg = "Límite de observaciones mensuales alcanzado"
-            error_detail = "Ya se alcanzó el límite de 2 observaciones este mes"
-            obs_realizadas = 2
-            fecha_reset = None
-
-            if body_observacion and isinstance(body_observacion, dict):
-                error_detail = body_observacion.get("detail", error_detail)
-                obs_realizadas = body_observacion.get("observaciones_realizadas", 2)
-                fecha_reset = body_observacion.get("fecha_reset")
-
-            return JsonResponse(
-                {
+                return {
                     "ok": False,
                     "error": error_msg,
                     "detail": error_detail,
                     "observaciones_realizadas": obs_realizadas,
                     "fecha_reset": fecha_reset
-                },
-                status=429,
-            )
+                }, 429
 
-        return JsonResponse(
-            {
+            if observacion_id not in (None, ""):
+                await sync_to_async(agregados.registrar_evento)("observacion_enviada")
+
+            return {
                 "ok": True,
                 "caseId": case_id,
                 "proyectoId": proyecto_id,
@@ -1577,9 +1818,10 @@ def enviar_observaciones_consejo_api(req: HttpRequest):
                 "statusCode": status_code,
                 "body": body_observacion,
                 "mensaje": "Observaciones enviadas correctamente"
-            },
-            status=201,
-        )
+            }, 201
+
+        payload, status = await _sin_cancelar(completar())
+        return JsonResponse(payload, status=status)
 
     except Exception as e:
         return JsonResponse(
@@ -1589,6 +1831,7 @@ def enviar_observaciones_consejo_api(req: HttpRequest):
 
 
 @csrf_exempt
+@idempotente
 def cerrar_sesion_consejo_api(req: HttpRequest):
     """
     Cierra la sesión del Consejo Directivo finalizando el proceso.
@@ -1667,316 +1910,236 @@ def cerrar_sesion_consejo_api(req: HttpRequest):
         )
 
 
-@csrf_exempt
-def dashboard_datos_api(req: HttpRequest):
+def _calcular_datos_dashboard(snapshot: bool = True) -> Dict[str, Any]:
     """
-    Endpoint para obtener métricas del dashboard gerencial.
+    Calcula el payload completo del dashboard gerencial. Con `snapshot`
+    guarda además un snapshot del historial si ya pasó el intervalo.
 
     Consulta:
-    1. API Django (/api/dashboard/metricas/) para todos los datos consolidados
+    1. Métricas materializadas localmente (AgregadoDashboard); si nunca se
+       reconciliaron o la última reconciliación es vieja, se recalculan desde
+       la API Django (/api/dashboard/metricas/)
     2. API REST de Bonita para casos activos
     3. Base de datos local para sesiones
     """
-    if req.method != "GET":
-        return JsonResponse({"error": "GET only"}, status=405)
+    # ========================================
+    # 1. MÉTRICAS MATERIALIZADAS (o reconciliación contra la API Django)
+    # ========================================
+
+    resultado = agregados.leer(
+        max_edad=float(getattr(settings, "DASHBOARD_RECONCILIACION_INTERVALO", 900))
+    )
+    if resultado is None:
+        # Si la API falla (o su circuito está abierto) devuelve las últimas
+        # métricas materializadas, aunque sean viejas, con "stale"
+        resultado = agregados.reconciliar()
+    if resultado is None:
+        # Nunca se reconcilió y la API no responde: métricas vacías
+        resultado = agregados.nuevo_agregador().resultado()
+        resultado["stale"] = True
+    # Payload incompleto (API o Bonita caídos): el cache lo guarda poco tiempo
+    degradado = bool(resultado.get("stale"))
+
+    # ========================================
+    # 2. CONSULTAR API REST DE BONITA
+    # ========================================
+
+    casos_activos = 0
+    casos_ong = 0
+    casos_consejo = 0
 
     try:
-        from bonita.models import SesionBonita
-        from decimal import Decimal
-        from datetime import datetime
+        # Conteos exactos vía Content-Range (sin bajar los casos) y nombres
+        # de proceso desde la lista cacheada: cantidad fija de requests.
+        cli = BonitaClient(timeout=5, prioridad="fondo")
+        cli.login()
 
-        api_base = getattr(settings, "API_BASE_URL", "http://127.0.0.1:8000")
+        casos_activos = cli.count_cases(state="started")
 
-        # ========================================
-        # 1. CONSULTAR API DJANGO (ENDPOINT CONSOLIDADO)
-        # ========================================
+        for proceso in cli.list_processes():
+            process_name = proceso.get('name') or ''
+            if 'ProjectPlanning' in process_name:
+                casos_ong += cli.count_cases(state="started", processDefinitionId=proceso["id"])
+            elif 'Consejo' in process_name:
+                casos_consejo += cli.count_cases(state="started", processDefinitionId=proceso["id"])
 
-        proyectos = []
-        pedidos = []
-        compromisos = []
-        observaciones = []
+    except Exception as e:
+        print(f"Error consultando Bonita: {e}")
+        degradado = True
 
-        try:
-            res_metricas = requests.get(f"{api_base}/api/dashboard/metricas/", timeout=10)
-            if res_metricas.ok:
-                data = res_metricas.json()
-                proyectos = data.get('proyectos', [])
-                pedidos = data.get('pedidos', [])
-                compromisos = data.get('compromisos', [])
-                observaciones = data.get('observaciones', [])
-            else:
-                print(f"Error consultando API Django: {res_metricas.status_code} - {res_metricas.text}")
-        except Exception as e:
-            print(f"Error consultando API Django: {e}")
+    # ========================================
+    # 3. SESIONES LOCALES
+    # ========================================
 
-        # ========================================
-        # 2. CALCULAR MÉTRICAS DE PROYECTOS
-        # ========================================
+    sesiones_activas = SesionBonita.objects.count()
+    sesiones_consejo_local = SesionBonita.objects.filter(proceso="Consejo Directivo").count()
+    sesiones_ongs_local = SesionBonita.objects.filter(proceso="ProjectPlanning").count()
 
-        total_proyectos = len(proyectos)
-        proyectos_planificacion = sum(1 for p in proyectos if p.get('estado') == 'planificacion')
-        proyectos_ejecucion = sum(1 for p in proyectos if p.get('estado') == 'ejecucion')
-        proyectos_finalizados = sum(1 for p in proyectos if p.get('estado') == 'finalizado')
+    # ========================================
+    # 4. CONSTRUIR RESPUESTA
+    # ========================================
 
-        # ========================================
-        # 3. CALCULAR MÉTRICAS DE PEDIDOS
-        # ========================================
+    resultado["metricas"].update({
+        # Bonita
+        "casos_activos_bonita": casos_activos,
+        "casos_ong_bonita": casos_ong,
+        "casos_consejo_bonita": casos_consejo,
 
-        total_pedidos = len(pedidos)
-        pedidos_abiertos = sum(1 for p in pedidos if p.get('estado') == 'abierto')
+        # Sesiones locales
+        "sesiones_activas": sesiones_activas,
+        "sesiones_consejo": sesiones_consejo_local,
+        "sesiones_ongs": sesiones_ongs_local,
+    })
 
-        # ========================================
-        # 4. CALCULAR MÉTRICAS DE COMPROMISOS
-        # ========================================
+    # Historial de tendencias: a lo sumo un snapshot por intervalo (un
+    # payload degradado no entra: serían ceros o datos viejos)
+    if snapshot and not degradado:
+        historial.guardar_si_corresponde(resultado["metricas"])
 
-        total_compromisos = len(compromisos)
-        compromisos_cumplidos = sum(1 for c in compromisos if c.get('estado') == 'cumplido')
+    if degradado:
+        resultado["degradado"] = True
+    return resultado
 
-        # Calcular montos
-        monto_total = Decimal('0')
-        for c in compromisos:
-            monto = c.get('monto')
-            if monto:
-                try:
-                    monto_total += Decimal(str(monto))
-                except:
-                    pass
 
-        monto_promedio = monto_total / total_compromisos if total_compromisos > 0 else Decimal('0')
+# Cache del dashboard: se sirve el último payload calculado y, pasado el TTL,
+# se recalcula en segundo plano (un único recálculo a la vez). Un payload
+# degradado vale sólo DASHBOARD_CACHE_TTL_DEGRADADO segundos.
+_dashboard_cache = StaleWhileRevalidate(
+    _calcular_datos_dashboard,
+    ttl=float(getattr(settings, "DASHBOARD_CACHE_TTL", 30)),
+    max_stale=float(getattr(settings, "DASHBOARD_CACHE_MAX_STALE", 300)),
+    ttl_degradado=float(getattr(settings, "DASHBOARD_CACHE_TTL_DEGRADADO", 5)),
+    degradado=lambda data: bool(data.get("degradado")),
+)
 
-        # ========================================
-        # 5. CALCULAR MÉTRICAS DE OBSERVACIONES
-        # ========================================
 
-        total_observaciones = len(observaciones)
-        observaciones_pendientes = sum(1 for o in observaciones if o.get('estado') == 'pendiente')
-        observaciones_respondidas = sum(1 for o in observaciones if o.get('estado') == 'respondida')
-        observaciones_aprobadas = sum(1 for o in observaciones if o.get('estado') == 'aprobada')
-        observaciones_rechazadas = sum(1 for o in observaciones if o.get('estado') == 'rechazada')
-        observaciones_vencidas = sum(1 for o in observaciones if o.get('estado') == 'vencida')
+# (payload, etag) del último payload del dashboard servido; se recalcula sólo
+# cuando el cache entrega un objeto nuevo. Tupla: se reemplaza atómicamente.
+_dashboard_etag: tuple = (None, None)
 
-        # ========================================
-        # 6. CONSULTAR API REST DE BONITA
-        # ========================================
 
-        casos_activos = 0
-        casos_ong = 0
-        casos_consejo = 0
+def _etag_dashboard(data: Dict[str, Any]) -> str:
+    global _dashboard_etag
+    anterior, etag = _dashboard_etag
+    if anterior is not data:
+        etag = calcular_etag(json.dumps(data, sort_keys=True, default=str))
+        _dashboard_etag = (data, etag)
+    return etag
 
-        try:
-            # Autenticar en Bonita
-            bonita_base = settings.BONITA_BASE_URL
-            login_url = f"{bonita_base}/loginservice"
-
-            bonita_session = requests.Session()
-            login_data = {
-                "username": settings.BONITA_USER,
-                "password": settings.BONITA_PASSWORD,
-                "redirect": "false"
-            }
 
-            login_resp = bonita_session.post(login_url, data=login_data, timeout=5)
+@csrf_exempt
+def dashboard_datos_api(req: HttpRequest):
+    """
+    Endpoint para obtener métricas del dashboard gerencial.
 
-            if login_resp.ok:
-                # Consultar casos activos
-                cases_url = f"{bonita_base}/API/bpm/case"
-                params = {"f": "state=started", "p": 0, "c": 100}
-                cases_resp = bonita_session.get(cases_url, params=params, timeout=5)
+    El cálculo (ver _calcular_datos_dashboard) se cachea con una ventana
+    corta de frescura; vencida la ventana se responde el payload anterior
+    mientras un único hilo lo recalcula.
+    """
+    if req.method != "GET":
+        return JsonResponse({"error": "GET only"}, status=405)
 
-                if cases_resp.ok:
-                    cases = cases_resp.json()
-                    casos_activos = len(cases)
+    try:
+        data, _edad = _dashboard_cache.obtener()
 
-                    # Crear cache de nombres de procesos
-                    process_names_cache = {}
+        # Mismo payload cacheado -> mismo ETag: se responde 304 sin serializar
+        etag = _etag_dashboard(data)
+        resp = no_modificado(req, etag)
+        if resp is not None:
+            return resp
 
-                    # Contar casos por proceso
-                    for case in cases:
-                        process_def_id = case.get('processDefinitionId', '')
-                        if not process_def_id:
-                            continue
+        return etiquetar(req, JsonResponse({
+            "ok": True,
+            "data": data,
+        }, status=200), etag)
 
-                        # Obtener nombre del proceso desde cache o consultarlo
-                        if process_def_id not in process_names_cache:
-                            try:
-                                process_url = f"{bonita_base}/API/bpm/process/{process_def_id}"
-                                process_resp = bonita_session.get(process_url, timeout=3)
-                                if process_resp.ok:
-                                    process_data = process_resp.json()
-                                    process_names_cache[process_def_id] = process_data.get('name', '')
-                                else:
-                                    process_names_cache[process_def_id] = ''
-                            except Exception:
-                                process_names_cache[process_def_id] = ''
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return JsonResponse(
+            {"ok": False, "error": "Error obteniendo datos del dashboard", "detail": str(e)},
+            status=500,
+        )
 
-                        process_name = process_names_cache[process_def_id]
-                        if 'ProjectPlanning' in process_name:
-                            casos_ong += 1
-                        elif 'Consejo' in process_name:
-                            casos_consejo += 1
 
-        except Exception as e:
-            print(f"Error consultando Bonita: {e}")
+def historial_dashboard_api(req: HttpRequest):
+    """
+    Series históricas de las métricas del dashboard (desde SnapshotMetricas).
 
-        # Sesiones locales
-        sesiones_activas = SesionBonita.objects.count()
-        sesiones_consejo_local = SesionBonita.objects.filter(proceso="Consejo Directivo").count()
-        sesiones_ongs_local = SesionBonita.objects.filter(proceso="ProjectPlanning").count()
+    Parámetros GET (todos opcionales):
+      - desde / hasta: fechas ISO 8601 (por defecto, los últimos 7 días)
+      - puntos: cantidad máxima de puntos por serie (1..500, por defecto 100)
+      - metricas: lista separada por comas (por defecto, todas)
+      - agregacion: ultimo | promedio | min | max (por defecto, ultimo)
+    """
+    if req.method != "GET":
+        return JsonResponse({"error": "GET only"}, status=405)
 
-        # ========================================
-        # 7. TOP PROYECTOS CON MÁS OBSERVACIONES
-        # ========================================
+    ahora = timezone.now()
+    try:
+        hasta = _parse_fecha_historial(req.GET.get("hasta")) or ahora
+        desde = _parse_fecha_historial(req.GET.get("desde")) or (hasta - timedelta(days=7))
+        puntos = int(req.GET.get("puntos") or 100)
+    except ValueError as e:
+        return JsonResponse({"ok": False, "error": f"Parámetro inválido: {e}"}, status=400)
 
-        proyectos_obs_count = {}
-        for obs in observaciones:
-            proyecto_id = obs.get('proyecto_id')
-            if proyecto_id:
-                proyectos_obs_count[proyecto_id] = proyectos_obs_count.get(proyecto_id, 0) + 1
-
-        # Crear diccionario de proyectos para búsqueda rápida
-        proyectos_dict = {p['id']: p for p in proyectos}
-
-        top_proyectos_obs = []
-        for proyecto_id, count in sorted(proyectos_obs_count.items(), key=lambda x: x[1], reverse=True)[:5]:
-            proyecto = proyectos_dict.get(proyecto_id)
-            if proyecto:
-                top_proyectos_obs.append({
-                    "id": proyecto_id,
-                    "nombre": proyecto.get('nombre', 'Sin nombre'),
-                    "estado": proyecto.get('estado', 'desconocido'),
-                    "total_observaciones": count
-                })
-
-        # ========================================
-        # 8. TOP PROYECTOS CON MÁS COMPROMISOS
-        # ========================================
-
-        proyectos_comp_count = {}
-        proyectos_pedidos_count = {}
-
-        # Crear diccionario de pedidos para búsqueda rápida
-        pedidos_dict = {p['id']: p for p in pedidos}
-
-        # Contar pedidos por proyecto
-        for pedido in pedidos:
-            proyecto_id = pedido.get('proyecto')
-            if proyecto_id:
-                proyectos_pedidos_count[proyecto_id] = proyectos_pedidos_count.get(proyecto_id, 0) + 1
-
-        # Contar compromisos por proyecto (a través de pedidos)
-        for compromiso in compromisos:
-            pedido_id = compromiso.get('pedidoId')
-            if pedido_id:
-                pedido = pedidos_dict.get(pedido_id)
-                if pedido:
-                    proyecto_id = pedido.get('proyecto')
-                    if proyecto_id:
-                        proyectos_comp_count[proyecto_id] = proyectos_comp_count.get(proyecto_id, 0) + 1
-
-        top_proyectos_comp = []
-        for proyecto_id, count in sorted(proyectos_comp_count.items(), key=lambda x: x[1], reverse=True)[:5]:
-            proyecto = proyectos_dict.get(proyecto_id)
-            if proyecto:
-                top_proyectos_comp.append({
-                    "id": proyecto_id,
-                    "nombre": proyecto.get('nombre', 'Sin nombre'),
-                    "total_pedidos": proyectos_pedidos_count.get(proyecto_id, 0),
-                    "total_compromisos": count
-                })
-
-        # ========================================
-        # 9. OBSERVACIONES RECIENTES (últimas 10)
-        # ========================================
-
-        observaciones_recientes = []
-        # Ordenar por fecha de creación (más recientes primero)
-        observaciones_ordenadas = sorted(
-            observaciones,
-            key=lambda x: x.get('fecha_creacion', ''),
-            reverse=True
-        )[:10]
-
-        for obs in observaciones_ordenadas:
-            proyecto_id = obs.get('proyecto_id')
-            proyecto = proyectos_dict.get(proyecto_id)
-
-            # Calcular días restantes
-            dias_restantes = None
-            fecha_vencimiento = obs.get('fecha_vencimiento')
-            if fecha_vencimiento:
-                try:
-                    fecha_venc = datetime.fromisoformat(fecha_vencimiento.replace('Z', '+00:00'))
-                    dias_restantes = (fecha_venc - datetime.now(fecha_venc.tzinfo)).days
-                except:
-                    pass
-
-            observaciones_recientes.append({
-                "id": obs.get('id'),
-                "proyecto_nombre": proyecto.get('nombre', 'Desconocido') if proyecto else 'Desconocido',
-                "estado": obs.get('estado', 'desconocido'),
-                "fecha_creacion": obs.get('fecha_creacion'),
-                "dias_restantes": dias_restantes
-            })
+    if desde >= hasta:
+        return JsonResponse({"ok": False, "error": "'desde' debe ser anterior a 'hasta'"}, status=400)
 
-        # ========================================
-        # 10. CONSTRUIR RESPUESTA
-        # ========================================
-
-        metricas = {
-            # Proyectos
-            "total_proyectos": total_proyectos,
-            "proyectos_planificacion": proyectos_planificacion,
-            "proyectos_ejecucion": proyectos_ejecucion,
-            "proyectos_finalizados": proyectos_finalizados,
-
-            # Pedidos
-            "total_pedidos": total_pedidos,
-            "pedidos_abiertos": pedidos_abiertos,
-
-            # Compromisos
-            "total_compromisos": total_compromisos,
-            "compromisos_cumplidos": compromisos_cumplidos,
-            "monto_total_compromisos": float(monto_total),
-            "monto_promedio_compromiso": float(monto_promedio),
-
-            # Observaciones
-            "total_observaciones": total_observaciones,
-            "observaciones_pendientes": observaciones_pendientes,
-            "observaciones_respondidas": observaciones_respondidas,
-            "observaciones_aprobadas": observaciones_aprobadas,
-            "observaciones_rechazadas": observaciones_rechazadas,
-            "observaciones_vencidas": observaciones_vencidas,
-
-            # Bonita
-            "casos_activos_bonita": casos_activos,
-            "casos_ong_bonita": casos_ong,
-            "casos_consejo_bonita": casos_consejo,
-
-            # Sesiones locales
-            "sesiones_activas": sesiones_activas,
-            "sesiones_consejo": sesiones_consejo_local,
-            "sesiones_ongs": sesiones_ongs_local,
-        }
+    agregacion = req.GET.get("agregacion") or "ultimo"
+    if agregacion not in historial.AGREGACIONES:
+        return JsonResponse(
+            {"ok": False, "error": f"agregacion debe ser una de: {', '.join(historial.AGREGACIONES)}"},
+            status=400,
+        )
 
-        return JsonResponse({
-            "ok": True,
-            "data": {
-                "metricas": metricas,
-                "top_proyectos_observaciones": top_proyectos_obs,
-                "top_proyectos_compromisos": top_proyectos_comp,
-                "observaciones_recientes": observaciones_recientes
-            }
-        }, status=200)
+    claves = [c.strip() for c in (req.GET.get("metricas") or "").split(",") if c.strip()]
 
+    try:
+        data = historial.serie(desde, hasta, puntos=puntos, claves=claves or None, agregacion=agregacion)
+        return JsonResponse({"ok": True, "data": data}, status=200)
     except Exception as e:
         import traceback
         traceback.print_exc()
         return JsonResponse(
-            {"ok": False, "error": "Error obteniendo datos del dashboard", "detail": str(e)},
+            {"ok": False, "error": "Error obteniendo historial del dashboard", "detail": str(e)},
             status=500,
         )
 
 
+def admision_metricas_api(req: HttpRequest):
+    """
+    Estado del control de admisión delante de Bonita de ESTE worker
+    (bonita/admision.py): totales y, por carril (interactivo, fondo,
+    masivo), cupo, llamadas en curso, cola, rechazos (503), espera y
+    latencia. Con varios workers, cada uno informa lo suyo.
+    """
+    if req.method != "GET":
+        return JsonResponse({"error": "GET only"}, status=405)
+    return JsonResponse({"ok": True, "worker": os.getpid(), **admision.metricas()}, status=200)
+
+
+def backend_circuitos_api(req: HttpRequest):
+    """
+    Estado de los circuitos de la API backend de ESTE worker
+    (bonita/backend.py): por familia de endpoints, estado (cerrado, abierto,
+    semiabierto), fallas seguidas, aperturas y llamadas rechazadas.
+    """
+    if req.method != "GET":
+        return JsonResponse({"error": "GET only"}, status=405)
+    return JsonResponse({"ok": True, "worker": os.getpid(), "circuitos": backend.metricas()}, status=200)
+
+
+def _parse_fecha_historial(valor):
+    """Fecha ISO (con o sin hora) a datetime aware; None si viene vacía."""
+    if not valor:
+        return None
+    fecha = datetime.fromisoformat(valor.replace("Z", "+00:00"))
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
 @csrf_exempt
 def ver_observaciones_proyecto_api(req: HttpRequest, proyecto_id: int):
     """
@@ -1990,7 +2153,8 @@ def ver_observaciones_proyecto_api(req: HttpRequest, proyecto_id: int):
       - proyectoId: ID del proyecto (en la URL path)
     
     Retorna las observaciones con su estado (pendiente, respondida, vencida)
-    y días restantes.
+    y días restantes. Con ?since=<version> sólo las que cambiaron (ver
+    bonita/deltas.py).
     """
     import requests
 
@@ -2034,7 +2198,8 @@ def ver_observaciones_proyecto_api(req: HttpRequest, proyecto_id: int):
             "Content-Type": "application/json",
         }
 
-        response = requests.get(url, headers=headers, timeout=10)
+        # Con el backend caído se responde el último listado conocido ("stale")
+        response = backend.llamar("observaciones", "GET", url, headers=headers, timeout=10, vieja=True)
 
         if response.status_code == 401:
             return JsonResponse(
@@ -2048,15 +2213,19 @@ def ver_observaciones_proyecto_api(req: HttpRequest, proyecto_id: int):
             )
         elif response.status_code == 200:
             observaciones = response.json()
-            return JsonResponse(
-                {
-                    "ok": True,
-                    "caseId": case_id,
-                    "proyectoId": proyecto_id,
-                    "observaciones": observaciones,
-                },
-                status=200,
-            )
+            base: Dict[str, Any] = {"ok": True, "caseId": case_id, "proyectoId": proyecto_id}
+            if backend.es_vieja(response):
+                base["stale"] = True
+            if isinstance(observaciones, list):
+                version, cambios = deltas.calcular(
+                    case_id, f"observaciones:{proyecto_id}", observaciones,
+                    since=req.GET.get("since"), raw=response.text,
+                )
+                if version is not None:
+                    base["version"] = version
+                if cambios is not None:
+                    return _respuesta_delta(base, "observaciones", cambios, listados.Listado())
+            return JsonResponse({**base, "observaciones": observaciones}, status=200)
         else:
             return JsonResponse(
                 {
@@ -2083,6 +2252,7 @@ def ver_observaciones_proyecto_api(req: HttpRequest, proyecto_id: int):
 
 
 @csrf_exempt
+@con_etag(_etag_variables("compromisosJson", "code_compromisos"))
 def revisar_compromisos_api(req: HttpRequest):
     """
     Devuelve lo que dejó el conector ON_ENTER de la tarea 'Evaluar propuestas'
@@ -2092,17 +2262,23 @@ def revisar_compromisos_api(req: HttpRequest):
       - Hacer GET a:  /api/pedidos/<pedidoId>/compromisos/
       - Guardar el cuerpo en la variable de caso 'compromisosJson'
       - Guardar el status HTTP en 'code_compromisos'
+
+    Admite ?fields=, ?sort=, ?limit= y ?offset= (ver bonita/listados.py)
+    y ?since=<version> (ver bonita/deltas.py). Con ?claves=1 la respuesta
+    completa trae también la clave de delta de cada compromiso ("claves"),
+    para aplicar después las respuestas delta.
     """
     case_id = (req.GET.get("case") or _json(req).get("caseId") or "").strip()
     if not case_id:
         return JsonResponse({"error": "Falta caseId/case"}, status=400)
 
-    try:
-        cli = BonitaClient()
-        cli.login()
+    listado, error = _listado_o_error(req)
+    if error:
+        return error
 
+    try:
         # Lista de compromisos
-        var = cli.get_case_variable(case_id, "compromisosJson")
+        var = casos.variable(case_id, "compromisosJson")
         if not var or "value" not in var or not (var["value"] or "").strip():
             return JsonResponse(
                 {
@@ -2114,29 +2290,37 @@ def revisar_compromisos_api(req: HttpRequest):
                 status=200,
             )
 
-        try:
-            compromisos = json.loads(var["value"])
-        except Exception:
-            compromisos = []
-
         # Código HTTP que dejó el conector (opcional)
         status_code = None
-        v_code = cli.get_case_variable(case_id, "code_compromisos")
+        v_code = casos.variable(case_id, "code_compromisos")
         if v_code and "value" in v_code and (v_code["value"] or "").strip():
             try:
                 status_code = int(v_code["value"])
             except Exception:
                 status_code = v_code["value"]
 
-        return JsonResponse(
-            {
-                "ok": True,
-                "caseId": case_id,
-                "compromisos": compromisos,
-                "statusCode": status_code,
-            },
-            status=200,
+        compromisos = BonitaClient.decode_json(var["value"], default=[])
+        version, cambios = deltas.calcular(
+            case_id, "compromisos", compromisos if isinstance(compromisos, list) else [],
+            since=req.GET.get("since"), raw=var["value"],
         )
+        base: Dict[str, Any] = {"ok": True, "caseId": case_id, "statusCode": status_code}
+        if version is not None:
+            base["version"] = version
+        if cambios is not None:
+            return _respuesta_delta(base, "compromisos", cambios, listado)
+
+        paginacion: Dict[str, Any] = {}
+        if isinstance(compromisos, list):
+            todos = compromisos
+            if listado.activo:
+                compromisos, total = listados.paginar(compromisos, listado)
+                paginacion = listados.meta(listado, total, len(compromisos))
+            if req.GET.get("claves") == "1":
+                paginacion["claves"] = _claves_de(todos, compromisos)
+            compromisos = listados.proyectar(compromisos, listado)
+
+        return JsonResponse({**base, "compromisos": compromisos, **paginacion}, status=200)
 
     except Exception as e:
         return JsonResponse(
@@ -2145,11 +2329,24 @@ def revisar_compromisos_api(req: HttpRequest):
         )
 
 
+# Reintentos si compromisosAceptadosJson cambió entre la lectura y la escritura
+_APPEND_REINTENTOS = 3
+
+
+def _id_compromiso(item: Any) -> Any:
+    """id de un elemento de compromisosAceptadosJson / compromisosJson (dict o id suelto)."""
+    cid = item.get("id") if isinstance(item, dict) else item
+    try:
+        return int(cid)
+    except (TypeError, ValueError):
+        return cid
+
+
 def _append_compromiso_aceptado(cli: BonitaClient, case_id: str, compromiso_id: int | None):
     """
     Agrega el compromiso aceptado al arreglo JSON 'compromisosAceptadosJson'
-    de la instancia de proceso en Bonita y sincroniza ese arreglo
-    con la tabla ProyectoMonitoreo en la BD local.
+    de la instancia de proceso en Bonita y después lo registra en la tabla
+    CompromisoAceptado de la BD local (un insert, ver bonita/monitoreo.py).
 
     Guarda un diccionario con:
       - id
@@ -2157,125 +2354,117 @@ def _append_compromiso_aceptado(cli: BonitaClient, case_id: str, compromiso_id:
       - fecha
       - estado  => tomando el valor final desde body_compromiso_cumplido
                    (o 'cumplido' por defecto).
+
+    Lee todas las variables del caso en una sola búsqueda y escribe con un
+    único PUT tipado. Como Bonita no tiene escrituras condicionales, los
+    appends de un mismo caso se serializan entre workers con un lock en la
+    base (bonita/bloqueos.py). Si no se consigue el lock a tiempo se sigue
+    igual, y queda el control de después del PUT: se vuelve a leer el
+    arreglo y, si otra aceptación escribió encima, se mezcla con lo que
+    quedó y se reintenta.
+
+    La fila local se inserta sólo si el compromiso quedó en Bonita (lo
+    escribimos y sobrevivió, o ya estaba). Si Bonita rechaza una llamada
+    por carga (Saturado) la excepción sigue: el request falla y el reintento
+    del cliente completa el append.
     """
     if not compromiso_id:
         return
 
-    # ----- Leer historial actual desde Bonita -----
-    try:
-        var = cli.get_case_variable(case_id, "compromisosAceptadosJson")
-        raw = (var.get("value") or "").strip() if var else ""
-    except Exception:
-        raw = ""
-
-    lista: list[Any] = []
-    if raw:
+    with bloqueos.bloqueo(f"compromisosAceptadosJson:{case_id}") as tomado:
+        if not tomado:
+            print(f"Advertencia: sin lock para compromisosAceptadosJson del caso {case_id}; se sigue sin él")
         try:
-            parsed = json.loads(raw)
-            if isinstance(parsed, list):
-                lista = parsed
-        except Exception:
-            lista = []
-
-    # Evitar duplicados (tanto si son ints como dicts)
-    for item in lista:
-        if isinstance(item, dict) and item.get("id") == compromiso_id:
-            return
-        if isinstance(item, int) and item == compromiso_id:
+            variables = {
+                v.get("name"): v for v in cli.get_case_variables(case_id) if isinstance(v, dict)
+            }
+        except (plazos.PlazoVencido, admision.Saturado):
+            raise
+        except Exception as e:
+            print(f"Advertencia: no se pudieron leer las variables del caso {case_id}: {e}")
             return
 
-    # ----- Sacar detalle/fecha/estado base desde compromisosJson -----
-    nuevo: dict[str, Any] | None = None
-    try:
-        var_comp = cli.get_case_variable(case_id, "compromisosJson")
-        raw_comp = (var_comp.get("value") or "").strip() if var_comp else ""
-        if raw_comp:
-            comps = json.loads(raw_comp)
-            if isinstance(comps, list):
-                for c in comps:
-                    try:
-                        cid = int(c.get("id"))
-                    except Exception:
-                        continue
-                    if cid == compromiso_id:
-                        nuevo = {
-                            "id": compromiso_id,
-                            "detalle": c.get("detalle", ""),
-                            "fecha": c.get("fecha", ""),
-                            # estado base (luego lo pisamos con el final)
-                            "estado": c.get("estado", ""),
-                        }
-                        break
-    except Exception:
-        nuevo = None
+        def valor_json(nombre: str, expected: type) -> Any:
+            return BonitaClient.decode_json((variables.get(nombre) or {}).get("value"), expected)
 
-    if nuevo is None:
-        nuevo = {
+        # ----- detalle/fecha/estado base desde compromisosJson -----
+        comps = {_id_compromiso(c): c for c in valor_json("compromisosJson", list) or [] if isinstance(c, dict)}
+        c = comps.get(compromiso_id) or {}
+        nuevo: dict[str, Any] = {
             "id": compromiso_id,
-            "detalle": "",
-            "fecha": "",
-            "estado": "",
+            "detalle": c.get("detalle", ""),
+            "fecha": c.get("fecha", ""),
+            "estado": c.get("estado", ""),
         }
 
-    # ----- Tomar el estado FINAL desde body_compromiso_cumplido -----
-    final_state = "cumplido"  # por defecto, porque ya está aceptado
-    try:
-        var_cc = cli.get_case_variable(case_id, "body_compromiso_cumplido")
-        raw_cc = (var_cc.get("value") or "").strip() if var_cc else ""
-        if raw_cc:
-            obj = json.loads(raw_cc)
-            if isinstance(obj, dict):
-                cid_resp = obj.get("compromisoId")
+        # ----- Estado FINAL desde body_compromiso_cumplido -----
+        final_state = "cumplido"  # por defecto, porque ya está aceptado
+        obj = valor_json("body_compromiso_cumplido", dict)
+        if obj is not None and _id_compromiso({"id": obj.get("compromisoId")}) == compromiso_id and obj.get("estado"):
+            final_state = str(obj["estado"])
+        nuevo["estado"] = final_state
+
+        # ----- Guardar en la variable de caso en Bonita -----
+        var_hist = variables.get("compromisosAceptadosJson")
+        agregado = False
+        en_bonita = False
+        if var_hist is None:
+            print(f"Advertencia: el caso {case_id} no tiene la variable compromisosAceptadosJson")
+        else:
+            raw = var_hist.get("value")
+            for _ in range(_APPEND_REINTENTOS):
+                lista = BonitaClient.decode_json(raw, list, [])
+                if compromiso_id in {_id_compromiso(x) for x in lista}:
+                    en_bonita = True
+                    break  # ya estaba (reintento del usuario u otra aceptación lo mezcló)
+
+                escrito = json.dumps([*lista, nuevo], ensure_ascii=False)
                 try:
-                    cid_resp = int(cid_resp)
-                except Exception:
-                    pass
-                if cid_resp == compromiso_id and obj.get("estado"):
-                    final_state = str(obj["estado"])
-    except Exception:
-        # si falla, nos quedamos con "cumplido"
-        pass
+                    cli.update_case_variable(
+                        case_id, "compromisosAceptadosJson", escrito, var_type=var_hist.get("type")
+                    )
+                    agregado = True
+                    # ¿Sobrevivió la escritura? Si otra aceptación escribió
+                    # encima, se mezcla con lo que quedó y se vuelve a escribir
+                    actual = (cli.get_case_variable(case_id, "compromisosAceptadosJson") or {}).get("value")
+                except (plazos.PlazoVencido, admision.Saturado):
+                    # Bonita rechazó la llamada por carga: el request falla y
+                    # el reintento del cliente completa el append
+                    raise
+                except Exception as e:
+                    # No rompemos el flujo si falla el tracking
+                    print(f"Advertencia: no se pudo actualizar compromisosAceptadosJson del caso {case_id}: {e}")
+                    break
+                if actual == escrito:
+                    en_bonita = True
+                    break
+                raw = actual
+            else:
+                print(f"Advertencia: compromisosAceptadosJson del caso {case_id} cambió en cada reintento")
 
-    nuevo["estado"] = final_state
-    lista.append(nuevo)
+        if agregado and en_bonita and final_state == "cumplido":
+            agregados.registrar_evento("compromiso_cumplido")
 
-    # ----- Guardar de nuevo en la variable de caso en Bonita -----
+    # ----- Registrar también en la BD local (CompromisoAceptado) -----
+    # Sólo si quedó en Bonita: la tabla no puede tener aceptaciones que
+    # compromisosAceptadosJson no tiene
+    if not en_bonita:
+        return
     try:
-        cli.update_case_variable(
-            case_id,
-            "compromisosAceptadosJson",
-            json.dumps(lista, ensure_ascii=False),
-        )
-    except Exception:
-        # No rompemos el flujo si falla el tracking
+        proj_id = int(((variables.get("proyectoId") or {}).get("value") or "").strip())
+        monitoreo.agregar_compromiso(proj_id, nuevo)
+    except (TypeError, ValueError, AttributeError):
         pass
-
-    # ----- Sincronizar también en ProyectoMonitoreo -----
-    try:
-        var_pid = cli.get_case_variable(case_id, "proyectoId")
-        pid_raw = (var_pid.get("value") or "").strip() if var_pid else ""
-        if pid_raw:
-            try:
-                proj_id = int(pid_raw)
-            except ValueError:
-                proj_id = None
-
-            if proj_id is not None:
-                snap, _ = ProyectoMonitoreo.objects.get_or_create(
-                    proyecto_id=proj_id,
-                    defaults={"nombre": "", "descripcion": "", "plan_trabajo": {}},
-                )
-                snap.compromisos_aceptados = lista
-                snap.save(update_fields=["compromisos_aceptados", "actualizado_en"])
-    except Exception:
+    except Exception as e:
         # Tampoco rompemos el flujo si falla sólo la sincronización local
-        pass
+        print(f"Advertencia: no se pudo registrar el compromiso {compromiso_id} localmente: {e}")
 
 
 # --------------------------- API: Ejecutar 'Evaluar propuestas' --------------
 
 
 @csrf_exempt
+@idempotente
 def evaluar_propuestas_api(req: HttpRequest):
     if req.method != "POST":
         return JsonResponse({"error": "POST only"}, status=405)
@@ -2346,6 +2535,32 @@ def evaluar_propuestas_api(req: HttpRequest):
                 status=500,
             )
 
+        def acumular(espera: float) -> None:
+            # 2) Si NO es "volver a evaluar" y hay compromiso elegido,
+            # auto-ejecutamos "Acumular compromiso en el plan" y lo guardamos en el histórico
+            if volver or not comp_str:
+                return
+            task2 = cli.wait_ready_task_in_case(
+                case_id,
+                task_name="Acumular compromiso en el plan",
+                timeout_sec=espera,
+            )
+            if task2:
+                cli.assign_task(task2["id"], user_id)
+                cli.execute_task(task2["id"], {"finalizarPlan": finalizar})
+
+            # registrar el compromiso como aceptado en el array (si ya está, no hace nada)
+            _append_compromiso_aceptado(cli, case_id, comp_id)
+
+        resp = {
+            "ok": True,
+            "caseId": case_id,
+            "proyectoId": proyecto_id,
+            "compromisoIdSeleccionado": comp_id,
+            "volverAEvaluar": volver,
+            "finalizarPlan": finalizar,
+        }
+
         # 1) Ejecutar la tarea "Evaluar propuestas"
         task = cli.wait_ready_task_in_case(
             case_id,
@@ -2354,19 +2569,13 @@ def evaluar_propuestas_api(req: HttpRequest):
         )
 
         if not task:
-            # Si ya no está ready, asumimos que se ejecutó antes (pestaña vieja, etc.)
-            return JsonResponse(
-                {
-                    "ok": True,
-                    "caseId": case_id,
-                    "proyectoId": proyecto_id,
-                    "compromisoIdSeleccionado": comp_id,
-                    "volverAEvaluar": volver,
-                    "finalizarPlan": finalizar,
-                    "note": "La tarea 'Evaluar propuestas' no estaba ready; se asume ya ejecutada.",
-                },
-                status=200,
-            )
+            # Si ya no está ready se ejecutó antes (pestaña vieja, o un intento
+            # anterior que falló después de ejecutarla): se completa lo que
+            # haya quedado pendiente del paso 2
+            with plazos.sin_plazo():
+                acumular(espera=2)
+            resp["note"] = "La tarea 'Evaluar propuestas' no estaba ready; se asume ya ejecutada."
+            return JsonResponse(resp, status=200)
 
         contract_payload = {
             "compromisoIdSeleccionado": comp_str,
@@ -2376,32 +2585,11 @@ def evaluar_propuestas_api(req: HttpRequest):
         cli.assign_task(task["id"], user_id)
         cli.execute_task(task["id"], contract_payload)
 
-        # 2) Si NO es "volver a evaluar" y hay compromiso elegido,
-        # auto-ejecutamos "Acumular compromiso en el plan" y lo guardamos en el histórico
-        if not volver and comp_str:
-            task2 = cli.wait_ready_task_in_case(
-                case_id,
-                task_name="Acumular compromiso en el plan",
-                timeout_sec=10,
-            )
-            if task2:
-                cli.assign_task(task2["id"], user_id)
-                cli.execute_task(task2["id"], {"finalizarPlan": finalizar})
-
-            # registrar el compromiso como aceptado en el array
-            _append_compromiso_aceptado(cli, case_id, comp_id)
+        # La tarea ya se ejecutó: el paso 2 no se corta por el plazo
+        with plazos.sin_plazo():
+            acumular(espera=10)
 
-        return JsonResponse(
-            {
-                "ok": True,
-                "caseId": case_id,
-                "proyectoId": proyecto_id,
-                "compromisoIdSeleccionado": comp_id,
-                "volverAEvaluar": volver,
-                "finalizarPlan": finalizar,
-            },
-            status=200,
-        )
+        return JsonResponse(resp, status=200)
 
     except Exception as e:
         return JsonResponse(
@@ -2416,12 +2604,21 @@ def resumen_proyecto_api(req: HttpRequest):
     Devuelve un resumen del proyecto para el monitoreo.
 
     Estrategia híbrida:
-      1) Si viene proyectoId y hay snapshot en ProyectoMonitoreo, se usa ESO.
+      1) Si viene proyectoId y hay snapshot en ProyectoMonitoreo, se usa ESO
+         (etapas y compromisos de sus tablas hijas; los compromisos se
+         pueden filtrar/paginar con ?compromisosEstado=, ?compromisosLimit=
+         y ?compromisosOffset=).
       2) Si no hay snapshot (o no hay proyectoId), se leen las variables de caso
          de Bonita (proyectoNombre, descripcion, planTrabajo, compromisosAceptadosJson).
 
     Además, consulta la API backend para ver si hay alguna observación
-    pendiente/rechazada sobre el proyecto.
+    pendiente/rechazada sobre el proyecto. Con ?since=<historialVersion>,
+    historialObservaciones trae sólo las observaciones que cambiaron (ver
+    bonita/deltas.py).
+
+    Sin con_etag: las observaciones salen siempre de la API backend (y antes
+    se marcan las vencidas), así que no hay ETag local que evite ejecutar la
+    vista; el cliente usa ?since= para no recibir el historial completo.
     """
     case_id = (req.GET.get("case") or _json(req).get("caseId") or "").strip()
     proyecto_raw = req.GET.get("proyecto") or _json(req).get("proyectoId")
@@ -2435,9 +2632,27 @@ def resumen_proyecto_api(req: HttpRequest):
     except (TypeError, ValueError):
         proyecto_id = None
 
+    # Página de compromisos aceptados (por defecto, todos)
+    comp_estado = (req.GET.get("compromisosEstado") or "").strip() or None
+    try:
+        comp_limit = req.GET.get("compromisosLimit")
+        comp_limit = int(comp_limit) if comp_limit not in (None, "") else None
+        comp_offset = int(req.GET.get("compromisosOffset") or 0)
+    except ValueError:
+        return JsonResponse(
+            {"ok": False, "error": "compromisosLimit y compromisosOffset deben ser enteros"}, status=400
+        )
+    if (comp_limit is not None and not 0 < comp_limit <= listados.LIMITE_MAXIMO) or comp_offset < 0:
+        return JsonResponse(
+            {"ok": False, "error": f"compromisosLimit debe estar entre 1 y {listados.LIMITE_MAXIMO} "
+                                   "y compromisosOffset no puede ser negativo"},
+            status=400,
+        )
+
     try:
+        # Las variables salen del modelo de lectura local; el cliente sólo
+        # hace login si alguna no está al día
         cli = BonitaClient()
-        cli.login()
 
         nombre = ""
         desc = ""
@@ -2452,112 +2667,79 @@ def resumen_proyecto_api(req: HttpRequest):
             except ProyectoMonitoreo.DoesNotExist:
                 snap = None
 
+        compromisos_total = 0
         if snap is not None:
             nombre = snap.nombre or ""
             desc = snap.descripcion or ""
-
-            plan = snap.plan_trabajo or {}
-            if isinstance(plan, dict):
-                etapas = plan.get("etapas") or []
-                if not isinstance(etapas, list):
-                    etapas = []
-            else:
-                etapas = []
-
-            compromisos = snap.compromisos_aceptados or []
-            if isinstance(compromisos, list):
-                for x in compromisos:
-                    if isinstance(x, dict):
-                        cid = x.get("id")
-                        try:
-                            cid_int = int(cid)
-                        except Exception:
-                            cid_int = cid
-                        compromisos_detalle.append(
-                            {
-                                "id": cid_int,
-                                "detalle": x.get("detalle", ""),
-                                "fecha": x.get("fecha", ""),
-                                "estado": x.get("estado", ""),
-                            }
-                        )
-                    else:
-                        try:
-                            cid_int = int(x)
-                        except Exception:
-                            cid_int = x
-                        compromisos_detalle.append(
-                            {
-                                "id": cid_int,
-                                "detalle": "",
-                                "fecha": "",
-                                "estado": "",
-                            }
-                        )
+            etapas = monitoreo.etapas(proyecto_id)
+            compromisos_detalle, compromisos_total = monitoreo.compromisos(
+                proyecto_id, limit=comp_limit, offset=comp_offset, estado=comp_estado,
+            )
 
         # 2) Si NO hay snapshot, usar variables de Bonita (modo viejo)
         if snap is None:
-            v_nombre = cli.get_case_variable(case_id, "proyectoNombre")
+            v_nombre = casos.variable(case_id, "proyectoNombre", cli)
             if v_nombre and "value" in v_nombre:
                 nombre = (v_nombre["value"] or "").strip()
 
-            v_desc = cli.get_case_variable(case_id, "descripcion")
+            v_desc = casos.variable(case_id, "descripcion", cli)
             if v_desc and "value" in v_desc:
                 desc = (v_desc["value"] or "").strip()
 
-            v_plan = cli.get_case_variable(case_id, "planTrabajo")
-            if v_plan and "value" in v_plan and (v_plan["value"] or "").strip():
-                try:
-                    plan = json.loads(v_plan["value"])
-                    if isinstance(plan, dict) and "etapas" in plan:
-                        etapas = plan["etapas"]
-                except Exception:
-                    etapas = []
-
-            v_hist = cli.get_case_variable(case_id, "compromisosAceptadosJson")
-            if v_hist and "value" in v_hist:
-                raw_hist = (v_hist["value"] or "").strip()
-                if raw_hist:
-                    try:
-                        parsed = json.loads(raw_hist)
-                    except Exception:
-                        parsed = None
-
-                    if isinstance(parsed, list):
-                        if parsed and all(isinstance(x, dict) for x in parsed):
-                            compromisos_detalle = [
+            v_plan = casos.variable(case_id, "planTrabajo", cli)
+            if v_plan:
+                plan = BonitaClient.decode_json(v_plan.get("value"), dict)
+                if plan is not None and "etapas" in plan:
+                    etapas = plan["etapas"]
+
+            v_hist = casos.variable(case_id, "compromisosAceptadosJson", cli)
+            if v_hist:
+                parsed = BonitaClient.decode_json(v_hist.get("value"), list)
+                if parsed:
+                    if all(isinstance(x, dict) for x in parsed):
+                        compromisos_detalle = [
+                            {
+                                "id": int(x.get("id")) if str(x.get("id")).isdigit() else x.get("id"),
+                                "detalle": x.get("detalle", ""),
+                                "fecha": x.get("fecha", ""),
+                                "estado": x.get("estado", ""),
+                            }
+                            for x in parsed
+                        ]
+                    elif all(isinstance(x, (int, str)) for x in parsed):
+                        for cid in parsed:
+                            try:
+                                cid_int = int(cid)
+                            except Exception:
+                                cid_int = cid
+                            compromisos_detalle.append(
                                 {
-                                    "id": int(x.get("id")) if str(x.get("id")).isdigit() else x.get("id"),
-                                    "detalle": x.get("detalle", ""),
-                                    "fecha": x.get("fecha", ""),
-                                    "estado": x.get("estado", ""),
+                                    "id": cid_int,
+                                    "detalle": "",
+                                    "fecha": "",
+                                    "estado": "",
                                 }
-                                for x in parsed
-                            ]
-                        elif parsed and all(isinstance(x, (int, str)) for x in parsed):
-                            for cid in parsed:
-                                try:
-                                    cid_int = int(cid)
-                                except Exception:
-                                    cid_int = cid
-                                compromisos_detalle.append(
-                                    {
-                                        "id": cid_int,
-                                        "detalle": "",
-                                        "fecha": "",
-                                        "estado": "",
-                                    }
-                                )
-
-        # 3) Obtener token JWT de Bonita para consultar observaciones en tu backend
+                            )
+
+            # Mismo filtro y página que con el snapshot: el total cuenta los
+            # que cumplen el filtro de estado
+            if comp_estado:
+                compromisos_detalle = [c for c in compromisos_detalle if c["estado"] == comp_estado]
+            compromisos_total = len(compromisos_detalle)
+            fin = None if comp_limit is None else comp_offset + comp_limit
+            compromisos_detalle = compromisos_detalle[comp_offset:fin]
+
+        # 3) Obtener token JWT de Bonita para consultar observaciones en tu
+        # backend (no está en el modelo de lectura: va siempre a Bonita)
         jwt_token = ""
-        var_access = cli.get_case_variable(case_id, "access")
+        var_access = casos.variable(case_id, "access", cli)
         if var_access and "value" in var_access:
             jwt_token = (var_access["value"] or "").strip()
 
         # 4) Consultar API Backend para ver observaciones pendientes/rechazadas
         observacion_pendiente = None
         historial_observaciones = []
+        historial_delta: Dict[str, Any] = {}
         if proyecto_id and jwt_token:
             try:
                 # Primero marcar las vencidas si aplica
@@ -2571,7 +2753,7 @@ def resumen_proyecto_api(req: HttpRequest):
                     "Content-Type": "application/json",
                 }
 
-                resp_obs = requests.get(url_obs, headers=headers, timeout=5)
+                resp_obs = backend.llamar("observaciones", "GET", url_obs, headers=headers, timeout=5, vieja=True)
                 if resp_obs.status_code == 401:
                     # Token expirado - informar al usuario que debe hacer login nuevamente
                     return JsonResponse({
@@ -2585,6 +2767,8 @@ def resumen_proyecto_api(req: HttpRequest):
 
                     # Guardar el historial completo de observaciones
                     historial_observaciones = lista_obs
+                    if backend.es_vieja(resp_obs):
+                        historial_delta["historialStale"] = True
 
                     # Buscar observaciones pendientes/rechazadas/vencidas para mostrar
                     pendientes = [
@@ -2599,6 +2783,23 @@ def resumen_proyecto_api(req: HttpRequest):
                             "estado": ultima.get("estado"),
                             "fecha_vencimiento": ultima.get("fecha_vencimiento"),
                         }
+
+                    # Mismo listado que ver_observaciones_proyecto_api: el
+                    # token sirve en ambos endpoints
+                    if isinstance(lista_obs, list):
+                        version, cambios = deltas.calcular(
+                            case_id, f"observaciones:{proyecto_id}", lista_obs,
+                            since=req.GET.get("since"), raw=resp_obs.text,
+                        )
+                        if version is not None:
+                            historial_delta["historialVersion"] = version
+                        if cambios is not None:
+                            historial_observaciones = cambios["cambiados"]
+                            historial_delta.update({
+                                "historialDelta": True,
+                                "historialSinCambios": cambios["sinCambios"],
+                                "historialEliminados": cambios["eliminados"],
+                            })
             except Exception as e:
                 # Loguear si querés, pero no romper la respuesta
                 print(f"Error consultando observaciones al backend: {e}")
@@ -2612,8 +2813,10 @@ def resumen_proyecto_api(req: HttpRequest):
                 "descripcion": desc,
                 "etapas": etapas,
                 "compromisosAceptados": compromisos_detalle,
+                "compromisosTotal": compromisos_total,
                 "observacionPendiente": observacion_pendiente,
                 "historialObservaciones": historial_observaciones,
+                **historial_delta,
             },
             status=200,
         )
@@ -2626,6 +2829,7 @@ def resumen_proyecto_api(req: HttpRequest):
 
 
 @csrf_exempt
+@idempotente
 def responder_observacion_bonita_api(req: HttpRequest):
     """
     Ejecuta la tarea 'Monitorear ejecución' con accion='RESPONDER'.
@@ -2669,7 +2873,7 @@ def responder_observacion_bonita_api(req: HttpRequest):
                         "Content-Type": "application/json",
                     }
 
-                    resp = requests.get(url_obs, headers=headers, timeout=3)
+                    resp = backend.llamar("observaciones", "GET", url_obs, headers=headers, timeout=3)
                     if resp.status_code == 200:
                         observaciones = resp.json()
                         obs_actual = next((o for o in observaciones if o.get("id") == int(obs_id)), None)
@@ -2700,6 +2904,8 @@ def responder_observacion_bonita_api(req: HttpRequest):
         }
         cli.execute_task(task["id"], contract)
 
+        agregados.registrar_evento("observacion_respondida")
+
         return JsonResponse({"ok": True, "caseId": case_id})
 
     except Exception as e:
@@ -2707,6 +2913,7 @@ def responder_observacion_bonita_api(req: HttpRequest):
 
 
 @csrf_exempt
+@idempotente
 def finalizar_proyecto_api(req: HttpRequest):
     """
     Finaliza un proyecto cambiando su estado a 'finalizado' en la API backend
@@ -2752,7 +2959,7 @@ def finalizar_proyecto_api(req: HttpRequest):
         }
 
         try:
-            resp_obs = requests.get(url_obs, headers=headers, timeout=5)
+            resp_obs = backend.llamar("observaciones", "GET", url_obs, headers=headers, timeout=5)
             if resp_obs.status_code == 200:
                 lista_obs = resp_obs.json()
                 observaciones_problematicas = [
@@ -2775,7 +2982,9 @@ def finalizar_proyecto_api(req: HttpRequest):
         payload_estado = {"estado": "finalizado"}
 
         try:
-            resp_estado = requests.post(url_cambiar_estado, headers=headers, json=payload_estado, timeout=5)
+            resp_estado = backend.llamar(
+                "proyectos", "POST", url_cambiar_estado, headers=headers, json=payload_estado, timeout=5
+            )
 
             if resp_estado.status_code not in [200, 201]:
                 return JsonResponse({
@@ -2784,6 +2993,7 @@ def finalizar_proyecto_api(req: HttpRequest):
                     "statusCode": resp_estado.status_code,
                     "detail": resp_estado.text
                 }, status=500)
+            agregados.registrar_evento("proyecto_finalizado")
         except requests.RequestException as e:
             return JsonResponse({
                 "ok": False,
@@ -2853,7 +3063,8 @@ def finalizar_proyecto_api(req: HttpRequest):
 
 
 @csrf_exempt
-def red_ongs_salir_api(req: HttpRequest):
+@idempotente
+async def red_ongs_salir_api(req: HttpRequest):
     """
     Finaliza la colaboración de la Red de ONGs.
     Ejecuta la tarea activa (cualquiera de las 3 del ciclo)
@@ -2869,11 +3080,11 @@ def red_ongs_salir_api(req: HttpRequest):
         return JsonResponse({"ok": False, "error": "Falta caseId"}, status=400)
 
     try:
-        cli = BonitaClient()
-        cli.login()
+        cli = AsyncBonitaClient()
+        await cli.login()
 
         assignee_username = getattr(settings, "BONITA_ASSIGNEE", "walter.bates")
-        user_id = cli.get_user_id_by_username(assignee_username)
+        user_id = await cli.get_user_id_by_username(assignee_username)
 
         # Buscar cualquier tarea del ciclo de Red de ONGs
         posibles = [
@@ -2884,7 +3095,7 @@ def red_ongs_salir_api(req: HttpRequest):
 
         tarea = None
         for nombre in posibles:
-            tarea = cli.wait_ready_task_in_case(case_id, nombre, timeout_sec=2)
+            tarea = await cli.wait_ready_task_in_case(case_id, nombre, timeout_sec=2)
             if tarea:
                 break
 
@@ -2896,7 +3107,7 @@ def red_ongs_salir_api(req: HttpRequest):
             })
 
         # Ejecutar la tarea encontrada
-        cli.assign_task(tarea["id"], user_id)
+        await cli.assign_task(tarea["id"], user_id)
 
         # Armamos el contrato según la tarea
         contract = {
@@ -2917,7 +3128,7 @@ def red_ongs_salir_api(req: HttpRequest):
             contract.setdefault("compromisoDetalle", "")
             contract.setdefault("pedidoId", 0)
 
-        cli.execute_task(tarea["id"], contract)
+        await cli.execute_task(tarea["id"], contract)
 
         return JsonResponse({
             "ok": True,
@@ -13,4 +13,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pp_front.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from bonita import bucle  # noqa: E402  (después del setup de Django)
+
+
+async def application(scope, receive, send):
+    # El loop del servidor ASGI dura lo que el worker: los pools httpx y el
+    # trabajo que sigue después de la respuesta pueden quedar en él
+    bucle.marcar_duradero()
+    await django_application(scope, receive, send)
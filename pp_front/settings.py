@@ -30,6 +30,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "bonita.middleware.CompresionMiddleware",
+    "bonita.middleware.PlazoMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -55,10 +57,76 @@ TEMPLATES = [{
 
 WSGI_APPLICATION = "pp_front.wsgi.application"
 
-DATABASES = {
+# ============================
+# BASE DE DATOS
+# ============================
+
+# DB_ENGINE: "sqlite" (por defecto) o "postgresql" (requiere `pip install psycopg[binary]`)
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite").lower()
+# Segundos que se reutiliza la conexión de cada worker (0 = una por request)
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "60"))
+
+if DB_ENGINE in ("postgres", "postgresql"):
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("DB_NAME", "pp_front"),
+            "USER": os.getenv("DB_USER", "postgres"),
+            "PASSWORD": os.getenv("DB_PASSWORD", ""),
+            "HOST": os.getenv("DB_HOST", "localhost"),
+            "PORT": os.getenv("DB_PORT", "5432"),
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            # Verifica la conexión reutilizada antes de usarla en cada request
+            "CONN_HEALTH_CHECKS": True,
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv("DB_NAME", BASE_DIR / "db.sqlite3"),
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": True,
+            # Segundos que una escritura espera el lock antes de "database is locked"
+            "OPTIONS": {"timeout": float(os.getenv("SQLITE_BUSY_TIMEOUT", "5"))},
+            # PRAGMAs que se aplican al abrir cada conexión (bonita/basedatos.py).
+            # WAL: los lectores no bloquean al escritor ni al revés;
+            # synchronous=NORMAL es seguro con WAL y evita un fsync por commit.
+            "PRAGMAS": {
+                "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "wal"),
+                "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "normal"),
+                "busy_timeout": int(float(os.getenv("SQLITE_BUSY_TIMEOUT", "5")) * 1000),
+            },
+            # "immediate": las transacciones toman el lock de escritura al
+            # empezar y esperan busy_timeout en vez de fallar al escribir
+            "TRANSACCIONES": os.getenv("SQLITE_TRANSACCIONES", "immediate"),
+        }
+    }
+
+# ============================
+# CACHE
+# ============================
+
+# CACHE_BACKEND: "locmem" (por defecto; uno por worker), "archivo" (carpeta
+# CACHE_DIR, compartida entre los workers de la máquina) o "bd" (tabla en la
+# base de datos; crearla con `python manage.py createcachetable`).
+# Ninguno necesita un servicio externo. CACHE_DIR es por defecto .cache/ en
+# el proyecto (ignorada por git): guarda respuestas del backend por token,
+# así que no tiene que quedar en una carpeta pública ni versionada.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem").lower()
+_CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "pp_front"),
+    "archivo": ("django.core.cache.backends.filebased.FileBasedCache",
+                os.getenv("CACHE_DIR", str(BASE_DIR / ".cache"))),
+    "bd": ("django.core.cache.backends.db.DatabaseCache", "pp_front_cache"),
+}
+if CACHE_BACKEND not in _CACHE_BACKENDS:
+    raise RuntimeError(f"CACHE_BACKEND inválido: {CACHE_BACKEND} (locmem, archivo o bd)")
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3"
+        "BACKEND": _CACHE_BACKENDS[CACHE_BACKEND][0],
+        "LOCATION": _CACHE_BACKENDS[CACHE_BACKEND][1],
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", "5000"))},
     }
 }
 
@@ -78,6 +146,74 @@ BONITA_BASE_URL = os.getenv("BONITA_BASE_URL", "http://localhost:8080/bonita")
 BONITA_USER = os.getenv("BONITA_USER", "install")
 BONITA_PASSWORD = os.getenv("BONITA_PASSWORD", "install")
 BONITA_ASSIGNEE = os.getenv("BONITA_ASSIGNEE", "walter.bates")
+# Segundos que se cachea la lista de procesos desplegados (/bpm/process)
+BONITA_PROCESS_CACHE_TTL = float(os.getenv("BONITA_PROCESS_CACHE_TTL", "300"))
+# Cache en dos niveles de metadatos, sesión, límites y tareas (bonita/cache.py):
+# LRU por worker delante de CACHES["default"]. El LRU guarda cada valor a lo
+# sumo BONITA_CACHE_LOCAL_TTL segundos; BONITA_CACHE_BETA > 1 renueva antes.
+BONITA_CACHE_LOCAL_TAMANIO = int(os.getenv("BONITA_CACHE_LOCAL_TAMANIO", "512"))
+BONITA_CACHE_LOCAL_TTL = float(os.getenv("BONITA_CACHE_LOCAL_TTL", "5"))
+BONITA_CACHE_BETA = float(os.getenv("BONITA_CACHE_BETA", "1.0"))
+# Segundos que se reutiliza la sesión de Bonita entre requests y workers
+# (si vence antes, el cliente vuelve a loguearse ante el 401)
+BONITA_SESION_TTL = float(os.getenv("BONITA_SESION_TTL", "900"))
+# Segundos que se cachean los ids de usuario de Bonita
+BONITA_USUARIOS_CACHE_TTL = float(os.getenv("BONITA_USUARIOS_CACHE_TTL", "3600"))
+# Conexiones simultáneas a Bonita por event loop del cliente async
+# (bonita/bonita_client_async.py; con httpx instalado, si no usa hilos).
+# Las vistas async rinden bajo ASGI: uvicorn pp_front.asgi:application
+# (httpx y uvicorn están en requirements.txt). Bajo WSGI los pedidos async
+# comparten el pool de un loop de fondo (bonita/bucle.py).
+BONITA_ASYNC_MAX_CONEXIONES = int(os.getenv("BONITA_ASYNC_MAX_CONEXIONES", "100"))
+# Control de admisión (bonita/admision.py): llamadas simultáneas a Bonita por
+# worker en cada carril de prioridad, lugares en la cola de cada carril y
+# segundos máximos de espera. Con la cola llena o la espera agotada se
+# responde 503 con Retry-After. Un carril puede usar los lugares libres de
+# los de menor prioridad (interactivo > fondo > masivo), nunca al revés.
+BONITA_CUPOS = {
+    "interactivo": int(os.getenv("BONITA_CUPO_INTERACTIVO", "12")),
+    "fondo": int(os.getenv("BONITA_CUPO_FONDO", "3")),
+    "masivo": int(os.getenv("BONITA_CUPO_MASIVO", "1")),
+}
+BONITA_COLA = int(os.getenv("BONITA_COLA", "64"))
+BONITA_COLA_ESPERA = float(os.getenv("BONITA_COLA_ESPERA", "5"))
+BONITA_REINTENTAR_EN = float(os.getenv("BONITA_REINTENTAR_EN", "2"))
+# Circuit breaker de la API backend (bonita/backend.py), por familia de
+# endpoints: fallas seguidas (error de red, 5xx o respuesta más lenta que
+# BACKEND_CIRCUITO_LENTO segundos) que lo abren y segundos que queda abierto
+# antes de dejar pasar una llamada de prueba. Mientras tanto las lecturas
+# responden la última respuesta buena (marcada "stale"), que se guarda
+# BACKEND_ULTIMA_TTL segundos.
+BACKEND_CIRCUITO_FALLOS = int(os.getenv("BACKEND_CIRCUITO_FALLOS", "5"))
+BACKEND_CIRCUITO_LENTO = float(os.getenv("BACKEND_CIRCUITO_LENTO", "4"))
+BACKEND_CIRCUITO_ABIERTO = float(os.getenv("BACKEND_CIRCUITO_ABIERTO", "30"))
+BACKEND_ULTIMA_TTL = float(os.getenv("BACKEND_ULTIMA_TTL", "86400"))
+# Segundos que se guarda la primera respuesta de cada Idempotency-Key
+# (bonita/idempotencia.py), y a partir de cuántos una request "en curso" se
+# da por muerta y otra con la misma clave puede ejecutarla
+IDEMPOTENCIA_TTL = float(os.getenv("IDEMPOTENCIA_TTL", "86400"))
+IDEMPOTENCIA_EN_CURSO_MAX = float(os.getenv("IDEMPOTENCIA_EN_CURSO_MAX", "120"))
+# Plazo total de cada request en segundos (bonita/plazos.py): las llamadas a
+# Bonita y a la API JWT y las esperas reciben sólo lo que queda; al agotarse
+# se responde 504. Debe ser menor que el timeout del proxy (nginx: 60 s por
+# defecto).
+PLAZO_RESPUESTA = float(os.getenv("PLAZO_RESPUESTA", "25"))
+# Plazos por endpoint (nombre de URL); el resto usa PLAZO_RESPUESTA
+PLAZOS_RESPUESTA = {
+    "bonita_next_step": float(os.getenv("PLAZO_NEXT_STEP", "12")),
+    "bonita_consejo_observaciones": float(os.getenv("PLAZO_CONSEJO_OBSERVACIONES", "20")),
+    "bonita_iniciar": float(os.getenv("PLAZO_INICIAR", "25")),
+}
+# Segundos que se cachea el límite mensual de observaciones de cada proyecto
+# en el listado del consejo (se borra al enviar una observación)
+OBSERVACIONES_LIMITE_CACHE_TTL = float(os.getenv("OBSERVACIONES_LIMITE_CACHE_TTL", "60"))
+# Entradas del cache (por worker) de variables JSON ya decodificadas
+BONITA_JSON_CACHE_SIZE = int(os.getenv("BONITA_JSON_CACHE_SIZE", "256"))
+# Modelo de lectura local de casos (tabla CasoBonita): las vistas leen de la
+# BD si la fila tiene menos de CASOS_LECTURA_MAX_EDAD segundos. La mantiene
+# `python manage.py sincronizar_casos --loop` cada CASOS_SYNC_INTERVALO segundos.
+CASOS_LECTURA_MAX_EDAD = float(os.getenv("CASOS_LECTURA_MAX_EDAD", "30"))
+CASOS_SYNC_INTERVALO = float(os.getenv("CASOS_SYNC_INTERVALO", "10"))
 
 # Proceso ONG / Project Planning
 BONITA_PROCESS_NAME = os.getenv("BONITA_PROCESS_NAME", "ProjectPlanning")
@@ -92,3 +228,41 @@ BONITA_PROCESS_VERSION_CONSEJO = os.getenv("BONITA_PROCESS_VERSION_CONSEJO", "1.
 # ============================
 
 API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000")
+
+# ============================
+# DASHBOARD CONFIG
+# ============================
+
+# Segundos que el payload del dashboard se considera fresco
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+# Segundos que se considera fresco un payload degradado (API Django o Bonita
+# no respondieron): se reintenta pronto en lugar de servirlo todo el TTL
+DASHBOARD_CACHE_TTL_DEGRADADO = float(os.getenv("DASHBOARD_CACHE_TTL_DEGRADADO", "5"))
+# Pasado este tiempo ya no se sirve el payload viejo: se recalcula en el momento
+DASHBOARD_CACHE_MAX_STALE = float(os.getenv("DASHBOARD_CACHE_MAX_STALE", "300"))
+# Motor de agregación: "python" (una pasada, memoria acotada) o
+# "numpy" (columnar, requiere NumPy; conviene para reportes muy grandes)
+DASHBOARD_MOTOR = os.getenv("DASHBOARD_MOTOR", "python")
+# Cada cuánto (segundos) se reconcilian las métricas materializadas contra
+# /api/dashboard/metricas/ (también: python manage.py reconciliar_dashboard)
+DASHBOARD_RECONCILIACION_INTERVALO = float(os.getenv("DASHBOARD_RECONCILIACION_INTERVALO", "900"))
+# Cada cuánto (segundos) se guarda una foto de las métricas para el historial
+# (python manage.py snapshot_metricas --loop, o al recalcular el dashboard)
+DASHBOARD_SNAPSHOT_INTERVALO = float(os.getenv("DASHBOARD_SNAPSHOT_INTERVALO", "3600"))
+# Días que se conservan los snapshots (0 = para siempre)
+DASHBOARD_HISTORIAL_RETENCION_DIAS = int(os.getenv("DASHBOARD_HISTORIAL_RETENCION_DIAS", "365"))
+
+# ============================
+# RESPUESTAS API
+# ============================
+
+# Serializador JSON: "auto" usa orjson si está instalado; "stdlib" fuerza json
+RESPUESTAS_JSON_MOTOR = os.getenv("RESPUESTAS_JSON_MOTOR", "auto")
+# Entradas del cache (por worker) de variables JSON ya validadas para
+# pegarlas sin reparsear en las respuestas (bonita/respuestas.py)
+RESPUESTAS_JSON_VALIDADOS = int(os.getenv("RESPUESTAS_JSON_VALIDADOS", "256"))
+# Compresión (bonita.middleware.CompresionMiddleware): gzip, o brotli si el
+# paquete `brotli` está instalado. Sólo respuestas de estos tipos y tamaños.
+RESPUESTAS_COMPRESION_MINIMO = int(os.getenv("RESPUESTAS_COMPRESION_MINIMO", "1024"))
+RESPUESTAS_COMPRESION_TIPOS = ("application/json",)
+RESPUESTAS_BROTLI_CALIDAD = int(os.getenv("RESPUESTAS_BROTLI_CALIDAD", "5"))